@@ -0,0 +1,459 @@
+"""
+Credit Architect — Certified Mail Benchmarks
+Measures the certified mail pipeline: local costs directly, and Lob round
+trips against the local mock (lob_mock_server.py) with injectable latency,
+errors and 429s — no account, no postage.
+
+Usage:
+    python bench_certified_mail.py render [--letters 20000] [--items 3]
+    python bench_certified_mail.py tracker [--records 10000,100000,1000000] [--items 3]
+    python bench_certified_mail.py send [--clients 50] [--concurrency 8] [--latency 0.05]
+                                        [--error-rate 0.01] [--throttle-rate 0.02]
+    python bench_certified_mail.py items [--clients 20000] [--items 3]
+    python bench_certified_mail.py startup [--runs 20] [--clients 100]
+    python bench_certified_mail.py templates [--letters 200] [--items 3]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+import certified_mail
+from certified_mail import (
+    BUREAU_ADDRESSES, JOURNAL_HEADER, LETTER_TEMPLATES, DisputeJournal, DisputeMailer, LetterCache,
+    TokenBucket, generate_letter_html, open_dispute_tracker,
+)
+from lob_mock_server import LobMockServer
+
+# ---------------------------------------------------------------------------
+# SAMPLE DATA
+# ---------------------------------------------------------------------------
+
+SAMPLE_CLIENT = {
+    "name": "John Doe",
+    "address_line1": "123 Main St",
+    "city": "Austin",
+    "state": "TX",
+    "zip": "78701",
+    "ssn_last4": "1234",
+    "dob": "01/15/1990",
+}
+
+SAMPLE_CONTEXT = {
+    "original_dispute_date": "January 15, 2026",
+    "settlement_amount": "450.00",
+    "violations": ["Failed to investigate within 30 days", "Reported unverified information"],
+    "deadline_days": "15",
+}
+
+# Client ids the sample tracker's records are spread over (one shard each in a client-sharded tracker)
+SAMPLE_CLIENT_IDS = 100
+
+
+def sample_items(count: int) -> list:
+    return [
+        {
+            "account_name": f"Sample Creditor {i}",
+            "account_number_last4": f"{1000 + i}",
+            "reason": "Account shows 30-day late but was paid on time",
+            "details": "Bank statement attached showing on-time payment",
+        }
+        for i in range(count)
+    ]
+
+
+# ---------------------------------------------------------------------------
+# BENCHMARKS
+# ---------------------------------------------------------------------------
+
+def bench_render(letters: int, items: int) -> dict:
+    """Per-letter generate_letter_html() cost for each of the 19 letter types."""
+    dispute_items = sample_items(items)
+    recipient = BUREAU_ADDRESSES["equifax"]
+    per_type = {}
+    for letter_type in LETTER_TEMPLATES:
+        start = time.perf_counter()
+        for _ in range(letters):
+            generate_letter_html(letter_type, SAMPLE_CLIENT, recipient, dispute_items, SAMPLE_CONTEXT)
+        per_type[letter_type] = (time.perf_counter() - start) / letters * 1e6
+    return per_type
+
+
+def sample_dispute_records(clients: int, items: int):
+    """
+    Tracking records shaped like DisputeMailer's: each client gets an initial
+    dispute and a method-of-verification follow-up sent to all three bureaus,
+    with the same items inline in all six records. Clients share
+    SAMPLE_CLIENT_IDS client_ids round-robin.
+    """
+    sent = datetime(2026, 1, 15)
+    for c in range(clients):
+        dispute_items = [
+            dict(item, account_name=f"Creditor {c}-{i}", details=f"Client {c}: " + item["details"])
+            for i, item in enumerate(sample_items(items))
+        ]
+        for letter_type, days in (("initial_dispute", 0), ("method_of_verification", 35)):
+            for bureau in ("equifax", "experian", "transunion"):
+                date = sent + timedelta(days=days)
+                yield {
+                    "letter_id": f"ltr_{c:07d}{letter_type[0]}{bureau[:2]}",
+                    "letter_type": letter_type,
+                    "target": bureau,
+                    "client_id": f"cli_{c % SAMPLE_CLIENT_IDS:03d}",
+                    "recipient_name": BUREAU_ADDRESSES[bureau]["name"],
+                    "sent_date": date.isoformat(),
+                    "response_deadline": (date + timedelta(days=30)).isoformat(),
+                    "escalation_date": (date + timedelta(days=45)).isoformat(),
+                    "tracking_number": f"9407{c:018d}",
+                    "expected_delivery": (date + timedelta(days=4)).date().isoformat(),
+                    "cost": "7.82",
+                    "status": "sent",
+                    "items_disputed": dispute_items,
+                }
+
+
+def bench_items(clients: int, items: int) -> dict:
+    """Tracker size and load() time with inline items vs normalized, content-addressed items."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "dispute_tracker.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(JOURNAL_HEADER) + "\n")
+            for record in sample_dispute_records(clients, items):
+                f.write(json.dumps({"op": "add", "dispute": record}) + "\n")
+        journal = DisputeJournal(path)
+        inline_bytes = os.path.getsize(path)
+        start = time.perf_counter()
+        records = len(journal.load())
+        inline_load = time.perf_counter() - start
+
+        start = time.perf_counter()
+        journal.compact()
+        migrate = time.perf_counter() - start
+        normalized_bytes = os.path.getsize(path)
+        start = time.perf_counter()
+        journal.load()
+        normalized_load = time.perf_counter() - start
+        journal.close()
+    return {
+        "records": records,
+        "inline_bytes": inline_bytes,
+        "normalized_bytes": normalized_bytes,
+        "inline_load": inline_load,
+        "normalized_load": normalized_load,
+        "migrate": migrate,
+    }
+
+
+def _timed(fn) -> tuple:
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def bench_tracker(sizes: list, items: int, engines=("journal", "sqlite")) -> list:
+    """
+    Append and query cost of each tracker engine at each size: bulk
+    append_many() in 10k batches, single append() and update() latency, and
+    the pending scan, one client's pending scan, get() by letter id and due()
+    deadline query. The "sharded" engine is sharded by client, over journals.
+    """
+    rows = []
+    for engine in engines:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                name = {"sqlite": "dispute_tracker.db", "sharded": "dispute_tracker" + os.sep}
+                path = os.path.join(tmp, name.get(engine, "dispute_tracker.jsonl"))
+                tracker = open_dispute_tracker(path, engine)
+                records = sample_dispute_records(-(-size // 6), items)
+                start = time.perf_counter()
+                batch, appended = [], 0
+                for record in records:
+                    batch.append(record)
+                    if len(batch) == 10000:
+                        tracker.append_many(batch)
+                        appended += len(batch)
+                        batch = []
+                    if appended + len(batch) == size:
+                        break
+                tracker.append_many(batch)
+                tracker.sync()
+                bulk = time.perf_counter() - start
+
+                extra = list(sample_dispute_records(1000 // 6 + 1, items))[:1000]
+                for i, record in enumerate(extra):
+                    record["letter_id"] = f"ltr_extra{i:06d}"
+                _, single = _timed(lambda: [tracker.append(r) for r in extra] and tracker.sync())
+                _, update = _timed(lambda: [
+                    tracker.update(r["letter_id"], {"status": "delivered"}) for r in extra
+                ] and tracker.sync())
+
+                pending, scan = _timed(lambda: sum(1 for _ in tracker.iter_disputes({"status": "sent"})))
+                _, client_scan = _timed(
+                    lambda: sum(1 for _ in tracker.iter_disputes({"client_id": "cli_007", "status": "sent"}))
+                )
+                last = f"ltr_{(size - 1) // 6:07d}mtr"
+                _, get = _timed(lambda: tracker.get(last))
+                _, due_first = _timed(lambda: tracker.due("response_deadline", datetime(2026, 2, 20)))
+                due, due_again = _timed(lambda: tracker.due("response_deadline", datetime(2026, 2, 20)))
+                tracker.close()
+                rows.append({
+                    "engine": engine,
+                    "records": size,
+                    "bytes": sum(
+                        os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(tmp) for f in files
+                    ),
+                    "append_per_sec": size / bulk,
+                    "append_us": single / len(extra) * 1e6,
+                    "update_us": update / len(extra) * 1e6,
+                    "scan": scan,
+                    "pending": pending,
+                    "client_scan": client_scan,
+                    "get": get,
+                    "due_first": due_first,
+                    "due": due_again,
+                    "due_results": len(due),
+                })
+    return rows
+
+
+def _bench_client(mode: str, n: int) -> dict:
+    # Distinct per mode so no send is answered from the mock's idempotency cache
+    return dict(SAMPLE_CLIENT, name=f"{mode} client {n}")
+
+
+def bench_send(
+    clients: int,
+    items: int,
+    concurrency: int,
+    rate_limit: float = 0,
+    **faults,
+) -> dict:
+    """
+    End-to-end letters/sec through DisputeMailer against the local Lob mock
+    (faults: LobMockState's latency, jitter, error_rate, throttle_rate,
+    retry_after): send_to_all_bureaus() one bureau at a time and
+    concurrently, then run_campaign() of the same letters. The client-side
+    rate limit is lifted unless rate_limit (requests/sec) is given.
+    """
+    dispute_items = sample_items(items)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, LobMockServer(seed=1, **faults) as lob:
+        def mailer(mode: str) -> DisputeMailer:
+            m = DisputeMailer(
+                api_key="test_bench", base_url=lob.url,
+                log_path=os.path.join(tmp, f"{mode}.jsonl"), letter_cache=LetterCache(),
+            )
+            m.rate_limiter = TokenBucket(rate_limit or 1e9, int(rate_limit) or 10 ** 9)
+            return m
+
+        def run(mode: str, send) -> dict:
+            m = mailer(mode)
+            lob.state.reset_counters()
+            with redirect_stdout(io.StringIO()):
+                _, elapsed = _timed(lambda: send(m))
+            letters = sum(1 for _ in m.tracker.iter_disputes())
+            stats = m.connection_stats()
+            m.tracker.close()
+            return {
+                "letters": letters,
+                "elapsed": elapsed,
+                "letters_per_sec": letters / elapsed,
+                "requests": lob.state.requests,
+                "errors": lob.state.errors,
+                "throttled": lob.state.throttled,
+                "connections": stats["connections"],
+            }
+
+        def all_bureaus(concurrent: bool):
+            mode = "concurrent" if concurrent else "sequential"
+
+            def send(m: DisputeMailer):
+                for n in range(clients):
+                    m.send_to_all_bureaus(
+                        _bench_client(mode, n), "basic_bureau", dispute_items, concurrent=concurrent,
+                    )
+            return send
+
+        def campaign(m: DisputeMailer) -> dict:
+            jobs = (
+                {"client": _bench_client("campaign", n), "letter_type": "basic_bureau", "target": bureau,
+                 "dispute_items": dispute_items, "record": n + 1}
+                for n in range(clients) for bureau in BUREAU_ADDRESSES
+            )
+            return m.run_campaign(jobs, concurrency=concurrency)
+
+        results["send_to_all_bureaus"] = run("sequential", all_bureaus(False))
+        results["send_to_all_bureaus(concurrent)"] = run("concurrent", all_bureaus(True))
+        results[f"run_campaign(concurrency={concurrency})"] = run("campaign", campaign)
+    return results
+
+
+# Offline CLI actions that must start without requests or an API key
+STARTUP_ACTIONS = ("types", "pending", "overdue", "due")
+
+
+def bench_startup(runs: int, clients: int) -> dict:
+    """
+    Cold-start wall time of the offline CLI actions against a small tracker,
+    next to a bare interpreter, plus the modules each one imports
+    (python -X importtime). Actions run as python -m certified_mail, which
+    loads cached bytecode instead of recompiling the script on every launch.
+    """
+    scripts_dir = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = DisputeJournal(os.path.join(tmp, "dispute_tracker.jsonl"))
+        journal.append_many(list(sample_dispute_records(clients, 3)))
+        journal.close()
+        env = dict(os.environ, LOB_API_KEY="", DISPUTE_LOG_PATH=str(journal.path))
+        commands = {"python -c pass": [sys.executable, "-c", "pass"]}
+        commands.update((action, [sys.executable, "-m", "certified_mail", action]) for action in STARTUP_ACTIONS)
+        for name, command in commands.items():
+            times = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                subprocess.run(command, env=env, cwd=scripts_dir, capture_output=True, check=True)
+                times.append(time.perf_counter() - start)
+            trace = subprocess.run(
+                command[:1] + ["-X", "importtime"] + command[1:], env=env, cwd=scripts_dir,
+                capture_output=True, text=True,
+            ).stderr
+            modules = {
+                line.rsplit("|", 1)[1].strip()
+                for line in trace.splitlines() if line.startswith("import time:")
+            }
+            results[name] = {
+                "ms": statistics.median(times) * 1000,
+                "modules": len(modules),
+                "requests": "requests" in modules,
+            }
+    return results
+
+
+def bench_templates(letters: int, items: int) -> dict:
+    """
+    POST /letters request size and send time against the local Lob mock,
+    with letters sent as inline HTML vs as a stored template plus merge
+    variables. Every letter has a distinct date so the letter cache never
+    short-circuits a send; the template registry file is left untouched.
+    """
+    certified_mail.LOB_TEMPLATE_REGISTRY_PATH = ""
+    dispute_items = sample_items(items)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, LobMockServer() as lob:
+        for mode, use_templates in (("inline html", False), ("template", True)):
+            mailer = DisputeMailer(
+                api_key="test_bench", base_url=lob.url, use_templates=use_templates,
+                log_path=os.path.join(tmp, f"{mode}.jsonl"), letter_cache=LetterCache(),
+            )
+            mailer.rate_limiter = TokenBucket(1e9, 1e9)
+            if use_templates:
+                mailer.register_templates()
+            lob.state.reset_counters()
+            start = time.perf_counter()
+            for n in range(letters):
+                mailer.send_dispute(
+                    SAMPLE_CLIENT, "basic_bureau", "equifax", dispute_items,
+                    letter_date=(datetime(2026, 1, 1) + timedelta(days=n)).date(),
+                )
+            elapsed = time.perf_counter() - start
+            stats = lob.state.by_route["POST /letters"]
+            results[mode] = {
+                "requests": stats["requests"],
+                "bytes_per_letter": stats["bytes"] / stats["requests"],
+                "ms_per_letter": elapsed / letters * 1000,
+            }
+            mailer.tracker.close()
+    return results
+
+
+# ---------------------------------------------------------------------------
+# CLI INTERFACE
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the certified mail pipeline")
+    parser.add_argument("suite", choices=["render", "tracker", "send", "items", "startup", "templates"])
+    parser.add_argument("--letters", type=int, default=None,
+                        help="Letters rendered per type (render) or sent (templates)")
+    parser.add_argument("--items", type=int, default=3, help="Dispute items per letter")
+    parser.add_argument("--clients", type=int, default=None, help="Clients in the sample tracker (6 letters each)")
+    parser.add_argument("--runs", type=int, default=20, help="Process launches per startup measurement")
+    parser.add_argument("--records", default="10000,100000",
+                        help="tracker: comma-separated tracker sizes (e.g. 10000,100000,1000000)")
+    parser.add_argument("--engines", default="journal,sqlite",
+                        help="tracker: engines to measure (journal, sqlite, sharded)")
+    parser.add_argument("--concurrency", type=int, default=8, help="send: campaign concurrency")
+    parser.add_argument("--latency", type=float, default=0.05, help="send: mock Lob latency per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="send: ± jitter on --latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="send: fraction of mock 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="send: fraction of mock 429 responses")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="send: Retry-After sent with mock 429s")
+    parser.add_argument("--rate-limit", type=float, default=0, help="send: client rate limit, req/s (0 = off)")
+    args = parser.parse_args()
+
+    if args.suite == "render":
+        per_type = bench_render(args.letters or 20000, args.items)
+        print(f"\ngenerate_letter_html() — {args.letters or 20000} letters/type, {args.items} item(s) each:\n")
+        for letter_type, usec in per_type.items():
+            print(f"  {letter_type:30s} {usec:8.2f} µs/letter")
+        mean = sum(per_type.values()) / len(per_type)
+        print(f"\n  {'mean':30s} {mean:8.2f} µs/letter  ({1e6 / mean:,.0f} letters/sec)")
+
+    elif args.suite == "tracker":
+        sizes = [int(n) for n in args.records.split(",")]
+        rows = bench_tracker(sizes, args.items, tuple(args.engines.split(",")))
+        print(f"\nDispute tracker — {args.items} item(s) per dispute:\n")
+        print(f"  {'engine':8s} {'records':>9s} {'size':>9s} {'append_many':>13s} {'append':>9s} "
+              f"{'update':>9s} {'pending':>9s} {'1 client':>9s} {'get':>9s} {'due 1st':>9s} {'due':>9s}")
+        for r in rows:
+            print(f"  {r['engine']:8s} {r['records']:9,d} {r['bytes'] / 1e6:7.1f}MB {r['append_per_sec']:9,.0f}/sec "
+                  f"{r['append_us']:7.0f}µs {r['update_us']:7.0f}µs {r['scan']:8.3f}s {r['client_scan']:8.3f}s "
+                  f"{r['get']:8.3f}s "
+                  f"{r['due_first']:8.3f}s {r['due']:8.3f}s")
+
+    elif args.suite == "send":
+        clients = args.clients or 50
+        results = bench_send(
+            clients, args.items, args.concurrency, args.rate_limit, latency=args.latency, jitter=args.jitter,
+            error_rate=args.error_rate, throttle_rate=args.throttle_rate, retry_after=args.retry_after,
+        )
+        print(f"\nEnd-to-end against the local Lob mock — {clients} clients × 3 bureaus, "
+              f"{args.latency * 1000:.0f}ms latency, {args.error_rate:.0%} 500s, {args.throttle_rate:.0%} 429s:\n")
+        for mode, r in results.items():
+            print(f"  {mode:34s} {r['letters_per_sec']:8.1f} letters/sec  {r['requests']:5d} requests "
+                  f"({r['errors']} 500s, {r['throttled']} 429s) over {r['connections']} connection(s)")
+
+    elif args.suite == "items":
+        r = bench_items(args.clients or 20000, args.items)
+        print(f"\nDispute tracker — {r['records']:,} records, {args.items} item(s) per dispute:\n")
+        print(f"  {'':14s} {'size':>12s} {'load()':>10s}")
+        print(f"  {'inline items':14s} {r['inline_bytes'] / 1e6:9.1f} MB {r['inline_load']:9.2f}s")
+        print(f"  {'normalized':14s} {r['normalized_bytes'] / 1e6:9.1f} MB {r['normalized_load']:9.2f}s")
+        print(f"\n  {r['normalized_bytes'] / r['inline_bytes']:.0%} of the size, "
+              f"{r['normalized_load'] / r['inline_load']:.0%} of the load time "
+              f"(migration took {r['migrate']:.2f}s)")
+
+    elif args.suite == "startup":
+        results = bench_startup(args.runs, args.clients or 100)
+        print(f"\nCold start — median of {args.runs} launches, offline actions without LOB_API_KEY:\n")
+        for name, r in results.items():
+            note = "imports requests" if r["requests"] else ""
+            print(f"  {name:16s} {r['ms']:7.1f} ms  {r['modules']:4d} modules  {note}")
+
+    elif args.suite == "templates":
+        results = bench_templates(args.letters or 200, args.items)
+        print(f"\nSending to the local Lob mock — {args.letters or 200} letters, {args.items} item(s) each:\n")
+        for mode, r in results.items():
+            print(f"  {mode:12s} {r['bytes_per_letter']:9,.0f} bytes/request {r['ms_per_letter']:7.2f} ms/letter")
+        inline, template = results["inline html"], results["template"]
+        print(f"\n  template requests are {template['bytes_per_letter'] / inline['bytes_per_letter']:.0%} "
+              f"of the inline size")
@@ -6,6 +6,10 @@ Setup:
     pip install requests jinja2
     Set LOB_API_KEY env var (get from dashboard.lob.com)
 
+requests and the heavier stdlib modules are imported where they are used, so
+tracker-only actions (pending, overdue, due, types, ...) start without them and
+without an API key.
+
 Usage:
     from certified_mail import DisputeMailer
     mailer = DisputeMailer()
@@ -14,8 +18,13 @@ Usage:
 
 import os
 import json
-import requests
-from datetime import datetime, timedelta
+import atexit
+import bisect
+import string
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from collections import OrderedDict
 from pathlib import Path
 from typing import Optional
 
@@ -24,8 +33,60 @@ from typing import Optional
 # ---------------------------------------------------------------------------
 
 LOB_API_KEY = os.environ.get("LOB_API_KEY", "")
-LOB_BASE_URL = "https://api.lob.com/v1"
-DISPUTE_LOG_PATH = os.environ.get("DISPUTE_LOG_PATH", "dispute_tracker.json")
+LOB_BASE_URL = os.environ.get("LOB_BASE_URL", "https://api.lob.com/v1")
+DISPUTE_LOG_PATH = os.environ.get("DISPUTE_LOG_PATH", "dispute_tracker.jsonl")
+
+# Max parallel Lob requests when one dispute fans out to several targets
+FANOUT_MAX_WORKERS = 3
+
+# Default worker pool size for bulk campaigns
+CAMPAIGN_CONCURRENCY = 8
+
+# Client-side rate limit shared by all Lob calls (requests/sec and burst size)
+LOB_RATE_LIMIT = float(os.environ.get("LOB_RATE_LIMIT", "25"))
+LOB_RATE_BURST = int(os.environ.get("LOB_RATE_BURST", "25"))
+
+# Retries for 429/5xx/connection errors: jittered exponential backoff, honoring Retry-After
+LOB_MAX_RETRIES = 5
+LOB_BACKOFF_BASE = 0.5
+LOB_BACKOFF_MAX = 30.0
+
+# Keep-alive HTTP connections held per Lob host; grown to a campaign's or worker pool's
+# concurrency so concurrent sends reuse connections instead of opening (and TLS-handshaking) new ones
+LOB_POOL_SIZE = int(os.environ.get("LOB_POOL_SIZE", str(CAMPAIGN_CONCURRENCY)))
+
+# Per-call connect and read timeouts (seconds) so a hung socket fails and is retried
+LOB_CONNECT_TIMEOUT = float(os.environ.get("LOB_CONNECT_TIMEOUT", "5"))
+LOB_READ_TIMEOUT = float(os.environ.get("LOB_READ_TIMEOUT", "60"))
+
+# Extra connection-establishment retries inside the HTTP adapter (urllib3 Retry); these
+# are always safe since nothing was sent. 0 leaves all retrying to DisputeMailer._request
+LOB_CONNECT_RETRIES = int(os.environ.get("LOB_CONNECT_RETRIES", "0"))
+
+# Persistent /us_verifications cache (set ADDRESS_CACHE_PATH to "" to keep it in memory only)
+ADDRESS_CACHE_PATH = os.environ.get("ADDRESS_CACHE_PATH", "address_cache.jsonl")
+ADDRESS_CACHE_TTL_DAYS = float(os.environ.get("ADDRESS_CACHE_TTL_DAYS", "30"))
+ADDRESS_CACHE_MAX_ENTRIES = 10000
+
+# Addresses per /bulk/us_verifications request
+LOB_BULK_VERIFY_SIZE = 20
+
+# Rendered letters and the Lob letter ids they became, keyed by content hash
+# (set LETTER_CACHE_PATH to "" to keep it in memory only); evicted LRU past the byte budget
+LETTER_CACHE_PATH = os.environ.get("LETTER_CACHE_PATH", "letter_cache.jsonl")
+LETTER_CACHE_MAX_BYTES = int(os.environ.get("LETTER_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Send letters as a stored Lob template id plus merge_variables instead of full HTML
+# (templates are registered once per letter type; ids are kept in LOB_TEMPLATE_REGISTRY_PATH)
+LOB_USE_TEMPLATES = os.environ.get("LOB_USE_TEMPLATES", "").lower() in ("1", "true", "yes")
+LOB_TEMPLATE_REGISTRY_PATH = os.environ.get("LOB_TEMPLATE_REGISTRY_PATH", "lob_templates.json")
+
+# Durable send queue between the enqueue and worker actions (see LetterOutbox): a
+# worker's lease on a letter expires so another can take over if it dies, and a
+# failed send is retried with backoff until it has been attempted OUTBOX_MAX_ATTEMPTS times
+OUTBOX_PATH = os.environ.get("OUTBOX_PATH", "letter_outbox.db")
+OUTBOX_LEASE_SECONDS = 300
+OUTBOX_MAX_ATTEMPTS = 5
 
 # Test mode: set LOB_API_KEY to a test_ key to use Lob's sandbox (no real mail sent)
 IS_TEST = LOB_API_KEY.startswith("test_")
@@ -208,73 +269,83 @@ LETTER_TEMPLATES = {
 
 
 # ---------------------------------------------------------------------------
-# LETTER HTML GENERATOR
+# LETTER TEMPLATE REGISTRY
 # ---------------------------------------------------------------------------
 
-def generate_letter_html(
-    letter_type: str,
-    client: dict,
-    recipient: dict,
-    dispute_items: list,
-    extra_context: Optional[dict] = None,
-) -> str:
+class LetterTemplate:
     """
-    Generate a properly formatted HTML letter for Lob printing.
+    A letter fragment compiled once into literal text and named {field} slots.
 
-    Args:
-        letter_type: Key from LETTER_TEMPLATES
-        client: {name, address_line1, city, state, zip, ssn_last4, dob, email, phone}
-        recipient: {name, address_line1, city, state, zip}
-        dispute_items: List of dicts, each with: {account_name, account_number_last4, reason, details, supporting_docs}
-        extra_context: Optional dict for letter-specific fields
-            - original_dispute_date (for 611/method_of_verification)
-            - settlement_amount (for pay_for_delete/chargeoff)
-            - late_payment_month (for goodwill)
-            - company_relationship_since (for goodwill)
-            - statute_years (for SOL)
-            - violations (for intent_to_sue)
-            - deadline_days (for demand/intent)
+    Rendering copies the precompiled segments and fills in only the fields this
+    fragment references, so a letter never pays for formatting other bodies.
     """
-    template_info = LETTER_TEMPLATES.get(letter_type)
-    if not template_info:
-        raise ValueError(f"Unknown letter type: {letter_type}")
 
-    ctx = extra_context or {}
-    today = datetime.now().strftime("%B %d, %Y")
+    __slots__ = ("source", "fields", "_parts", "_slots")
 
-    # Build dispute items block
-    items_block = ""
-    for item in dispute_items:
-        items_block += f"""
-        <p style="margin-left: 20px;">
-            <strong>Account:</strong> {item.get('account_name', 'Unknown')}<br>
-            <strong>Account Number:</strong> XXXX-{item.get('account_number_last4', 'XXXX')}<br>
-            <strong>Reason for Dispute:</strong> {item.get('reason', 'Information is inaccurate')}<br>
-            <strong>Details:</strong> {item.get('details', '')}
-        </p>
+    def __init__(self, source: str):
+        self.source = source
+        self._parts = []
+        self._slots = []
+        for literal, field, _spec, _conversion in string.Formatter().parse(source):
+            if literal:
+                self._parts.append(literal)
+            if field is not None:
+                self._slots.append((len(self._parts), field))
+                self._parts.append("")
+        self.fields = tuple(dict.fromkeys(name for _, name in self._slots))
+
+    def render(self, values: dict) -> str:
+        """Fill the template from a dict holding every name in self.fields."""
+        parts = self._parts[:]
+        for index, name in self._slots:
+            parts[index] = values[name]
+        return "".join(parts)
+
+    def handlebars(self) -> str:
         """
+        The template in Lob's Handlebars syntax. Every field is merged raw
+        ({{{field}}}), as render() inserts it, so Lob prints identical letters;
+        that is safe because _letter_values() and _merge_variables() escape
+        every client-supplied value, and derived fields are HTML fragments.
+        """
+        parts = self._parts[:]
+        for index, name in self._slots:
+            parts[index] = "{{{" + name + "}}}"
+        return "".join(parts)
+
 
-    # Common header
-    header = f"""
+# Common header
+LETTER_HEADER = LetterTemplate("""
     <div style="font-family: 'Times New Roman', serif; font-size: 12pt; line-height: 1.6; max-width: 6.5in; margin: 0 auto;">
         <p>
-            {client['name']}<br>
-            {client['address_line1']}<br>
-            {client['city']}, {client['state']} {client['zip']}<br>
-            SSN (last 4): XXX-XX-{client.get('ssn_last4', 'XXXX')}<br>
-            DOB: {client.get('dob', '[DOB]')}
+            {client_name}<br>
+            {client_address_line1}<br>
+            {client_city}, {client_state} {client_zip}<br>
+            SSN (last 4): XXX-XX-{ssn_last4}<br>
+            DOB: {dob}
         </p>
         <p>{today}</p>
         <p>
-            {recipient['name']}<br>
-            {recipient['address_line1']}<br>
-            {recipient.get('address_city', recipient.get('city', ''))}, {recipient.get('address_state', recipient.get('state', ''))} {recipient.get('address_zip', recipient.get('zip', ''))}
+            {recipient_name}<br>
+            {recipient_address_line1}<br>
+            {recipient_city}, {recipient_state} {recipient_zip}
         </p>
-    """
+    """)
+
+# Common footer
+LETTER_FOOTER = LetterTemplate("""
+        <p>Sincerely,</p>
+        <br><br>
+        <p>{client_name}</p>
+        <p style="font-size: 10pt; color: #666; margin-top: 30px;">
+            <em>SENT VIA USPS CERTIFIED MAIL — RETURN RECEIPT REQUESTED</em>
+        </p>
+    </div>
+    """)
 
-    # Letter body varies by type
-    bodies = {
-        "basic_bureau": f"""
+# Letter body varies by type — keyed like LETTER_TEMPLATES
+LETTER_BODIES = {
+    "basic_bureau": LetterTemplate("""
             <p><strong>RE: Dispute of Inaccurate Information</strong></p>
             <p>Dear Sir/Madam:</p>
             <p>Pursuant to my rights under the Fair Credit Reporting Act, 15 U.S.C. § 1681i,
@@ -285,8 +356,8 @@ def generate_letter_html(
             information within 30 days as required by law.</p>
             <p>Please provide written confirmation of the results of your investigation and a
             free copy of my updated credit report.</p>
-        """,
-        "609_verification": f"""
+        """),
+    "609_verification": LetterTemplate("""
             <p><strong>RE: Request for Disclosure Under FCRA § 609</strong></p>
             <p>Dear Sir/Madam:</p>
             <p>Pursuant to my rights under the Fair Credit Reporting Act, 15 U.S.C. § 1681g,
@@ -301,11 +372,11 @@ def generate_letter_html(
             <p>I request that you provide documentation verifying the accuracy of this account,
             including any original signed agreement bearing my signature that was used to validate
             this information.</p>
-        """,
-        "611_reinvestigation": f"""
+        """),
+    "611_reinvestigation": LetterTemplate("""
             <p><strong>RE: Demand for Reinvestigation Under FCRA § 611</strong></p>
             <p>Dear Sir/Madam:</p>
-            <p>On {ctx.get('original_dispute_date', '[DATE]')}, I submitted a dispute regarding
+            <p>On {original_dispute_date}, I submitted a dispute regarding
             the following account(s):</p>
             {items_block}
             <p>You responded that the information was "verified." Pursuant to FCRA § 611(a)(6)(B)(iii),
@@ -321,14 +392,14 @@ def generate_letter_html(
             <p>If you cannot provide this information within 15 days, I will consider filing a
             complaint with the Consumer Financial Protection Bureau and consulting with an
             FCRA attorney.</p>
-        """,
-        "method_of_verification": f"""
+        """),
+    "method_of_verification": LetterTemplate("""
             <p><strong>RE: Request for Method of Verification</strong></p>
             <p>Dear Sir/Madam:</p>
             <p>I previously disputed the following account(s) and received notification that
             the information was verified:</p>
             {items_block}
-            <p>Date of Original Dispute: {ctx.get('original_dispute_date', '[DATE]')}</p>
+            <p>Date of Original Dispute: {original_dispute_date}</p>
             <p>Pursuant to FCRA § 611(a)(6)(B)(iii), I am formally requesting the method of
             verification used. Specifically:</p>
             <ol>
@@ -338,8 +409,8 @@ def generate_letter_html(
             </ol>
             <p>If a reasonable method of verification cannot be provided, this account must be
             deleted from my credit file.</p>
-        """,
-        "identity_theft": f"""
+        """),
+    "identity_theft": LetterTemplate("""
             <p><strong>RE: Identity Theft — Request for Block Under FCRA § 605B</strong></p>
             <p>Dear Sir/Madam:</p>
             <p>I am a victim of identity theft. The following account(s) were opened fraudulently
@@ -350,15 +421,15 @@ def generate_letter_html(
             <p>Enclosed:</p>
             <ol>
                 <li>FTC Identity Theft Affidavit (completed)</li>
-                <li>Police report (case number: {ctx.get('police_case_number', '[CASE #]')})</li>
+                <li>Police report (case number: {police_case_number})</li>
                 <li>Copy of government-issued photo ID</li>
                 <li>Proof of address</li>
             </ol>
             <p>I also request a fraud alert be placed on my file and that you notify the other
             two nationwide credit bureaus.</p>
-        """,
-        "debt_validation": f"""
-            <p><strong>RE: Debt Validation Request — {dispute_items[0].get('account_name', 'Account') if dispute_items else 'Account'}</strong></p>
+        """),
+    "debt_validation": LetterTemplate("""
+            <p><strong>RE: Debt Validation Request — {first_account_name}</strong></p>
             <p>Dear Sir/Madam:</p>
             <p>I am writing in response to your communication regarding the above-referenced
             account.</p>
@@ -379,8 +450,8 @@ def generate_letter_html(
             </ul>
             <p>This is not a refusal to pay, but a request for verification as provided by
             federal law.</p>
-        """,
-        "cease_desist": f"""
+        """),
+    "cease_desist": LetterTemplate("""
             <p><strong>RE: Cease and Desist Communication</strong></p>
             <p>Dear Sir/Madam:</p>
             <p>Pursuant to my rights under the Fair Debt Collection Practices Act, 15 U.S.C.
@@ -392,13 +463,13 @@ def generate_letter_html(
             constitutes a violation of the FDCPA.</p>
             <p>I understand you may still pursue legal remedies. This letter pertains solely
             to direct communication.</p>
-        """,
-        "pay_for_delete": f"""
+        """),
+    "pay_for_delete": LetterTemplate("""
             <p><strong>RE: Settlement Offer</strong></p>
             <p>Dear Sir/Madam:</p>
             <p>I am writing regarding the above-referenced account with an alleged balance.</p>
             {items_block}
-            <p>I am prepared to pay ${ctx.get('settlement_amount', '[AMOUNT]')} in exchange for
+            <p>I am prepared to pay ${settlement_amount} in exchange for
             the complete removal of this account from my credit reports with all three major
             credit bureaus (Equifax, Experian, and TransUnion).</p>
             <p>This offer is conditional upon your written agreement to:</p>
@@ -412,22 +483,22 @@ def generate_letter_html(
             Payment will be made within 15 days of receiving your written agreement.</p>
             <p>This letter is not an acknowledgment of the validity of this debt, nor is it a
             promise to pay absent your written agreement to the terms above.</p>
-        """,
-        "goodwill": f"""
+        """),
+    "goodwill": LetterTemplate("""
             <p><strong>RE: Goodwill Adjustment Request</strong></p>
             <p>Dear Sir/Madam:</p>
-            <p>I have been a loyal customer of your company since {ctx.get('relationship_since', '[YEAR]')}.
+            <p>I have been a loyal customer of your company since {relationship_since}.
             I am writing to respectfully request a goodwill adjustment to remove the late payment
-            reported on my account for {ctx.get('late_payment_month', '[MONTH/YEAR]')}.</p>
+            reported on my account for {late_payment_month}.</p>
             {items_block}
-            <p>{ctx.get('explanation', 'Due to an unforeseen circumstance, I was unable to make my payment on time. Since that time, I have maintained a perfect payment record.')}</p>
+            <p>{explanation}</p>
             <p>This late payment is significantly impacting my ability to
-            {ctx.get('credit_goal', 'qualify for favorable credit terms')}.</p>
+            {credit_goal}.</p>
             <p>I understand this is a courtesy and not an obligation, but I would greatly
             appreciate your consideration.</p>
             <p>Thank you for your time.</p>
-        """,
-        "direct_creditor": f"""
+        """),
+    "direct_creditor": LetterTemplate("""
             <p><strong>RE: Direct Dispute of Reported Information</strong></p>
             <p>Dear Sir/Madam:</p>
             <p>Pursuant to FCRA § 1681s-2(b), I am directly disputing the accuracy of
@@ -442,14 +513,14 @@ def generate_letter_html(
                 <li>Report the results to the credit bureau</li>
                 <li>Modify, delete, or permanently block reporting if inaccurate</li>
             </ol>
-        """,
-        "chargeoff_removal": f"""
+        """),
+    "chargeoff_removal": LetterTemplate("""
             <p><strong>RE: Charge-Off Settlement and Removal</strong></p>
             <p>Dear Sir/Madam:</p>
             <p>I am writing regarding the following account(s), currently reported as charge-off(s):</p>
             {items_block}
             <p>I would like to resolve this account and am prepared to pay
-            ${ctx.get('settlement_amount', '[AMOUNT]')}. In exchange, I request that you agree to:</p>
+            ${settlement_amount}. In exchange, I request that you agree to:</p>
             <ol>
                 <li>Remove the charge-off designation from my credit reports with all three bureaus</li>
                 <li>Report the account as "paid in full" and "account closed" OR delete the trade
@@ -457,8 +528,8 @@ def generate_letter_html(
                 <li>Provide written confirmation of these terms before payment</li>
             </ol>
             <p>Please respond in writing with your agreement to these terms.</p>
-        """,
-        "unauthorized_inquiry": f"""
+        """),
+    "unauthorized_inquiry": LetterTemplate("""
             <p><strong>RE: Unauthorized Credit Inquiry</strong></p>
             <p>Dear Sir/Madam:</p>
             <p>I have reviewed my credit report and identified the following unauthorized
@@ -474,8 +545,8 @@ def generate_letter_html(
                 <li>Remove them from my credit report</li>
                 <li>Provide me with the contact information for the inquiring companies</li>
             </ol>
-        """,
-        "hipaa_medical": f"""
+        """),
+    "hipaa_medical": LetterTemplate("""
             <p><strong>RE: Medical Debt Dispute</strong></p>
             <p>Dear Sir/Madam:</p>
             <p>I am disputing the following medical collection(s):</p>
@@ -498,15 +569,15 @@ def generate_letter_html(
             authorization. If you cannot provide a valid HIPAA authorization bearing my signature,
             you are in possession of my PHI illegally and must cease collection and delete any
             credit reporting immediately.</p>
-        """,
-        "statute_of_limitations": f"""
+        """),
+    "statute_of_limitations": LetterTemplate("""
             <p><strong>RE: Time-Barred Debt</strong></p>
             <p>Dear Sir/Madam:</p>
             <p>I am writing in response to your communication regarding the above-referenced
             account(s).</p>
             {items_block}
             <p>Please be advised that the alleged debt referenced in your communication is beyond
-            the statute of limitations in my state, which is {ctx.get('statute_years', '[X]')} years
+            the statute of limitations in my state, which is {statute_years} years
             for this type of debt.</p>
             <p>Under state law, this debt is time-barred and legally unenforceable through the courts.
             Any attempt to collect on a time-barred debt or to threaten legal action constitutes
@@ -519,8 +590,8 @@ def generate_letter_html(
             </ol>
             <p><strong>Nothing in this letter constitutes an acknowledgment of this debt or a
             promise to pay.</strong></p>
-        """,
-        "intent_to_sue": f"""
+        """),
+    "intent_to_sue": LetterTemplate("""
             <p><strong>RE: Notice of Intent to Sue — FCRA/FDCPA Violations</strong></p>
             <p>Dear Sir/Madam:</p>
             <p>This letter serves as formal notice of my intent to pursue legal action against
@@ -528,14 +599,14 @@ def generate_letter_html(
             Collection Practices Act.</p>
             <p>Specifically, you have:</p>
             <ul>
-                {''.join(f'<li>{v}</li>' for v in ctx.get('violations', ['[LIST VIOLATIONS]']))}
+                {violations_list}
             </ul>
             <p>I have documentation of these violations, each carrying statutory damages of
             $100–$1,000 under § 1681n, plus actual damages, attorney's fees, and punitive damages.</p>
-            <p>I am providing you with {ctx.get('deadline_days', '30')} days to resolve this matter.
+            <p>I am providing you with {deadline_days} days to resolve this matter.
             If not resolved by that date, I will retain legal counsel and pursue all available remedies.</p>
-        """,
-        "arbitration_election": f"""
+        """),
+    "arbitration_election": LetterTemplate("""
             <p><strong>RE: Election of Arbitration</strong></p>
             <p>Dear Sir/Madam:</p>
             <p>Pursuant to the arbitration clause in the agreement governing the following
@@ -546,8 +617,8 @@ def generate_letter_html(
             I may initiate proceedings.</p>
             <p>As outlined in the agreement, your company is responsible for paying the
             arbitration filing and administration fees.</p>
-        """,
-        "billing_error": f"""
+        """),
+    "billing_error": LetterTemplate("""
             <p><strong>RE: Billing Error Notice Under FCBA</strong></p>
             <p>Dear Sir/Madam:</p>
             <p>Pursuant to the Fair Credit Billing Act, 15 U.S.C. § 1666, I am writing to
@@ -562,319 +633,4138 @@ def generate_letter_html(
             <p>Under the FCBA, you must acknowledge this dispute within 30 days and resolve
             it within two billing cycles (not exceeding 90 days). During the investigation,
             you may not attempt to collect the disputed amount or report it as delinquent.</p>
-        """,
-        "breach_of_contract": f"""
+        """),
+    "breach_of_contract": LetterTemplate("""
             <p><strong>RE: Notice of Breach of Contract</strong></p>
             <p>Dear Sir/Madam:</p>
             <p>This letter serves as formal notice that your company is in breach of the
             agreement between us.</p>
             <p>Specifically, the following terms have been violated:</p>
             {items_block}
-            <p>I am providing you with {ctx.get('deadline_days', '30')} days to cure this breach.
+            <p>I am providing you with {deadline_days} days to cure this breach.
             If the breach is not cured within the specified period, I will pursue all available
             legal remedies, including but not limited to damages, specific performance, and
             attorney's fees as provided in the agreement.</p>
-        """,
-        "demand_letter": f"""
+        """),
+    "demand_letter": LetterTemplate("""
             <p><strong>RE: Formal Demand</strong></p>
             <p>Dear Sir/Madam:</p>
-            <p>This letter constitutes a formal demand for {ctx.get('demand_action', 'resolution of the following matter')}.</p>
+            <p>This letter constitutes a formal demand for {demand_action}.</p>
             {items_block}
-            <p>You are hereby demanded to take the above action within {ctx.get('deadline_days', '30')} days
+            <p>You are hereby demanded to take the above action within {deadline_days} days
             of receipt of this letter.</p>
             <p>If this matter is not resolved by that date, I will pursue all available legal
             remedies without further notice, including filing suit for the amount owed plus
             court costs, interest, and attorney's fees as applicable.</p>
             <p><em>This letter is sent without prejudice to any of my rights and remedies,
             all of which are expressly reserved.</em></p>
-        """,
-    }
+        """),
+}
 
-    body = bodies.get(letter_type, bodies["basic_bureau"])
+# Full documents, compiled once per letter type at import
+LETTER_DOCUMENTS = {
+    letter_type: LetterTemplate(
+        "<html><body>" + LETTER_HEADER.source + body.source + LETTER_FOOTER.source + "</body></html>"
+    )
+    for letter_type, body in LETTER_BODIES.items()
+}
 
-    # Common footer
-    footer = f"""
-        <p>Sincerely,</p>
-        <br><br>
-        <p>{client['name']}</p>
-        <p style="font-size: 10pt; color: #666; margin-top: 30px;">
-            <em>SENT VIA USPS CERTIFIED MAIL — RETURN RECEIPT REQUESTED</em>
-        </p>
-    </div>
-    """
+# Placeholder printed when a letter-specific extra_context field is missing
+EXTRA_CONTEXT_DEFAULTS = {
+    "original_dispute_date": "[DATE]",
+    "police_case_number": "[CASE #]",
+    "settlement_amount": "[AMOUNT]",
+    "relationship_since": "[YEAR]",
+    "late_payment_month": "[MONTH/YEAR]",
+    "explanation": (
+        "Due to an unforeseen circumstance, I was unable to make my payment on time. "
+        "Since that time, I have maintained a perfect payment record."
+    ),
+    "credit_goal": "qualify for favorable credit terms",
+    "statute_years": "[X]",
+    "deadline_days": "30",
+    "demand_action": "resolution of the following matter",
+}
 
-    return f"<html><body>{header}{body}{footer}</body></html>"
 
+def _text(value) -> str:
+    """A client-supplied value as HTML text (letter fields are merged into the HTML unescaped)."""
+    from html import escape
 
-# ---------------------------------------------------------------------------
-# LOB API INTEGRATION
-# ---------------------------------------------------------------------------
+    return escape(str(value))
 
-class DisputeMailer:
-    """Send certified dispute letters via Lob API."""
 
-    def __init__(self, api_key: str = None):
-        self.api_key = api_key or LOB_API_KEY
-        if not self.api_key:
-            raise ValueError(
-                "LOB_API_KEY not set. Get one at dashboard.lob.com and set the env var."
-            )
-        self.session = requests.Session()
-        self.session.auth = (self.api_key, "")
+def _items_block(dispute_items: list, ctx: dict) -> str:
+    items_block = ""
+    for item in dispute_items:
+        items_block += f"""
+        <p style="margin-left: 20px;">
+            <strong>Account:</strong> {_text(item.get('account_name', 'Unknown'))}<br>
+            <strong>Account Number:</strong> XXXX-{_text(item.get('account_number_last4', 'XXXX'))}<br>
+            <strong>Reason for Dispute:</strong> {_text(item.get('reason', 'Information is inaccurate'))}<br>
+            <strong>Details:</strong> {_text(item.get('details', ''))}
+        </p>
+        """
+    return items_block
 
-    # -- Address Verification -----------------------------------------------
 
-    def verify_address(self, address: dict) -> dict:
-        """Verify a US address via Lob's Address Verification API."""
-        resp = self.session.post(
-            f"{LOB_BASE_URL}/us_verifications",
-            json={
-                "primary_line": address.get("address_line1", ""),
-                "city": address.get("address_city", address.get("city", "")),
-                "state": address.get("address_state", address.get("state", "")),
-                "zip_code": address.get("address_zip", address.get("zip", "")),
-            },
-        )
-        result = resp.json()
-        return result
+def _first_account_name(dispute_items: list, ctx: dict) -> str:
+    return _text(dispute_items[0].get("account_name", "Account")) if dispute_items else "Account"
 
-    # -- Send Letter --------------------------------------------------------
 
-    def send_letter(
-        self,
-        from_address: dict,
-        to_address: dict,
-        letter_html: str,
-        description: str = "Dispute Letter",
-        certified: bool = True,
-        return_receipt: bool = True,
-        color: bool = False,
-    ) -> dict:
-        """
-        Send a physical letter via Lob.
+def _violations_list(dispute_items: list, ctx: dict) -> str:
+    return "".join(f"<li>{_text(v)}</li>" for v in ctx.get("violations", ["[LIST VIOLATIONS]"]))
 
-        Args:
-            from_address: {name, address_line1, address_city, address_state, address_zip}
-            to_address: same format
-            letter_html: HTML content of the letter
-            description: Internal description for tracking
-            certified: Send as USPS Certified Mail
-            return_receipt: Include return receipt (green card)
-            color: Print in color (costs more)
-        """
-        data = {
-            "description": description,
-            "to[name]": to_address["name"],
-            "to[address_line1]": to_address["address_line1"],
-            "to[address_city]": to_address.get("address_city", to_address.get("city", "")),
-            "to[address_state]": to_address.get("address_state", to_address.get("state", "")),
-            "to[address_zip]": to_address.get("address_zip", to_address.get("zip", "")),
-            "from[name]": from_address["name"],
-            "from[address_line1]": from_address["address_line1"],
-            "from[address_city]": from_address.get("address_city", from_address.get("city", "")),
-            "from[address_state]": from_address.get("address_state", from_address.get("state", "")),
-            "from[address_zip]": from_address.get("address_zip", from_address.get("zip", "")),
-            "file": letter_html,
-            "color": str(color).lower(),
-            "mail_type": "usps_first_class",
-            "address_placement": "top_first_page",
-        }
 
-        if certified and return_receipt:
-            data["extra_service"] = "certified_return_receipt"
-        elif certified:
-            data["extra_service"] = "certified"
+# Body fields computed from the dispute items rather than read from extra_context
+DERIVED_FIELDS = {
+    "items_block": _items_block,
+    "first_account_name": _first_account_name,
+    "violations_list": _violations_list,
+}
 
-        resp = self.session.post(f"{LOB_BASE_URL}/letters", data=data)
+_letter_date_cache = (None, "")
 
-        if resp.status_code != 200:
-            raise Exception(f"Lob API error {resp.status_code}: {resp.text}")
 
-        return resp.json()
+def _letter_date(letter_date=None) -> str:
+    """
+    Date as printed on letters: letter_date (a date, or text used as is) when a
+    campaign pins one, otherwise today — strftime runs once per day, not per letter.
+    """
+    global _letter_date_cache
+    if isinstance(letter_date, str):
+        return letter_date
+    if letter_date is not None:
+        return letter_date.strftime("%B %d, %Y")
+    today = datetime.now().date()
+    if _letter_date_cache[0] != today:
+        _letter_date_cache = (today, today.strftime("%B %d, %Y"))
+    return _letter_date_cache[1]
 
-    # -- High-Level Dispute Sender ------------------------------------------
 
-    def send_dispute(
-        self,
-        client: dict,
-        letter_type: str,
-        target: str,
-        dispute_items: list,
-        custom_recipient: Optional[dict] = None,
-        extra_context: Optional[dict] = None,
-    ) -> dict:
-        """
-        Full dispute pipeline: generate letter → verify addresses → send certified → log.
+# ---------------------------------------------------------------------------
+# LETTER HTML GENERATOR
+# ---------------------------------------------------------------------------
 
-        Args:
-            client: {name, address_line1, city, state, zip, ssn_last4, dob}
-            letter_type: Key from LETTER_TEMPLATES (e.g., "basic_bureau", "debt_validation")
-            target: "equifax" | "experian" | "transunion" | or custom
-            dispute_items: [{account_name, account_number_last4, reason, details}]
-            custom_recipient: Override recipient address (for collectors/creditors)
-            extra_context: Letter-specific fields (see generate_letter_html docstring)
+def generate_letter_html(
+    letter_type: str,
+    client: dict,
+    recipient: dict,
+    dispute_items: list,
+    extra_context: Optional[dict] = None,
+    letter_date=None,
+) -> str:
+    """
+    Generate a properly formatted HTML letter for Lob printing.
 
-        Returns:
-            Tracking dict with letter_id, tracking_number, deadlines, etc.
-        """
-        template_info = LETTER_TEMPLATES.get(letter_type)
-        if not template_info:
-            raise ValueError(f"Unknown letter type: {letter_type}. Options: {list(LETTER_TEMPLATES.keys())}")
+    Args:
+        letter_type: Key from LETTER_TEMPLATES
+        client: {name, address_line1, city, state, zip, ssn_last4, dob, email, phone}
+        recipient: {name, address_line1, city, state, zip}
+        dispute_items: List of dicts, each with: {account_name, account_number_last4, reason, details, supporting_docs}
+        extra_context: Optional dict for letter-specific fields
+            - original_dispute_date (for 611/method_of_verification)
+            - settlement_amount (for pay_for_delete/chargeoff)
+            - late_payment_month (for goodwill)
+            - company_relationship_since (for goodwill)
+            - statute_years (for SOL)
+            - violations (for intent_to_sue)
+            - deadline_days (for demand/intent)
+        letter_date: Date printed on the letter (a date or preformatted text;
+            default today) — pin it to make re-renders byte-identical
+    """
+    template_info = LETTER_TEMPLATES.get(letter_type)
+    if not template_info:
+        raise ValueError(f"Unknown letter type: {letter_type}")
 
-        # Determine recipient
-        if custom_recipient:
-            recipient = custom_recipient
-        elif target in BUREAU_ADDRESSES:
-            recipient = BUREAU_ADDRESSES[target]
-        else:
-            raise ValueError(
-                f"Target '{target}' not found. Use 'equifax', 'experian', 'transunion', "
-                f"or provide custom_recipient dict."
-            )
+    values = _letter_values(letter_type, client, dispute_items, extra_context, letter_date)
+    return _render_letter(letter_type, values, recipient)
 
-        # Normalize client address for Lob
-        from_address = {
-            "name": client["name"],
-            "address_line1": client.get("address_line1", client.get("address", "")),
-            "address_city": client.get("address_city", client.get("city", "")),
-            "address_state": client.get("address_state", client.get("state", "")),
-            "address_zip": client.get("address_zip", client.get("zip", "")),
-        }
 
-        # Generate letter HTML
-        letter_html = generate_letter_html(
-            letter_type=letter_type,
-            client=client,
-            recipient=recipient,
-            dispute_items=dispute_items,
-            extra_context=extra_context,
-        )
+# Header fields that differ per recipient; everything else is shared by every copy of a letter
+RECIPIENT_FIELDS = (
+    "recipient_name",
+    "recipient_address_line1",
+    "recipient_city",
+    "recipient_state",
+    "recipient_zip",
+)
 
-        # Send via Lob
-        description = f"Credit Dispute #{template_info['id']} - {template_info['name']} - {target}"
-        result = self.send_letter(
-            from_address=from_address,
-            to_address=recipient,
-            letter_html=letter_html,
-            description=description,
-        )
 
-        # Build tracking record
-        now = datetime.now()
-        tracking = {
-            "letter_id": result.get("id"),
-            "tracking_number": result.get("tracking_number"),
-            "carrier": result.get("carrier", "USPS"),
-            "expected_delivery": result.get("expected_delivery_date"),
-            "letter_type": letter_type,
-            "letter_name": template_info["name"],
-            "legal_basis": template_info["legal_basis"],
-            "target": target,
-            "recipient_name": recipient["name"],
-            "sent_date": now.isoformat(),
-            "response_deadline": (now + timedelta(days=30)).isoformat(),
-            "escalation_date": (now + timedelta(days=35)).isoformat(),
-            "status": "sent",
-            "items_disputed": dispute_items,
-            "lob_url": result.get("url"),
-            "thumbnail": result.get("thumbnails", [{}])[0].get("large") if result.get("thumbnails") else None,
-            "cost": result.get("price"),
-            "is_test": IS_TEST,
-        }
+def _letter_values(
+    letter_type: str,
+    client: dict,
+    dispute_items: list,
+    extra_context: Optional[dict] = None,
+    letter_date=None,
+) -> dict:
+    """Every field of a letter except the recipient block, computed once per letter and HTML-escaped."""
+    ctx = extra_context or {}
+    document = LETTER_DOCUMENTS.get(letter_type, LETTER_DOCUMENTS["basic_bureau"])
 
-        # Log to tracker
-        self._log_dispute(tracking)
+    values = {
+        "today": _text(_letter_date(letter_date)),
+        "client_name": _text(client["name"]),
+        "client_address_line1": _text(client["address_line1"]),
+        "client_city": _text(client["city"]),
+        "client_state": _text(client["state"]),
+        "client_zip": _text(client["zip"]),
+        "ssn_last4": _text(client.get("ssn_last4", "XXXX")),
+        "dob": _text(client.get("dob", "[DOB]")),
+    }
 
-        return tracking
+    # Only the selected letter's own fields are computed
+    for name in document.fields:
+        if name in values or name in RECIPIENT_FIELDS:
+            continue
+        derive = DERIVED_FIELDS.get(name)
+        if derive:
+            values[name] = derive(dispute_items, ctx)
+        else:
+            values[name] = _text(ctx.get(name, EXTRA_CONTEXT_DEFAULTS.get(name, "")))
 
-    # -- Batch Send (all 3 bureaus) -----------------------------------------
+    return values
 
-    def send_to_all_bureaus(
-        self,
-        client: dict,
-        letter_type: str,
-        dispute_items: list,
-        extra_context: Optional[dict] = None,
-    ) -> list:
-        """Send the same dispute letter to all 3 credit bureaus."""
-        results = []
-        for bureau in ["equifax", "experian", "transunion"]:
-            result = self.send_dispute(
-                client=client,
-                letter_type=letter_type,
-                target=bureau,
-                dispute_items=dispute_items,
-                extra_context=extra_context,
-            )
-            results.append(result)
-            print(f"  ✓ Sent to {bureau}: {result.get('letter_id')} (tracking: {result.get('tracking_number')})")
-        return results
 
-    # -- Dispute Tracker ----------------------------------------------------
+def _merge_variables(values: dict, recipient: dict) -> dict:
+    """Every field of one letter: _letter_values() output plus the recipient block, HTML-escaped."""
+    return {
+        **values,
+        "recipient_name": _text(recipient["name"]),
+        "recipient_address_line1": _text(recipient["address_line1"]),
+        "recipient_city": _text(recipient.get("address_city", recipient.get("city", ""))),
+        "recipient_state": _text(recipient.get("address_state", recipient.get("state", ""))),
+        "recipient_zip": _text(recipient.get("address_zip", recipient.get("zip", ""))),
+    }
 
-    def _log_dispute(self, tracking: dict):
-        """Append tracking record to local JSON log."""
-        log_path = Path(DISPUTE_LOG_PATH)
-        if log_path.exists():
-            with open(log_path) as f:
-                log = json.load(f)
-        else:
-            log = {"disputes": []}
 
-        log["disputes"].append(tracking)
+def _render_letter(letter_type: str, values: dict, recipient: dict) -> str:
+    """Render a letter from _letter_values() output addressed to one recipient."""
+    document = LETTER_DOCUMENTS.get(letter_type, LETTER_DOCUMENTS["basic_bureau"])
+    return document.render(_merge_variables(values, recipient))
 
-        with open(log_path, "w") as f:
-            json.dump(log, f, indent=2, default=str)
 
-    def get_pending_disputes(self) -> list:
-        """Get all disputes awaiting response (past sent, not yet resolved)."""
-        log_path = Path(DISPUTE_LOG_PATH)
-        if not log_path.exists():
-            return []
+def lob_template_description(letter_type: str) -> str:
+    """
+    Description a letter type's stored Lob template is registered under; it ends
+    in a hash of the template source, so editing a template registers a new one.
+    """
+    import hashlib
 
-        with open(log_path) as f:
-            log = json.load(f)
+    document = LETTER_DOCUMENTS.get(letter_type, LETTER_DOCUMENTS["basic_bureau"])
+    version = hashlib.sha256(document.handlebars().encode("utf-8")).hexdigest()[:12]
+    return f"Credit Architect {letter_type} {version}"
 
-        now = datetime.now()
-        pending = []
-        for d in log.get("disputes", []):
-            if d["status"] in ("sent", "delivered"):
-                deadline = datetime.fromisoformat(d["response_deadline"])
-                d["days_remaining"] = (deadline - now).days
-                d["overdue"] = d["days_remaining"] < 0
-                pending.append(d)
 
-        return sorted(pending, key=lambda x: x["days_remaining"])
+def letter_content_key(
+    letter_type: str,
+    client: dict,
+    recipient: dict,
+    dispute_items: list,
+    extra_context: Optional[dict] = None,
+    letter_date=None,
+) -> str:
+    """
+    Content address of a rendered letter: a hash of every generate_letter_html()
+    input, with the printed date resolved, so equal keys mean byte-identical HTML.
+    """
+    import hashlib
 
-    def get_overdue_disputes(self) -> list:
-        """Get disputes past the 30-day response deadline — ready for escalation."""
-        return [d for d in self.get_pending_disputes() if d.get("overdue")]
+    canonical = json.dumps(
+        [letter_type, client, recipient, dispute_items, extra_context or {}, _letter_date(letter_date)],
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
 
-    def update_dispute_status(self, letter_id: str, status: str, notes: str = ""):
-        """Update a dispute's status (delivered, resolved, escalated, deleted)."""
-        log_path = Path(DISPUTE_LOG_PATH)
-        if not log_path.exists():
-            return
 
-        with open(log_path) as f:
-            log = json.load(f)
+# ---------------------------------------------------------------------------
+# DISPUTE TRACKER STORAGE
+# ---------------------------------------------------------------------------
 
-        for d in log.get("disputes", []):
-            if d["letter_id"] == letter_id:
-                d["status"] = status
-                d["updated_at"] = datetime.now().isoformat()
-                if notes:
-                    d["notes"] = notes
-                break
+# First line of every journal file; anything else is a legacy {"disputes": [...]} tracker
+# (version 2 stores dispute items once as {"op": "item"} lines; older journals are upgraded on open)
+JOURNAL_HEADER = {"op": "header", "format": "dispute-journal", "version": 2}
 
-        with open(log_path, "w") as f:
-            json.dump(log, f, indent=2, default=str)
+# fsync after this many journal writes (every write is still flushed to the OS); concurrent
+# writers are group-committed, so one flush and fsync can cover many threads' writes
+JOURNAL_SYNC_EVERY = 32
 
-    # -- Check Lob Letter Status --------------------------------------------
+# Compact once a read finds more update lines than this; reads hold pending
+# update fields in memory, so this also caps tracker read memory
+JOURNAL_COMPACT_MIN = 10000
 
-    def check_delivery_status(self, letter_id: str) -> dict:
-        """Check the current delivery status of a sent letter."""
-        resp = self.session.get(f"{LOB_BASE_URL}/letters/{letter_id}")
+# Statuses still awaiting a response from the bureau/collector
+PENDING_STATUSES = ("sent", "delivered")
+
+# Lob tracking event name → tracker status it moves a letter to
+TRACKING_EVENT_STATUSES = {
+    "Delivered": "delivered",
+    "Returned to Sender": "returned",
+}
+
+# Tracker statuses each status may be advanced to by delivery tracking;
+# manual statuses (resolved, escalated, deleted, ...) are never overwritten.
+# Only PENDING_STATUSES appear as keys (see pending_status())
+DELIVERY_TRANSITIONS = {
+    "sent": ("delivered", "returned"),
+    "delivered": ("returned",),
+}
+
+
+# Lob webhook event type → tracker status it moves a letter to
+WEBHOOK_EVENT_STATUSES = {
+    "letter.delivered": "delivered",
+    "letter.certified.delivered": "delivered",
+    "letter.returned_to_sender": "returned",
+    "letter.certified.returned_to_sender": "returned",
+}
+
+# Webhook signing secret (dashboard.lob.com → Webhooks) and accepted clock skew
+LOB_WEBHOOK_SECRET = os.environ.get("LOB_WEBHOOK_SECRET", "")
+WEBHOOK_TOLERANCE_SECONDS = 300
+
+# Event ids remembered for de-duplicating redelivered webhooks
+WEBHOOK_SEEN_EVENTS = 10000
+
+
+def delivery_status(letter: dict) -> Optional[str]:
+    """Tracker status implied by a Lob letter's tracking events (latest wins), or None."""
+    status = None
+    for event in letter.get("tracking_events") or []:
+        status = TRACKING_EVENT_STATUSES.get(event.get("name"), status)
+    return status
+
+# Dispute fields kept in the deadline index (enough to list and schedule without a tracker scan)
+DEADLINE_SUMMARY_FIELDS = (
+    "letter_id", "letter_type", "target", "recipient_name", "status",
+    "sent_date", "response_deadline", "escalation_date",
+)
+
+# Where DisputeScheduler's default handler queues escalation events
+ESCALATION_QUEUE_PATH = os.environ.get("ESCALATION_QUEUE_PATH", "escalation_queue.jsonl")
+
+# Persist a journal's deadline index after catching up on at least this many lines
+DEADLINE_INDEX_SAVE_EVERY = 1000
+
+# DISPUTE_LOG_PATH values with these suffixes (or a sqlite:/// prefix) use the SQLite engine
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+# A directory DISPUTE_LOG_PATH (or --store sharded) holds a sharded tracker: records are
+# partitioned by "client" (client_id) or "month" (of sent_date), each shard its own
+# journal or SQLite file; an existing shard manifest's settings take precedence
+DISPUTE_SHARD_BY = os.environ.get("DISPUTE_SHARD_BY", "client")
+DISPUTE_SHARD_ENGINE = os.environ.get("DISPUTE_SHARD_ENGINE", "journal")
+
+# Shards read at once by cross-shard queries, and records each reader hands over at a time
+SHARD_READERS = 8
+SHARD_READ_BATCH = 200
+
+
+def dispute_item_id(item: dict) -> str:
+    """Content address of one dispute item: identical items share an id across letters and bureaus."""
+    import hashlib
+
+    canonical = json.dumps(item, sort_keys=True, separators=(",", ":"), default=str)
+    return "itm_" + hashlib.sha256(canonical.encode()).hexdigest()[:24]
+
+
+def normalize_dispute(dispute: dict) -> tuple:
+    """
+    Split a record's inline items_disputed out into content-addressed items.
+    Returns (record with item_ids in place of items_disputed, {item_id: item}).
+    """
+    if "items_disputed" not in dispute:
+        return dispute, {}
+    record, items = {}, {}
+    for key, value in dispute.items():
+        if key == "items_disputed":
+            ids = [dispute_item_id(item) for item in value or []]
+            items.update(zip(ids, value or []))
+            record["item_ids"] = ids
+        else:
+            record[key] = value
+    return record, items
+
+
+def _dispute_filter(filter):
+    """Predicate for iter_disputes(): None, a callable, or a {field: value(s)} dict."""
+    if filter is None or callable(filter):
+        return filter
+
+    def match(dispute):
+        for field, wanted in filter.items():
+            value = dispute.get(field)
+            if isinstance(wanted, (tuple, list, set, frozenset)):
+                if value not in wanted:
+                    return False
+            elif value != wanted:
+                return False
+        return True
+
+    return match
+
+
+class DeadlineIndex:
+    """
+    Deadline-ordered index over pending disputes, kept next to a DisputeJournal.
+
+    Holds a small summary of every pending dispute plus, for response_deadline
+    and escalation_date, a sorted list of (deadline, letter_id). "Overdue now"
+    and "due in the next N days" are then a bisect plus the k matching
+    entries. The id of every letter in the journal, pending or not, is kept
+    in letters so lookups of unknown letters need no journal scan, and lines
+    holds the byte offsets of each pending letter's add and update lines, so
+    its full record is a few seeks away. The index remembers how far into the journal it has read
+    (byte offset and inode), so catch_up() only parses lines appended since;
+    a compacted or replaced journal is re-read from the start.
+    """
+
+    FIELDS = ("response_deadline", "escalation_date")
+
+    def __init__(self):
+        self.entries = {}
+        self.letters = set()
+        self.lines = {}
+        self.sorted = {field: [] for field in self.FIELDS}
+        self.inode = None
+        self.offset = 0
+
+    # -- Maintenance --------------------------------------------------------
+
+    def _insert(self, summary: dict):
+        letter_id = summary["letter_id"]
+        self.entries[letter_id] = summary
+        for field in self.FIELDS:
+            if summary.get(field):
+                bisect.insort(self.sorted[field], (summary[field], letter_id))
+
+    def _remove(self, letter_id: str) -> Optional[dict]:
+        summary = self.entries.pop(letter_id, None)
+        if summary is not None:
+            for field in self.FIELDS:
+                if summary.get(field):
+                    keys = self.sorted[field]
+                    i = bisect.bisect_left(keys, (summary[field], letter_id))
+                    if i < len(keys) and keys[i] == (summary[field], letter_id):
+                        del keys[i]
+        return summary
+
+    def apply(self, op: dict, offset: int):
+        """Apply one journal operation, read from the line at byte offset."""
+        if op["op"] == "add":
+            dispute = op["dispute"]
+            letter_id = dispute.get("letter_id")
+            if letter_id:
+                self.letters.add(letter_id)
+            if letter_id and letter_id not in self.entries and dispute.get("status") in PENDING_STATUSES:
+                self._insert({f: dispute.get(f) for f in DEADLINE_SUMMARY_FIELDS})
+                self.lines[letter_id] = [offset]
+        elif op["op"] == "update":
+            letter_id = op["letter_id"]
+            summary = self._remove(letter_id)
+            if summary is not None:
+                summary.update({k: v for k, v in op["fields"].items() if k in DEADLINE_SUMMARY_FIELDS})
+                if summary.get("status") in PENDING_STATUSES:
+                    self._insert(summary)
+                    self.lines[letter_id].append(offset)
+                else:
+                    del self.lines[letter_id]
+
+    def catch_up(self, journal_path: Path) -> int:
+        """Apply journal lines written since the last call; returns how many were read."""
+        if not journal_path.exists():
+            return 0
+        stat = journal_path.stat()
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            self.__init__()
+            self.inode = stat.st_ino
+        read = 0
+        with open(journal_path, "rb") as f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # a write still in progress
+                offset, self.offset = self.offset, self.offset + len(line)
+                if line.strip():
+                    self.apply(json.loads(line), offset)
+                    read += 1
+        return read
+
+    # -- Queries ------------------------------------------------------------
+
+    def range(self, field: str, before: datetime, after: Optional[datetime] = None) -> list:
+        """Summaries with after <= field < before, earliest first."""
+        keys = self.sorted[field]
+        lo = bisect.bisect_left(keys, (after.isoformat(),)) if after else 0
+        hi = bisect.bisect_left(keys, (before.isoformat(),))
+        return [self.entries[letter_id] for _, letter_id in keys[lo:hi]]
+
+    # -- Persistence --------------------------------------------------------
+
+    def save(self, path: Path):
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")  # processes may save concurrently
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "inode": self.inode,
+                "offset": self.offset,
+                "entries": list(self.entries.values()),
+                "letters": list(self.letters),
+                "lines": self.lines,
+            }, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "DeadlineIndex":
+        index = cls()
+        if path.exists():
+            try:
+                with open(path, encoding="utf-8") as f:
+                    saved = json.load(f)
+            except ValueError:
+                return index
+            if "lines" not in saved:
+                return index  # saved before letters and lines were indexed; rebuilt from the journal
+            index.inode, index.offset = saved["inode"], saved["offset"]
+            index.letters = set(saved["letters"])
+            index.lines = saved["lines"]
+            for summary in saved["entries"]:
+                index.entries[summary["letter_id"]] = summary
+                for field in cls.FIELDS:
+                    if summary.get(field):
+                        index.sorted[field].append((summary[field], summary["letter_id"]))
+            for keys in index.sorted.values():
+                keys.sort()
+        return index
+
+
+class _FileLock:
+    """
+    Exclusive cross-process lock held on a side file with fcntl.flock
+    (threads only, where fcntl is unavailable). Re-entrant for its holder;
+    callers serialize their own threads before taking it.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._handle = None
+        self._depth = 0
+
+    def __enter__(self):
+        if self._depth == 0:
+            if self._handle is None:
+                self._handle = open(self.path, "a")
+            try:
+                import fcntl
+            except ImportError:
+                fcntl = None
+            if fcntl is not None:
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_EX)
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                import fcntl
+            except ImportError:
+                return False
+            fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+        return False
+
+    def close(self):
+        if self._depth == 0 and self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+class DisputeJournal:
+    """
+    Append-only JSON Lines dispute tracker.
+
+    Every line is one operation — {"op": "add", "dispute": {...}} or
+    {"op": "update", "letter_id": ..., "fields": {...}} — so logging a letter or
+    changing its status appends a single line instead of rewriting the tracker.
+    Dispute items are written once as {"op": "item", "id": ..., "item": {...}}
+    lines and records carry item_ids (see normalize_dispute()), so a dispute
+    sent to three bureaus and its follow-ups share one copy; items() resolves them.
+    Reads stream the journal in two passes (update lines first, then the add
+    lines they apply to); once update lines pile up, a read compacts the file
+    back down to one line per dispute.
+
+    A legacy {"disputes": [...]} tracker found at the path (or at the same name
+    with a .json suffix) is migrated into the journal once, keeping a .bak copy.
+
+    Deadline queries (due()) are answered from a DeadlineIndex persisted at
+    <path>.deadlines, which only reads journal lines it has not seen yet.
+
+    Several processes may share one journal. Appends and compactions hold
+    an exclusive flock on <path>.lock, so lines never interleave and no
+    append lands between a compaction's read and its atomic rename; a
+    writer whose file was replaced by another process's compaction reopens
+    the new one. Concurrent writes are group-committed: while one thread
+    writes and flushes, the rest queue up and the next write carries them
+    all in one locked append.
+    """
+
+    def __init__(self, path: str, sync_every: int = JOURNAL_SYNC_EVERY):
+        self.path = Path(path)
+        self.sync_every = sync_every
+        self._handle = None
+        self._unsynced = 0
+        self._index = None
+        self._index_path = self.path.with_name(self.path.name + ".deadlines")
+        self._item_ids = None
+        self._lock = threading.RLock()
+        self._file_lock = _FileLock(self.path.with_name(self.path.name + ".lock"))
+        self._queue = []  # serialized ops waiting for the next group commit
+        self._queued = 0  # writes ever queued / committed, to tell a writer its lines are out
+        self._committed = 0
+        self._failed = {}  # ticket → error for writes whose group commit failed, until their writer sees it
+        self._queue_lock = threading.Lock()
+        self._items_lock = threading.Lock()
+        self._migrate_legacy()
+        atexit.register(self.close)
+
+    # -- Migration ----------------------------------------------------------
+
+    def _migrate_legacy(self):
+        with self._lock, self._file_lock:
+            self._migrate_legacy_locked()
+
+    def _migrate_legacy_locked(self):
+        import shutil
+
+        source = self.path
+        if not source.exists():
+            source = self.path.with_suffix(".json")
+            if source == self.path or not source.exists():
+                return
+        with open(source, encoding="utf-8") as f:
+            first_line = f.readline()
+        if not first_line.strip():
+            return
+        try:
+            header = json.loads(first_line)
+        except ValueError:
+            header = {}
+        if header.get("format") == JOURNAL_HEADER["format"]:
+            if header.get("version", 1) < JOURNAL_HEADER["version"]:
+                shutil.copy2(source, source.with_name(source.name + ".bak"))
+                self.compact()  # normalizes inline items_disputed
+            return
+
+        with open(source, encoding="utf-8") as f:
+            legacy = json.load(f)
+        if source == self.path:
+            shutil.copy2(source, source.with_name(source.name + ".bak"))
+        self._rewrite(legacy.get("disputes", []))
+
+    # -- Writes -------------------------------------------------------------
+
+    def _open(self):
+        """Append handle on the journal file; call with the file lock held."""
+        if self._handle is not None:
+            try:
+                inode = self.path.stat().st_ino
+            except FileNotFoundError:
+                inode = None
+            if inode != os.fstat(self._handle.fileno()).st_ino:
+                # Another process compacted the journal (everything written here
+                # was flushed before it could take the lock, so nothing is lost)
+                self._handle.close()
+                self._handle = None
+                self._unsynced = 0
+        if self._handle is None:
+            is_new = not self.path.exists() or self.path.stat().st_size == 0
+            self._handle = open(self.path, "a", encoding="utf-8")
+            if is_new:
+                self._handle.write(json.dumps(JOURNAL_HEADER) + "\n")
+        return self._handle
+
+    def _write(self, ops: list):
+        self._commit(self._enqueue(ops))
+
+    def _enqueue(self, ops: list) -> int:
+        """Queue ops for the next group commit; returns the ticket to _commit()."""
+        data = "".join(json.dumps(op, default=str) + "\n" for op in ops)
+        with self._queue_lock:
+            self._queue.append((data, len(ops)))
+            self._queued += 1
+            return self._queued
+
+    def _commit(self, ticket: int):
+        """Return once the write with this ticket is in the journal, writing every queued one if need be."""
+        with self._lock:
+            error = self._failed.pop(ticket, None)
+            if error is not None:
+                raise error  # the group commit carrying our lines failed
+            if self._committed >= ticket:
+                return  # written by the group commit of the thread ahead of us
+            with self._queue_lock:
+                batch, self._queue = self._queue, []
+                first, last = self._committed + 1, self._queued
+            try:
+                with self._file_lock:
+                    f = self._open()
+                    f.write("".join(data for data, _ in batch))
+                    f.flush()
+                    self._unsynced += sum(n for _, n in batch)
+                    if self._unsynced >= self.sync_every:
+                        self.sync()
+            except Exception as e:
+                self._failed.update((t, e) for t in range(first, last + 1) if t != ticket)
+                self._committed = last
+                raise
+            self._committed = last
+
+    def _known_items(self) -> set:
+        if self._item_ids is None:
+            self._item_ids = set()
+            f = self._snapshot()
+            if f is not None:
+                with f:
+                    self._item_ids.update(item_id for item_id, _ in self._iter_items(f))
+        return self._item_ids
+
+    def _add_ops(self, disputes) -> tuple:
+        """
+        Add operations for disputes, preceded by item lines for items not yet
+        stored, and the ids of those new items (known only once written).
+        """
+        ops = []
+        known = self._known_items()
+        new = set()
+        for dispute in disputes:
+            record, items = normalize_dispute(dispute)
+            for item_id, item in items.items():
+                if item_id not in known and item_id not in new:
+                    new.add(item_id)
+                    ops.append({"op": "item", "id": item_id, "item": item})
+            ops.append({"op": "add", "dispute": record})
+        return ops, new
+
+    def append(self, dispute: dict):
+        """Log one dispute record."""
+        self.append_many([dispute])
+
+    def append_many(self, disputes: list):
+        """Log several dispute records with a single write."""
+        if disputes:
+            # Queued under the items lock so an item line never trails an add line using it
+            with self._items_lock:
+                ops, new_items = self._add_ops(disputes)
+                ticket = self._enqueue(ops)
+            self._commit(ticket)
+            # Only now: after a failed write, later records must write these items again
+            with self._items_lock:
+                self._known_items().update(new_items)
+
+    def update(self, letter_id: str, fields: dict):
+        """Record new field values for the dispute with this letter_id."""
+        self._write([{"op": "update", "letter_id": letter_id, "fields": fields}])
+
+    def update_many(self, updates: dict):
+        """Apply {letter_id: fields} for many disputes with a single write."""
+        if updates:
+            self._write([{"op": "update", "letter_id": k, "fields": v} for k, v in updates.items()])
+
+    def sync(self):
+        """Force buffered journal lines to disk."""
+        with self._lock:
+            if self._handle is not None and self._unsynced:
+                self._handle.flush()
+                os.fsync(self._handle.fileno())
+                self._unsynced = 0
+
+    def close(self):
+        with self._lock:
+            if self._handle is not None:
+                self.sync()
+                self._handle.close()
+                self._handle = None
+            if self._index is not None:
+                self._index.save(self._index_path)
+                self._index = None  # reloaded from the saved file if the journal is used again
+            self._file_lock.close()
+
+    # -- Reads --------------------------------------------------------------
+
+    def _snapshot(self):
+        """Binary handle on the current journal file, or None if there is none yet."""
+        with self._lock:
+            if self._handle is not None:
+                self._handle.flush()
+            try:
+                return open(self.path, "rb")
+            except FileNotFoundError:
+                return None
+
+    @staticmethod
+    def _scan_updates(f) -> tuple:
+        """
+        First pass: merged update fields by letter_id, the update line count and
+        the byte length scanned. Add lines are only prefix-checked, not parsed.
+        """
+        updates = {}
+        count = 0
+        end = 0
+        f.seek(0)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # partial line from a writer still mid-append
+            end += len(line)
+            if line.startswith(b'{"op": "update"'):
+                op = json.loads(line)
+                updates.setdefault(op["letter_id"], {}).update(op["fields"])
+                count += 1
+        return updates, count, end
+
+    @staticmethod
+    def _stream(f, updates: dict, end: int, match=None):
+        """Second pass: add records up to byte end, with their updates applied."""
+        f.seek(0)
+        pos = 0
+        for line in f:
+            pos += len(line)
+            if pos > end:
+                break
+            if not line.startswith(b'{"op": "add"'):
+                continue
+            dispute = json.loads(line)["dispute"]
+            fields = updates.get(dispute.get("letter_id"))
+            if fields:
+                dispute.update(fields)
+            if match is None or match(dispute):
+                yield dispute
+
+    def iter_disputes(self, filter=None):
+        """
+        Stream dispute records in the order they were logged.
+
+        filter is a predicate on the record, or a {field: value} dict where a
+        tuple/list/set value matches any of its members. Only pending update
+        fields are held in memory, so memory stays flat however large the journal
+        grows; a read that finds more than JOURNAL_COMPACT_MIN update lines
+        compacts the journal first.
+        """
+        match = _dispute_filter(filter)
+        with self._lock:
+            f = self._snapshot()
+            if f is None:
+                return
+            updates, count, end = self._scan_updates(f)
+            if count > JOURNAL_COMPACT_MIN:
+                f.close()
+                self.compact()
+                f = self._snapshot()
+                updates, _, end = self._scan_updates(f)
+        with f:
+            yield from self._stream(f, updates, end, match)
+
+    @staticmethod
+    def _iter_items(f):
+        """(item_id, item) for every stored dispute item."""
+        f.seek(0)
+        for line in f:
+            if line.startswith(b'{"op": "item"') and line.endswith(b"\n"):
+                op = json.loads(line)
+                yield op["id"], op["item"]
+
+    def items(self, item_ids) -> dict:
+        """{item_id: item} for the requested content-addressed dispute items."""
+        wanted = set(item_ids)
+        found = {}
+        f = self._snapshot()
+        if f is None or not wanted:
+            return found
+        with f:
+            for item_id, item in self._iter_items(f):
+                if item_id in wanted:
+                    found[item_id] = item
+                    if len(found) == len(wanted):
+                        break
+        return found
+
+    def load(self) -> list:
+        """All dispute records in the order they were logged."""
+        return list(self.iter_disputes())
+
+    def get(self, letter_id: str) -> Optional[dict]:
+        """
+        One dispute by letter_id, or None. Unknown letters are answered from the
+        deadline index and pending ones read from their indexed lines, without
+        a scan; only letters no longer pending stream the journal.
+        """
+        with self._lock, self._file_lock:  # no compaction may move the lines while they are read
+            index = self.deadline_index()
+            if letter_id not in index.letters:
+                return None
+            offsets = index.lines.get(letter_id)
+            dispute = self._read_lines(letter_id, offsets) if offsets else None
+        if dispute is not None:
+            return dispute
+        return next(self.iter_disputes({"letter_id": letter_id}), None)
+
+    def _read_lines(self, letter_id: str, offsets: list) -> Optional[dict]:
+        """The record from its add line and update lines at these byte offsets, or None if they don't match."""
+        f = self._snapshot()
+        if f is None:
+            return None
+        with f:
+            dispute = None
+            for offset in offsets:
+                f.seek(offset)
+                op = json.loads(f.readline())
+                if dispute is None and op.get("op") == "add" and op["dispute"].get("letter_id") == letter_id:
+                    dispute = op["dispute"]
+                elif dispute is not None and op.get("op") == "update" and op["letter_id"] == letter_id:
+                    dispute.update(op["fields"])
+                else:
+                    return None
+        return dispute
+
+    def pending(self) -> list:
+        """Disputes in a PENDING_STATUSES status, soonest response_deadline first."""
+        pending = self.iter_disputes({"status": PENDING_STATUSES})
+        return sorted(pending, key=lambda d: d["response_deadline"])
+
+    def pending_status(self, letter_id: str) -> Optional[str]:
+        """The current status of a pending letter; None once it has left PENDING_STATUSES, or if unknown."""
+        summary = self.deadline_index().entries.get(letter_id)
+        return summary["status"] if summary else None
+
+    def deadline_index(self) -> DeadlineIndex:
+        """The deadline index, caught up with everything written to the journal so far."""
+        with self._lock:
+            if self._handle is not None:
+                self._handle.flush()
+            if self._index is None:
+                self._index = DeadlineIndex.load(self._index_path)
+            if self._index.catch_up(self.path) >= DEADLINE_INDEX_SAVE_EVERY:
+                self._index.save(self._index_path)
+            return self._index
+
+    def due(self, field: str, before: datetime, after: Optional[datetime] = None) -> list:
+        """
+        Pending disputes with after <= field < before, earliest first, where field
+        is response_deadline or escalation_date. Returns DEADLINE_SUMMARY_FIELDS
+        summaries straight from the deadline index.
+        """
+        if field not in DeadlineIndex.FIELDS:
+            raise ValueError(f"Unknown deadline field: {field}")
+        with self._lock:
+            return list(self.deadline_index().range(field, before, after))
+
+    def compact(self) -> int:
+        """Rewrite the journal as one line per dispute; returns the record count."""
+        with self._lock, self._file_lock:
+            f = self._snapshot()
+            if f is None:
+                return 0
+            with f:
+                updates, _, end = self._scan_updates(f)
+                return self._rewrite(self._stream(f, updates, end), self._iter_items(f))
+
+    def _rewrite(self, disputes, items=()) -> int:
+        """Replace the journal with one line per item and dispute; inline items are normalized."""
+        count = 0
+        seen = set()
+        with self._lock, self._file_lock:
+            self.close()
+            # Line offsets all change, so the deadline index is rebuilt from the lines as they are written
+            index = DeadlineIndex()
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+                offset = 0
+
+                def write(op: dict):
+                    nonlocal offset
+                    line = json.dumps(op, default=str) + "\n"
+                    f.write(line)
+                    index.apply(op, offset)
+                    offset += len(line.encode("utf-8"))
+
+                write(JOURNAL_HEADER)
+                for item_id, item in items:
+                    if item_id not in seen:
+                        seen.add(item_id)
+                        write({"op": "item", "id": item_id, "item": item})
+                for dispute in disputes:
+                    record, new_items = normalize_dispute(dispute)
+                    for item_id, item in new_items.items():
+                        if item_id not in seen:
+                            seen.add(item_id)
+                            write({"op": "item", "id": item_id, "item": item})
+                    write({"op": "add", "dispute": record})
+                    count += 1
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._item_ids = seen
+            index.inode, index.offset = self.path.stat().st_ino, offset
+            index.save(self._index_path)
+            self._index = index
+        return count
+
+
+class SQLiteDisputeStore:
+    """
+    SQLite dispute tracker (stdlib sqlite3, WAL mode).
+
+    Records are stored as JSON alongside indexed letter_id, status and
+    response_deadline columns, so status updates are point lookups and
+    pending/overdue queries are index range scans instead of full-file parses.
+    Same interface as DisputeJournal.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS disputes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            letter_id TEXT,
+            status TEXT,
+            response_deadline TEXT,
+            data TEXT NOT NULL,
+            escalation_date TEXT
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS disputes_letter_id ON disputes (letter_id);
+        CREATE INDEX IF NOT EXISTS disputes_status_deadline ON disputes (status, response_deadline);
+        CREATE INDEX IF NOT EXISTS disputes_deadline ON disputes (response_deadline);
+        CREATE INDEX IF NOT EXISTS disputes_status_escalation ON disputes (status, escalation_date);
+        CREATE TABLE IF NOT EXISTS items (
+            id TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+    """
+
+    # PRAGMA user_version once inline items_disputed have been moved to the items table
+    ITEMS_VERSION = 1
+
+    def __init__(self, path: str):
+        import sqlite3
+
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        # Other processes may hold the write lock briefly; wait rather than fail
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(disputes)")}
+        if columns and "escalation_date" not in columns:
+            with self._db:
+                self._db.execute("ALTER TABLE disputes ADD COLUMN escalation_date TEXT")
+                self._db.execute("UPDATE disputes SET escalation_date = json_extract(data, '$.escalation_date')")
+        self._db.executescript(self.SCHEMA)
+        if self._db.execute("PRAGMA user_version").fetchone()[0] < self.ITEMS_VERSION:
+            self._normalize_items()
+        atexit.register(self.close)
+
+    def _normalize_items(self):
+        """Move inline items_disputed from existing rows into the items table."""
+        with self._db:
+            rows = self._db.execute(
+                "SELECT seq, data FROM disputes WHERE json_extract(data, '$.items_disputed') IS NOT NULL"
+            )
+            for seq, data in rows.fetchall():
+                record, items = normalize_dispute(json.loads(data))
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO items (id, data) VALUES (?, ?)",
+                    [(k, json.dumps(v, default=str)) for k, v in items.items()],
+                )
+                self._db.execute("UPDATE disputes SET data = ? WHERE seq = ?", (json.dumps(record, default=str), seq))
+            self._db.execute(f"PRAGMA user_version = {self.ITEMS_VERSION}")
+
+    # -- Writes -------------------------------------------------------------
+
+    @staticmethod
+    def _row(dispute: dict) -> tuple:
+        return (
+            dispute.get("letter_id"),
+            dispute.get("status"),
+            dispute.get("response_deadline"),
+            json.dumps(dispute, default=str),
+            dispute.get("escalation_date"),
+        )
+
+    def append(self, dispute: dict):
+        """Log one dispute record."""
+        self.append_many([dispute])
+
+    def append_many(self, disputes: list):
+        """Log several dispute records in one transaction."""
+        records, items = [], {}
+        for dispute in disputes:
+            record, record_items = normalize_dispute(dispute)
+            records.append(record)
+            items.update(record_items)
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO items (id, data) VALUES (?, ?)",
+                [(k, json.dumps(v, default=str)) for k, v in items.items()],
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO disputes (letter_id, status, response_deadline, data, escalation_date) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [self._row(d) for d in records],
+            )
+
+    def update(self, letter_id: str, fields: dict):
+        """Record new field values for the dispute with this letter_id."""
+        self.update_many({letter_id: fields})
+
+    def update_many(self, updates: dict):
+        """Apply {letter_id: fields} for many disputes in one transaction."""
+        with self._lock, self._db:
+            for letter_id, fields in updates.items():
+                row = self._db.execute(
+                    "SELECT data FROM disputes WHERE letter_id = ?", (letter_id,)
+                ).fetchone()
+                if row is None:
+                    continue
+                dispute = json.loads(row[0])
+                dispute.update(fields)
+                self._db.execute(
+                    "UPDATE disputes SET status = ?, response_deadline = ?, data = ?, escalation_date = ? "
+                    "WHERE letter_id = ?",
+                    self._row(dispute)[1:] + (letter_id,),
+                )
+
+    def sync(self):
+        with self._lock:
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # -- Reads --------------------------------------------------------------
+
+    def _query(self, where: str = "", params: tuple = (), order: str = "seq") -> list:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT data FROM disputes {where} ORDER BY {order}", params
+            ).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    # Filter fields with their own column, pushed down to SQL by iter_disputes()
+    COLUMNS = ("letter_id", "status", "response_deadline", "escalation_date")
+
+    def iter_disputes(self, filter=None, batch_size: int = 500):
+        """
+        Stream dispute records in the order they were logged.
+
+        filter is a predicate on the record, or a {field: value} dict where a
+        tuple/list/set value matches any of its members; dict fields with their
+        own column are matched in SQL. Rows are fetched batch_size at a time on a
+        separate read connection, so writes are not blocked while iterating.
+        """
+        import sqlite3
+
+        where, params = [], []
+        if isinstance(filter, dict):
+            rest = {}
+            for field, wanted in filter.items():
+                if field not in self.COLUMNS:
+                    rest[field] = wanted
+                elif isinstance(wanted, (tuple, list, set, frozenset)):
+                    where.append(f"{field} IN ({', '.join('?' * len(wanted))})")
+                    params.extend(wanted)
+                else:
+                    where.append(f"{field} = ?")
+                    params.append(wanted)
+            filter = rest or None
+        match = _dispute_filter(filter)
+        sql = "SELECT data FROM disputes"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        with self._lock:
+            self._db.commit()
+        db = sqlite3.connect(str(self.path))
+        try:
+            cursor = db.execute(sql + " ORDER BY seq", params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for (data,) in rows:
+                    dispute = json.loads(data)
+                    if match is None or match(dispute):
+                        yield dispute
+        finally:
+            db.close()
+
+    def get(self, letter_id: str) -> Optional[dict]:
+        """One dispute by letter_id, or None."""
+        found = self._query("WHERE letter_id = ?", (letter_id,))
+        return found[0] if found else None
+
+    def items(self, item_ids) -> dict:
+        """{item_id: item} for the requested content-addressed dispute items."""
+        item_ids = list(set(item_ids))
+        found = {}
+        with self._lock:
+            for i in range(0, len(item_ids), 500):
+                chunk = item_ids[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT id, data FROM items WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                )
+                found.update((item_id, json.loads(data)) for item_id, data in rows)
+        return found
+
+    def load(self) -> list:
+        """All dispute records in the order they were logged."""
+        return self._query()
+
+    def pending(self) -> list:
+        """Disputes in a PENDING_STATUSES status, soonest response_deadline first."""
+        marks = ", ".join("?" * len(PENDING_STATUSES))
+        return self._query(f"WHERE status IN ({marks})", PENDING_STATUSES, order="response_deadline")
+
+    def pending_status(self, letter_id: str) -> Optional[str]:
+        """The current status of a pending letter; None once it has left PENDING_STATUSES, or if unknown."""
+        with self._lock:
+            row = self._db.execute("SELECT status FROM disputes WHERE letter_id = ?", (letter_id,)).fetchone()
+        return row[0] if row and row[0] in PENDING_STATUSES else None
+
+    def due(self, field: str, before: datetime, after: Optional[datetime] = None) -> list:
+        """Pending disputes with after <= field < before, earliest first (field: response_deadline or escalation_date)."""
+        if field not in DeadlineIndex.FIELDS:
+            raise ValueError(f"Unknown deadline field: {field}")
+        marks = ", ".join("?" * len(PENDING_STATUSES))
+        where = f"WHERE status IN ({marks}) AND {field} < ?"
+        params = PENDING_STATUSES + (before.isoformat(),)
+        if after:
+            where += f" AND {field} >= ?"
+            params += (after.isoformat(),)
+        return self._query(where, params, order=field)
+
+    def compact(self) -> int:
+        """Reclaim free pages; returns the record count."""
+        with self._lock:
+            self._db.execute("VACUUM")
+            return self._db.execute("SELECT COUNT(*) FROM disputes").fetchone()[0]
+
+
+class ShardedDisputeTracker:
+    """
+    Dispute tracker split into shards under one directory.
+
+    Records are partitioned by client (their client_id, see dispute_client_id())
+    or by month (of sent_date). Each shard is its own DisputeJournal or
+    SQLiteDisputeStore, listed in <dir>/manifest.json with the partition and
+    engine, so writes for different clients land in different files behind
+    different locks. A dict filter on the partition — {"client_id": ...}, or
+    {"month": "2026-10"} for a month-sharded tracker — reads only those
+    shards; any other query reads every shard concurrently and merges.
+
+    Letters are found by letter_id through <dir>/letters.tsv, an append-only
+    letter_id → shard map written before the records themselves; a letter
+    missing from it is looked up in every shard and added.
+    Same interface as DisputeJournal.
+    """
+
+    PARTITIONS = ("client", "month")
+    ENGINES = ("journal", "sqlite")
+    MANIFEST_VERSION = 1
+
+    def __init__(self, path: str, partition: str = None, engine: str = None):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._manifest_path = self.path / "manifest.json"
+        self._routes_path = self.path / "letters.tsv"
+        self._lock = threading.RLock()  # manifest, routes and open shards; never held while a shard reads or writes
+        self._file_lock = _FileLock(self.path / ".lock")
+        self._shards = {}  # shard key → open store
+        self._routes = {}  # letter_id → shard key
+        self._routes_offset = 0
+        with self._lock, self._file_lock:
+            manifest = self._read_manifest()
+            if manifest is None:
+                manifest = {
+                    "version": self.MANIFEST_VERSION,
+                    "partition": partition or DISPUTE_SHARD_BY,
+                    "engine": engine or DISPUTE_SHARD_ENGINE,
+                    "shards": {},
+                }
+                if manifest["partition"] not in self.PARTITIONS:
+                    raise ValueError(f"Unknown shard partition: {manifest['partition']}. Options: client, month")
+                if manifest["engine"] not in self.ENGINES:
+                    raise ValueError(f"Unknown shard engine: {manifest['engine']}. Options: journal, sqlite")
+                self._write_manifest(manifest)
+        for name, wanted in (("partition", partition), ("engine", engine)):
+            if wanted and wanted != manifest[name]:
+                raise ValueError(f"{self.path} is sharded with {name} {manifest[name]!r}, not {wanted!r}")
+        self.partition = manifest["partition"]
+        self.engine = manifest["engine"]
+        self._files = manifest["shards"]  # shard key → file name
+        atexit.register(self.close)
+
+    # -- Manifest -----------------------------------------------------------
+
+    def _read_manifest(self) -> Optional[dict]:
+        try:
+            return json.loads(self._manifest_path.read_text())
+        except FileNotFoundError:
+            return None
+
+    def _write_manifest(self, manifest: dict):
+        tmp = self._manifest_path.with_name(f"{self._manifest_path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+        os.replace(tmp, self._manifest_path)
+
+    def _shard_file(self, key: str) -> str:
+        """A file name for a new shard that no other shard uses."""
+        import re
+
+        stem = re.sub(r"[^A-Za-z0-9_-]", "_", key) or "_"
+        suffix = ".db" if self.engine == "sqlite" else ".jsonl"
+        taken = set(self._files.values())
+        name, n = stem + suffix, 1
+        while name in taken:
+            n += 1
+            name = f"{stem}-{n}{suffix}"
+        return name
+
+    # -- Shards -------------------------------------------------------------
+
+    def shard_key(self, dispute: dict) -> str:
+        """The key of the shard a dispute record belongs in."""
+        if self.partition == "client":
+            key = dispute.get("client_id")
+        else:
+            key = (dispute.get("sent_date") or "")[:7]
+        return str(key) if key else "unassigned"
+
+    def shard_keys(self) -> list:
+        """Every shard's key, including shards other processes added since this tracker opened."""
+        with self._lock:
+            self._files = (self._read_manifest() or {}).get("shards", self._files)
+            return sorted(self._files)
+
+    def shard(self, key: str, create: bool = False):
+        """The store holding one shard's records; None for a shard that does not exist, unless create."""
+        with self._lock:
+            store = self._shards.get(key)
+            if store is not None:
+                return store
+            if key not in self._files:
+                self.shard_keys()
+            if key not in self._files:
+                if not create:
+                    return None
+                with self._file_lock:
+                    manifest = self._read_manifest()
+                    self._files = manifest["shards"]
+                    if key not in self._files:
+                        self._files[key] = self._shard_file(key)
+                        self._write_manifest(manifest)
+            path = self.path / self._files[key]
+            store = SQLiteDisputeStore(path) if self.engine == "sqlite" else DisputeJournal(path)
+            self._shards[key] = store
+            return store
+
+    def _stores(self, keys) -> list:
+        stores = [(key, self.shard(key)) for key in keys]
+        return [(key, store) for key, store in stores if store is not None]
+
+    def _map(self, keys, call) -> list:
+        """call(store) for every existing shard in keys, run concurrently."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        stores = [store for _, store in self._stores(keys)]
+        if len(stores) <= 1:
+            return [call(store) for store in stores]
+        with ThreadPoolExecutor(max_workers=min(SHARD_READERS, len(stores))) as pool:
+            return list(pool.map(call, stores))
+
+    def _fan_in(self, keys, read):
+        """
+        Yield (shard key, record) from read(store) for every existing shard in
+        keys. Shards are read concurrently by up to SHARD_READERS threads, each
+        handing over SHARD_READ_BATCH records at a time through a bounded queue,
+        so memory stays flat; closing the generator early stops the readers.
+        """
+        import queue
+        from concurrent.futures import ThreadPoolExecutor
+
+        stores = self._stores(keys)
+        if len(stores) <= 1:
+            for key, store in stores:
+                for dispute in read(store):
+                    yield key, dispute
+            return
+
+        buffer = queue.Queue(SHARD_READERS)
+        stop = threading.Event()
+        done = object()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def pump(key, store):
+            records = None
+            try:
+                records = iter(read(store))
+                batch = []
+                for dispute in records:
+                    batch.append(dispute)
+                    if len(batch) == SHARD_READ_BATCH:
+                        if not put((key, batch)):
+                            return
+                        batch = []
+                if batch:
+                    put((key, batch))
+            except Exception as e:
+                put(e)
+            finally:
+                if hasattr(records, "close"):
+                    records.close()
+                put(done)
+
+        pool = ThreadPoolExecutor(max_workers=min(SHARD_READERS, len(stores)))
+        for key, store in stores:
+            pool.submit(pump, key, store)
+        try:
+            remaining = len(stores)
+            while remaining:
+                item = buffer.get()
+                if item is done:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    key, batch = item
+                    for dispute in batch:
+                        yield key, dispute
+        finally:
+            stop.set()
+            pool.shutdown(wait=False)
+
+    # -- Letter routes ------------------------------------------------------
+
+    def _catch_up_routes(self):
+        """Read route lines appended (by any process) since the last call; self._lock held."""
+        try:
+            f = open(self._routes_path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(self._routes_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # a writer is mid-line
+                self._routes_offset += len(line)
+                letter_id, _, key = line.decode().rstrip("\n").partition("\t")
+                self._routes[letter_id] = key
+
+    def _add_routes(self, routes: dict):
+        """Append letter_id → shard key lines; self._lock held. Not fsync'd: a lost route is found again by _locate()."""
+        new = {letter_id: key for letter_id, key in routes.items() if self._routes.get(letter_id) != key}
+        if not new:
+            return
+        data = "".join(f"{letter_id}\t{key}\n" for letter_id, key in new.items())
+        with self._file_lock, open(self._routes_path, "ab") as f:
+            f.write(data.encode())
+        self._routes.update(new)
+
+    def _locate(self, letter_ids) -> dict:
+        """{letter_id: shard key} for the letters that exist, searching every shard for unrouted ones."""
+        with self._lock:
+            if any(letter_id not in self._routes for letter_id in letter_ids):
+                self._catch_up_routes()
+            found = {i: self._routes[i] for i in letter_ids if i in self._routes}
+        missing = set(letter_ids) - set(found)
+        if missing:
+            learned = {
+                dispute["letter_id"]: key
+                for key, dispute in self._fan_in(self.shard_keys(), lambda s: s.iter_disputes({"letter_id": missing}))
+            }
+            with self._lock:
+                self._add_routes(learned)
+            found.update(learned)
+        return found
+
+    # -- Writes -------------------------------------------------------------
+
+    def append(self, dispute: dict):
+        """Log one dispute record."""
+        self.append_many([dispute])
+
+    def append_many(self, disputes: list):
+        """Log several dispute records, with one append_many() per shard they fall in."""
+        by_shard = {}
+        for dispute in disputes:
+            by_shard.setdefault(self.shard_key(dispute), []).append(dispute)
+        routes = {d["letter_id"]: key for key, batch in by_shard.items() for d in batch if d.get("letter_id")}
+        with self._lock:
+            self._add_routes(routes)
+        for key, batch in by_shard.items():
+            self.shard(key, create=True).append_many(batch)
+
+    def update(self, letter_id: str, fields: dict):
+        """Record new field values for the dispute with this letter_id."""
+        self.update_many({letter_id: fields})
+
+    def update_many(self, updates: dict):
+        """Apply {letter_id: fields}, with one update_many() per shard the letters are in."""
+        by_shard = {}
+        for letter_id, key in self._locate(list(updates)).items():
+            by_shard.setdefault(key, {})[letter_id] = updates[letter_id]
+        for key, batch in by_shard.items():
+            store = self.shard(key)
+            if store is not None:
+                store.update_many(batch)
+
+    def sync(self):
+        with self._lock:
+            stores = list(self._shards.values())
+        for store in stores:
+            store.sync()
+
+    def close(self):
+        with self._lock:
+            stores = list(self._shards.values())
+        for store in stores:
+            store.close()
+
+    def copy_from(self, tracker, batch_size: int = 1000) -> int:
+        """Log every record of another tracker (items resolved inline) into the shards; returns the count."""
+        count, batch = 0, []
+
+        def flush():
+            ids = {i for d in batch for i in d.get("item_ids", ())}
+            items = tracker.items(ids) if ids else {}
+            for d in batch:
+                if "item_ids" in d:
+                    d["items_disputed"] = [items[i] for i in d.pop("item_ids") if i in items]
+            self.append_many(batch)
+
+        for dispute in tracker.iter_disputes():
+            batch.append(dispute)
+            if len(batch) >= batch_size:
+                flush()
+                count, batch = count + len(batch), []
+        if batch:
+            flush()
+            count += len(batch)
+        return count
+
+    # -- Reads --------------------------------------------------------------
+
+    def _route_filter(self, filter):
+        """(shard keys to read, filter to pass each shard): a dict filter on the partition reads only its shards."""
+        field = "client_id" if self.partition == "client" else "month"
+        if not isinstance(filter, dict) or field not in filter:
+            return self.shard_keys(), filter
+        wanted = filter[field]
+        if not isinstance(wanted, (tuple, list, set, frozenset)):
+            wanted = (wanted,)
+        if field == "month":
+            filter = {k: v for k, v in filter.items() if k != field} or None
+        return [str(key) if key else "unassigned" for key in wanted], filter
+
+    def iter_disputes(self, filter=None):
+        """
+        Stream dispute records, each shard's in the order they were logged.
+
+        filter is a predicate on the record, or a {field: value} dict where a
+        tuple/list/set value matches any of its members. Shards are read
+        concurrently, so records from different shards interleave.
+        """
+        keys, filter = self._route_filter(filter)
+        for _, dispute in self._fan_in(keys, lambda store: store.iter_disputes(filter)):
+            yield dispute
+
+    def get(self, letter_id: str) -> Optional[dict]:
+        """One dispute by letter_id, or None."""
+        key = self._locate([letter_id]).get(letter_id)
+        store = self.shard(key) if key is not None else None
+        return store.get(letter_id) if store is not None else None
+
+    def pending_status(self, letter_id: str) -> Optional[str]:
+        """The current status of a pending letter; None once it has left PENDING_STATUSES, or if unknown."""
+        key = self._locate([letter_id]).get(letter_id)
+        store = self.shard(key) if key is not None else None
+        return store.pending_status(letter_id) if store is not None else None
+
+    def items(self, item_ids) -> dict:
+        """{item_id: item} for the requested content-addressed dispute items."""
+        item_ids = list(item_ids)
+        found = {}
+        for items in self._map(self.shard_keys(), lambda store: store.items(item_ids)):
+            found.update(items)
+        return found
+
+    def load(self) -> list:
+        """All dispute records, shard by shard."""
+        return [d for records in self._map(self.shard_keys(), lambda store: store.load()) for d in records]
+
+    def pending(self) -> list:
+        """Disputes in a PENDING_STATUSES status, soonest response_deadline first."""
+        import heapq
+
+        shards = self._map(self.shard_keys(), lambda store: store.pending())
+        return list(heapq.merge(*shards, key=lambda d: d["response_deadline"]))
+
+    def due(self, field: str, before: datetime, after: Optional[datetime] = None) -> list:
+        """Pending disputes with after <= field < before, earliest first (field: response_deadline or escalation_date)."""
+        import heapq
+
+        if field not in DeadlineIndex.FIELDS:
+            raise ValueError(f"Unknown deadline field: {field}")
+        shards = self._map(self.shard_keys(), lambda store: store.due(field, before, after))
+        return list(heapq.merge(*shards, key=lambda d: d[field]))
+
+    def compact(self) -> int:
+        """Compact every shard; returns the record count."""
+        return sum(self._map(self.shard_keys(), lambda store: store.compact()))
+
+
+def open_dispute_tracker(path: str = None, engine: str = None):
+    """
+    Open the dispute tracker at path (DISPUTE_LOG_PATH by default).
+
+    engine is "journal", "sqlite" or "sharded"; when omitted it is inferred from
+    the path — a sqlite:/// prefix or a .db/.sqlite/.sqlite3 suffix selects
+    SQLite, and a directory (or a path ending in /) a ShardedDisputeTracker.
+    """
+    path = path or DISPUTE_LOG_PATH
+    if path.startswith("sqlite:///"):
+        path = path[len("sqlite:///"):]
+        engine = engine or "sqlite"
+    if engine is None:
+        if path.endswith(("/", os.sep)) or Path(path).is_dir():
+            engine = "sharded"
+        else:
+            engine = "sqlite" if Path(path).suffix.lower() in SQLITE_SUFFIXES else "journal"
+    if engine == "sharded":
+        return ShardedDisputeTracker(path)
+    if engine == "sqlite":
+        return SQLiteDisputeStore(path)
+    if engine == "journal":
+        return DisputeJournal(path)
+    raise ValueError(f"Unknown tracker engine: {engine}. Options: journal, sqlite, sharded")
+
+
+# ---------------------------------------------------------------------------
+# DEADLINE SCHEDULER
+# ---------------------------------------------------------------------------
+
+class DisputeScheduler:
+    """
+    Emits escalation events as dispute deadlines pass.
+
+    Each tick asks the tracker's deadline index for deadlines that fell
+    between the previous tick and now — an O(log n + k) range query — and
+    hands one event per dispute to on_event:
+
+        response_overdue  response_deadline passed without a reply
+                          (file a CFPB complaint / send a method_of_verification letter)
+        escalation_due    escalation_date passed; queue an intent_to_sue letter
+
+    The time of the last tick is saved to state_path, so a restarted
+    scheduler picks up exactly where it stopped and never re-emits an event.
+    """
+
+    EVENTS = (
+        ("response_deadline", "response_overdue", "method_of_verification"),
+        ("escalation_date", "escalation_due", "intent_to_sue"),
+    )
+
+    def __init__(self, tracker, on_event, state_path: str):
+        self.tracker = tracker
+        self.on_event = on_event
+        self.state_path = Path(state_path)
+        self.last_run = None
+        if self.state_path.exists():
+            with open(self.state_path, encoding="utf-8") as f:
+                self.last_run = datetime.fromisoformat(json.load(f)["last_run"])
+
+    def run_once(self, now: Optional[datetime] = None) -> int:
+        """Emit events for deadlines in [last run, now); returns how many were emitted."""
+        now = now or datetime.now()
+        emitted = 0
+        for field, event_type, next_letter in self.EVENTS:
+            for dispute in self.tracker.due(field, before=now, after=self.last_run):
+                self.on_event({
+                    "event": event_type,
+                    "letter_id": dispute["letter_id"],
+                    "letter_type": dispute.get("letter_type"),
+                    "target": dispute.get("target"),
+                    "recipient_name": dispute.get("recipient_name"),
+                    field: dispute[field],
+                    "next_letter": next_letter,
+                    "emitted_at": now.isoformat(),
+                })
+                emitted += 1
+
+        self.last_run = now
+        tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"last_run": now.isoformat()}, f)
+        os.replace(tmp_path, self.state_path)
+        return emitted
+
+    def run_forever(self, interval: float = 3600):
+        while True:
+            self.run_once()
+            time.sleep(interval)
+
+
+def queue_escalation(event: dict, path: str = None):
+    """Default scheduler handler: append the event to the escalation queue (JSON Lines)."""
+    with open(path or ESCALATION_QUEUE_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(event) + "\n")
+
+
+# ---------------------------------------------------------------------------
+# IDEMPOTENCY & CHECKPOINTS
+# ---------------------------------------------------------------------------
+
+def _client_identity(client: dict) -> dict:
+    """The fields that identify a client across letters (name and mailing address)."""
+    return {
+        "name": client.get("name"),
+        "address_line1": client.get("address_line1", client.get("address")),
+        "city": client.get("address_city", client.get("city")),
+        "state": client.get("address_state", client.get("state")),
+        "zip": client.get("address_zip", client.get("zip")),
+    }
+
+
+def dispute_client_id(client: dict) -> str:
+    """
+    The client a letter is sent for, as recorded in its tracking record's
+    client_id: the client's own client_id if it has one, otherwise derived from
+    its name and address so every letter for the same client shares it.
+    """
+    import hashlib
+
+    if client.get("client_id"):
+        return str(client["client_id"])
+    canonical = json.dumps(_client_identity(client), sort_keys=True, separators=(",", ":"), default=str)
+    return "cli_" + hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def dispute_idempotency_key(
+    client: dict,
+    letter_type: str,
+    target: str,
+    dispute_items: list,
+    recipient: Optional[dict] = None,
+    extra_context: Optional[dict] = None,
+    letter_date=None,
+) -> str:
+    """
+    Deterministic key for one letter, which Lob uses to dedupe retried POSTs:
+    the same client, target, letter type, items, recipient (name and normalized
+    address), extra_context and letter date always produce the same key, and a
+    letter that differs in any of them — another collector at target "custom",
+    new settlement terms — gets its own.
+    """
+    import hashlib
+
+    canonical = json.dumps(
+        {
+            "client": _client_identity(client),
+            "letter_type": letter_type,
+            "target": target,
+            "items": dispute_items,
+            "recipient": None if recipient is None else {
+                "name": " ".join(str(recipient.get("name", "")).split()).upper(),
+                "address": address_cache_key(recipient),
+            },
+            "extra_context": extra_context or {},
+            "letter_date": _letter_date(letter_date),
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CampaignCheckpoint:
+    """
+    Append-only record of letters Lob has accepted during a campaign.
+
+    Each line is {"key": idempotency_key, "letter_id": ..., "letter_date": ...},
+    fsync'd as soon as the letter is accepted. Keys are held in memory, so
+    checking whether a job is already done is a single dict lookup. Letter
+    dates are part of the key, so a resumed campaign reuses the date its
+    letters were first sent with (letter_date).
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._accepted = {}
+        self.letter_date = None
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._accepted[entry["key"]] = entry.get("letter_id")
+                        self.letter_date = self.letter_date or entry.get("letter_date")
+        self._handle = open(self.path, "a", encoding="utf-8")
+        atexit.register(self.close)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._accepted
+
+    def __len__(self) -> int:
+        return len(self._accepted)
+
+    def letter_id(self, key: str) -> Optional[str]:
+        return self._accepted.get(key)
+
+    def record(self, key: str, letter_id: str, letter_date: Optional[str] = None):
+        """Durably mark the letter with this idempotency key as accepted."""
+        with self._lock:
+            self._accepted[key] = letter_id
+            self.letter_date = self.letter_date or letter_date
+            entry = {"key": key, "letter_id": letter_id}
+            if letter_date:
+                entry["letter_date"] = letter_date
+            self._handle.write(json.dumps(entry) + "\n")
+            self._handle.flush()
+            os.fsync(self._handle.fileno())
+
+    def close(self):
+        with self._lock:
+            if not self._handle.closed:
+                self._handle.close()
+
+
+# ---------------------------------------------------------------------------
+# LETTER OUTBOX
+# ---------------------------------------------------------------------------
+
+class LetterOutbox:
+    """
+    Durable queue of rendered letters between a producer and sending workers
+    (stdlib sqlite3, WAL mode; safe to share between processes).
+
+    A letter moves queued → leased → done (or failed). A worker leases a batch
+    for OUTBOX_LEASE_SECONDS; if it dies, the lease expires and another worker
+    picks the letter up. Once Lob accepts a letter the tracking record is
+    stored on the row before it is logged and acked, so a crash after paying
+    for a letter re-logs it instead of losing it, and a re-sent POST carries
+    the same Idempotency-Key (Lob keeps these for 24 hours) — delivery is
+    at-least-once without mailing twice.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS outbox (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            idempotency_key TEXT NOT NULL UNIQUE,
+            state TEXT NOT NULL DEFAULT 'queued',
+            letter TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            available_at REAL NOT NULL DEFAULT 0,
+            lease_owner TEXT,
+            lease_expires REAL,
+            tracking TEXT,
+            error TEXT,
+            enqueued_at TEXT NOT NULL,
+            updated_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS outbox_state_available ON outbox (state, available_at);
+    """
+
+    def __init__(self, path: str = None, lease_seconds: float = OUTBOX_LEASE_SECONDS):
+        import sqlite3
+
+        self.path = Path(path or OUTBOX_PATH)
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.executescript(self.SCHEMA)
+        atexit.register(self.close)
+
+    # -- Producer -----------------------------------------------------------
+
+    def enqueue(self, letter: dict) -> bool:
+        """
+        Queue a rendered letter (see DisputeMailer.enqueue_dispute) under its
+        idempotency_key. Returns False if that key is already in the outbox.
+        """
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO outbox (idempotency_key, letter, enqueued_at) VALUES (?, ?, ?)",
+                (letter["idempotency_key"], json.dumps(letter, default=str), datetime.now().isoformat()),
+            )
+        return cursor.rowcount == 1
+
+    # -- Consumer -----------------------------------------------------------
+
+    def lease(self, owner: str, limit: int = 1) -> list:
+        """
+        Claim up to limit letters that are due (queued, or leased by a worker
+        whose lease ran out). Returns [{idempotency_key, letter, attempts,
+        tracking}] — tracking is set if Lob already accepted the letter.
+        """
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            rows = self._db.execute(
+                "SELECT seq, idempotency_key, letter, attempts, tracking FROM outbox "
+                "WHERE (state = 'queued' AND available_at <= ?) OR (state = 'leased' AND lease_expires <= ?) "
+                "ORDER BY seq LIMIT ?",
+                (now, now, limit),
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE outbox SET state = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + (tracking IS NULL), updated_at = ? WHERE seq = ?",
+                [(owner, now + self.lease_seconds, datetime.now().isoformat(), row[0]) for row in rows],
+            )
+        return [
+            {
+                "idempotency_key": key,
+                "letter": json.loads(letter),
+                "attempts": attempts + (tracking is None),
+                "tracking": json.loads(tracking) if tracking else None,
+            }
+            for _, key, letter, attempts, tracking in rows
+        ]
+
+    def _leased_update(self, key: str, owner: str, assignments: str, params: tuple) -> bool:
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                f"UPDATE outbox SET {assignments}, updated_at = ? "
+                "WHERE idempotency_key = ? AND state = 'leased' AND lease_owner = ?",
+                params + (datetime.now().isoformat(), key, owner),
+            )
+        return cursor.rowcount == 1
+
+    def accepted(self, key: str, owner: str, tracking: dict) -> bool:
+        """
+        Durably store the tracking record of a letter Lob accepted. False if
+        the lease was lost to another worker, which then owns the letter.
+        """
+        return self._leased_update(key, owner, "tracking = ?", (json.dumps(tracking, default=str),))
+
+    def ack(self, key: str, owner: str) -> bool:
+        """Mark a leased letter done (sent and logged)."""
+        return self._leased_update(key, owner, "state = 'done', lease_owner = NULL", ())
+
+    def retry(self, key: str, owner: str, error: str, delay: float) -> bool:
+        """Release a leased letter to be tried again after delay seconds."""
+        return self._leased_update(
+            key, owner, "state = 'queued', lease_owner = NULL, available_at = ?, error = ?",
+            (time.time() + delay, error),
+        )
+
+    def fail(self, key: str, owner: str, error: str) -> bool:
+        """Give up on a leased letter; it stays in the outbox with its error."""
+        return self._leased_update(key, owner, "state = 'failed', lease_owner = NULL, error = ?", (error,))
+
+    # -- Inspection ---------------------------------------------------------
+
+    def counts(self) -> dict:
+        """{state: letters} for queued, leased, done and failed."""
+        counts = dict.fromkeys(("queued", "leased", "done", "failed"), 0)
+        with self._lock:
+            counts.update(self._db.execute("SELECT state, COUNT(*) FROM outbox GROUP BY state").fetchall())
+        return counts
+
+    def failures(self) -> list:
+        """[{idempotency_key, target, letter_type, attempts, error}] of failed letters."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT idempotency_key, json_extract(letter, '$.target'), json_extract(letter, '$.letter_type'), "
+                "attempts, error FROM outbox WHERE state = 'failed' ORDER BY seq"
+            ).fetchall()
+        return [
+            {"idempotency_key": k, "target": t, "letter_type": lt, "attempts": a, "error": e}
+            for k, t, lt, a, e in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# ---------------------------------------------------------------------------
+# CAMPAIGN INPUT
+# ---------------------------------------------------------------------------
+
+# CSV columns copied into the client dict ("address" is accepted for address_line1)
+CAMPAIGN_CLIENT_FIELDS = ("name", "address_line1", "city", "state", "zip", "ssn_last4", "dob", "email", "phone")
+
+# CSV columns making up the row's single dispute item
+CAMPAIGN_ITEM_FIELDS = ("account_name", "account_number_last4", "reason", "details")
+
+# CSV recipient_* columns become custom_recipient (for collectors/creditors)
+CAMPAIGN_RECIPIENT_FIELDS = ("name", "address_line1", "city", "state", "zip")
+
+
+def _campaign_job_from_csv(row: dict) -> dict:
+    client = {f: row[f] for f in CAMPAIGN_CLIENT_FIELDS if row.get(f)}
+    if row.get("address") and "address_line1" not in client:
+        client["address_line1"] = row["address"]
+    item = {f: row[f] for f in CAMPAIGN_ITEM_FIELDS if row.get(f)}
+    recipient = {f: row[f"recipient_{f}"] for f in CAMPAIGN_RECIPIENT_FIELDS if row.get(f"recipient_{f}")}
+    return {
+        "client": client,
+        "letter_type": row.get("letter_type"),
+        "target": row.get("target"),
+        "dispute_items": [item] if item else [],
+        "custom_recipient": recipient or None,
+        "extra_context": {k: row[k] for k in EXTRA_CONTEXT_DEFAULTS if row.get(k)} or None,
+    }
+
+
+def _campaign_job_from_json(line: str) -> dict:
+    try:
+        job = json.loads(line)
+    except ValueError as e:
+        return {"error": f"Invalid JSON record: {e}"}
+    if not isinstance(job, dict):
+        return {"error": f"Invalid record: expected a JSON object, got {type(job).__name__}"}
+    return job
+
+
+def campaign_job_error(job: dict) -> Optional[str]:
+    """Why a campaign job cannot be sent (unreadable record, missing client, unknown letter type...), or None."""
+    if job.get("error"):
+        return job["error"]
+    client = job.get("client")
+    if not isinstance(client, dict) or not client.get("name"):
+        return "Record has no client (with at least a name)"
+    if job.get("letter_type") not in LETTER_TEMPLATES:
+        return f"Unknown letter type: {job.get('letter_type')}. Options: {list(LETTER_TEMPLATES.keys())}"
+    if not job.get("target"):
+        return "Record has no target"
+    if not isinstance(job.get("dispute_items"), list):
+        return "dispute_items must be a list"
+    return None
+
+
+def iter_campaign_jobs(
+    path: str,
+    letter_type: Optional[str] = None,
+    target: Optional[str] = None,
+):
+    """
+    Stream one send job per letter from a CSV or JSONL campaign file.
+
+    CSV rows hold one client and one dispute item (see CAMPAIGN_*_FIELDS;
+    extra_context keys from EXTRA_CONTEXT_DEFAULTS may also be columns). JSONL
+    lines are {client, letter_type, target, dispute_items, custom_recipient,
+    extra_context}. letter_type/target fill in records that omit them, and a
+    target of "all" expands to one job per bureau.
+
+    Yields dicts with the send_dispute() arguments plus "record", the 1-based
+    record number in the file. The file is read lazily, one record at a time.
+    A line that is not a JSON object yields {record, target, error} instead,
+    which consumers report as a failed record (see campaign_job_error()).
+    """
+    path = Path(path)
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.suffix.lower() == ".csv":
+            import csv
+
+            records = (_campaign_job_from_csv(row) for row in csv.DictReader(f))
+        else:
+            records = (_campaign_job_from_json(line) for line in f if line.strip())
+
+        for number, job in enumerate(records, 1):
+            if "error" in job:
+                yield {"record": number, "target": target, "error": job["error"]}
+                continue
+            job["record"] = number
+            job["letter_type"] = job.get("letter_type") or letter_type
+            job.setdefault("dispute_items", [])
+            job_target = job.get("target") or target
+            for t in (BUREAU_ADDRESSES if job_target == "all" else [job_target]):
+                yield {**job, "target": t}
+
+
+# ---------------------------------------------------------------------------
+# OFFLINE RENDERING
+# ---------------------------------------------------------------------------
+
+# Jobs per ProcessPoolExecutor task in render_letters(); a letter renders in
+# microseconds, so batching keeps workers rendering instead of unpickling
+RENDER_CHUNK_SIZE = 250
+
+
+def render_file_name(number: int, job: dict) -> str:
+    """Archive/directory entry name for one rendered job: <number>-<letter_type>-<target>.html."""
+    target = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(job.get("target")))
+    return f"{number:06d}-{job.get('letter_type')}-{target}.html"
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    """data as one gzip member ("gz") or xz stream ("xz")."""
+    if compression == "gz":
+        import gzip
+
+        return gzip.compress(data, compresslevel=6)
+    import lzma
+
+    return lzma.compress(data)
+
+
+def _tar_segment(files: list, compression: str) -> bytes:
+    """
+    Tar members for (name, data) pairs, without the end-of-archive blocks,
+    compressed as one gzip member / xz stream. Concatenated segments read back
+    as a single .tar.gz/.tar.xz, so workers can compress in parallel.
+    """
+    import tarfile
+
+    mtime = time.time()
+    buf = bytearray()
+    for name, data in files:
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = mtime
+        buf += info.tobuf()
+        buf += data
+        buf += b"\0" * (-len(data) % tarfile.BLOCKSIZE)
+    return _compress(bytes(buf), compression)
+
+
+def _render_chunk(chunk: list, compression: Optional[str] = None, letter_date=None) -> tuple:
+    """
+    ProcessPoolExecutor task for (name, job) pairs. Returns (results, segment),
+    results being (name, record, target, data, size, error) per job. With a tar
+    compression ("gz"/"xz") the letters come back packed in segment (see
+    _tar_segment()) and data is None; otherwise data is the encoded letter.
+    """
+    results, files = [], []
+    for name, job in chunk:
+        try:
+            problem = campaign_job_error(job)
+            if problem:
+                raise ValueError(problem)
+            recipient = DisputeMailer._resolve_recipient(job["target"], job.get("custom_recipient"))
+            html = generate_letter_html(
+                job["letter_type"], job["client"], recipient, job["dispute_items"], job.get("extra_context"),
+                letter_date,
+            )
+        except Exception as e:
+            results.append((name, job.get("record"), job.get("target"), None, 0, str(e)))
+            continue
+        data = html.encode("utf-8")
+        if compression:
+            files.append((name, data))
+            data_out = None
+        else:
+            data_out = data
+        results.append((name, job.get("record"), job["target"], data_out, len(data), None))
+    segment = _tar_segment(files, compression) if files else None
+    return results, segment
+
+
+class _DirectoryOutput:
+    compression = None
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def write(self, name: str, data: bytes):
+        (self.path / name).write_bytes(data)
+
+    def close(self):
+        pass
+
+
+class _ZipOutput:
+    compression = None
+
+    def __init__(self, path: Path):
+        import zipfile
+
+        self.archive = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+
+    def write(self, name: str, data: bytes):
+        self.archive.writestr(name, data)
+
+    def close(self):
+        self.archive.close()
+
+
+class _TarOutput:
+    """Concatenates compressed tar segments from the workers, then the end-of-archive blocks."""
+
+    def __init__(self, path: Path, compression: str):
+        self.compression = compression
+        self.file = open(path, "wb")
+
+    def write_segment(self, segment: bytes):
+        self.file.write(segment)
+
+    def close(self):
+        import tarfile
+
+        self.file.write(_compress(b"\0" * tarfile.RECORDSIZE, self.compression))
+        self.file.close()
+
+
+def _render_output(output: str):
+    """Writer for render_letters(): a .zip, .tar.gz/.tgz/.tar.xz archive, or else a directory."""
+    path = Path(output)
+    name = path.name.lower()
+    if name.endswith(".zip"):
+        return _ZipOutput(path)
+    if name.endswith((".tar.gz", ".tgz")):
+        return _TarOutput(path, "gz")
+    if name.endswith(".tar.xz"):
+        return _TarOutput(path, "xz")
+    return _DirectoryOutput(path)
+
+
+def render_letters(
+    jobs,
+    output: str,
+    max_workers: Optional[int] = None,
+    chunk_size: int = RENDER_CHUNK_SIZE,
+    letter_date=None,
+) -> dict:
+    """
+    Render letters to disk without sending them — for proofreading or archiving a campaign.
+
+    jobs is an iterable of send_dispute()-style dicts (as yielded by
+    iter_campaign_jobs()). They are rendered with generate_letter_html() in a
+    ProcessPoolExecutor, chunk_size jobs per task, with at most two chunks per
+    worker in flight, so jobs are consumed lazily. Letters are written to
+    output — a directory, or a single .zip/.tar.gz/.tar.xz archive — as their
+    chunks complete, named by render_file_name(). For tar archives the workers
+    also compress (see _tar_segment()); .zip entries are deflated here.
+    Every letter carries letter_date (default: the day rendering starts).
+
+    Returns {"rendered", "failed", "failures", "bytes", "elapsed", "letters_per_sec"};
+    a job that fails to render is reported in failures and the rest carry on.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    max_workers = max_workers or os.cpu_count() or 1
+    letter_date = _letter_date(letter_date)
+    summary = {"rendered": 0, "failed": 0, "failures": [], "bytes": 0}
+    sink = _render_output(output)
+
+    def collect(done):
+        for future in done:
+            results, segment = future.result()
+            if segment:
+                sink.write_segment(segment)
+            for name, record, target, data, size, error in results:
+                if error is not None:
+                    summary["failed"] += 1
+                    summary["failures"].append({"record": record, "target": target, "error": error})
+                    continue
+                if data is not None:
+                    sink.write(name, data)
+                summary["rendered"] += 1
+                summary["bytes"] += size
+
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            in_flight = set()
+            chunk = []
+            for number, job in enumerate(jobs, 1):
+                chunk.append((render_file_name(number, job), job))
+                if len(chunk) < chunk_size:
+                    continue
+                if len(in_flight) >= max_workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight.add(pool.submit(_render_chunk, chunk, sink.compression, letter_date))
+                chunk = []
+            if chunk:
+                in_flight.add(pool.submit(_render_chunk, chunk, sink.compression, letter_date))
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+    finally:
+        sink.close()
+
+    summary["elapsed"] = time.perf_counter() - start
+    done = summary["rendered"] + summary["failed"]
+    summary["letters_per_sec"] = done / summary["elapsed"] if summary["elapsed"] else 0.0
+    return summary
+
+
+# ---------------------------------------------------------------------------
+# ADDRESS VERIFICATION CACHE
+# ---------------------------------------------------------------------------
+
+def normalize_address(address: dict) -> dict:
+    """Map client/recipient address dicts (city/state/zip or address_*) to Lob's field names."""
+    return {
+        "name": address.get("name", ""),
+        "address_line1": address.get("address_line1", ""),
+        "address_city": address.get("address_city", address.get("city", "")),
+        "address_state": address.get("address_state", address.get("state", "")),
+        "address_zip": address.get("address_zip", address.get("zip", "")),
+    }
+
+
+def address_cache_key(address: dict) -> str:
+    """Case- and whitespace-insensitive key for the deliverable part of an address."""
+    normalized = normalize_address(address)
+    return "|".join(
+        " ".join(str(normalized[f]).split()).upper()
+        for f in ("address_line1", "address_city", "address_state", "address_zip")
+    )
+
+
+def is_deliverable(verification: dict) -> bool:
+    """True for any of Lob's deliverable* verdicts; False for undeliverable or an error entry."""
+    return str(verification.get("deliverability", "")).startswith("deliverable")
+
+
+class UndeliverableAddressError(ValueError):
+    """Address verification says a letter to/from this address cannot be delivered."""
+
+
+class AddressVerificationCache:
+    """
+    Persistent cache of Lob /us_verifications results.
+
+    Entries expire after ttl seconds and the least recently used entry is
+    evicted beyond max_entries. New results are appended to a JSON Lines file,
+    which is rewritten with only the live entries once it grows past twice
+    max_entries. hits/misses count lookups since the cache was opened.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = ADDRESS_CACHE_TTL_DAYS * 86400,
+        max_entries: int = ADDRESS_CACHE_MAX_ENTRIES,
+    ):
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lines = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if self.path is None or not self.path.exists():
+            return
+        now = time.time()
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                self._lines += 1
+                entry = json.loads(line)
+                self._entries.pop(entry["key"], None)
+                if entry["expires"] > now:
+                    self._entries[entry["key"]] = (entry["expires"], entry["result"])
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, address: dict) -> Optional[dict]:
+        """Cached verification for this address, or None on a miss or expired entry."""
+        key = address_cache_key(address)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, address: dict, result: dict):
+        key = address_cache_key(address)
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires, result)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            if self.path is None:
+                return
+            if self._lines >= 2 * self.max_entries:
+                self._rewrite()
+            else:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"key": key, "expires": expires, "result": result}) + "\n")
+                self._lines += 1
+
+    def _rewrite(self):
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, (expires, result) in self._entries.items():
+                f.write(json.dumps({"key": key, "expires": expires, "result": result}) + "\n")
+        os.replace(tmp_path, self.path)
+        self._lines = len(self._entries)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self._entries)}
+
+
+# ---------------------------------------------------------------------------
+# LETTER CACHE
+# ---------------------------------------------------------------------------
+
+class LetterCache:
+    """
+    Content-addressed cache of rendered letters and the Lob letters they became.
+
+    Keys are letter_content_key() hashes. An entry holds the rendered HTML and,
+    once Lob accepts the letter, its letter id, so a retried or re-run send of
+    a byte-identical letter neither re-renders nor re-uploads — it is reported
+    as a duplicate of the letter already sent. Least recently used entries are
+    evicted once their size (HTML plus a fixed per-entry overhead) passes
+    max_bytes. Only letter ids are persisted, to a JSON Lines file that is
+    rewritten with the live entries once it holds twice as many lines.
+    """
+
+    # Bytes charged per entry on top of its HTML (key, id and bookkeeping)
+    ENTRY_OVERHEAD = 160
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = LETTER_CACHE_MAX_BYTES):
+        self.path = Path(path) if path else None
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key → [html or None, letter_id or None]
+        self._lines = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if self.path is None or not self.path.exists():
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                self._lines += 1
+                entry = json.loads(line)
+                self._store(entry["key"])[1] = entry["letter_id"]
+        self._evict()
+
+    def _store(self, key: str) -> list:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [None, None]
+            self.size += self.ENTRY_OVERHEAD
+        else:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _evict(self):
+        while self.size > self.max_bytes and len(self._entries) > 1:
+            _, (html, _) = self._entries.popitem(last=False)
+            self.size -= self.ENTRY_OVERHEAD + len(html or "")
+            self.evictions += 1
+
+    def html(self, key: str) -> Optional[str]:
+        """Cached rendering for this content key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put_html(self, key: str, html: str):
+        with self._lock:
+            entry = self._store(key)
+            if entry[0] is None:
+                entry[0] = html
+                self.size += len(html)
+                self._evict()
+
+    def letter_id(self, key: str) -> Optional[str]:
+        """Lob id of the letter already accepted with this content, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def put_letter_id(self, key: str, letter_id: str):
+        with self._lock:
+            self._store(key)[1] = letter_id
+            self._evict()
+            if self.path is None:
+                return
+            if self._lines >= 2 * max(len(self._entries), 1000):
+                self._rewrite()
+            else:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"key": key, "letter_id": letter_id}) + "\n")
+                self._lines += 1
+
+    def _rewrite(self):
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._lines = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, (_, letter_id) in self._entries.items():
+                if letter_id is not None:
+                    f.write(json.dumps({"key": key, "letter_id": letter_id}) + "\n")
+                    self._lines += 1
+        os.replace(tmp_path, self.path)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+            "entries": len(self._entries), "bytes": self.size,
+        }
+
+
+# ---------------------------------------------------------------------------
+# INSTRUMENTATION
+# ---------------------------------------------------------------------------
+
+# Histogram bucket upper bounds (seconds) for stage and request latencies
+METRICS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(METRICS_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(METRICS_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip([str(b) for b in METRICS_BUCKETS] + ["+Inf"], self.counts)),
+        }
+
+
+class PipelineMetrics:
+    """
+    In-process metrics for the send pipeline, fed by DisputeMailer(metrics=...).
+
+    Records per-stage latency histograms (render, lob_send, verify_address,
+    check_delivery_status, tracker.<op>, ...), per-route Lob request
+    latencies, bytes sent, response status counts and retries, exported as
+    Prometheus text (prometheus()) or a JSON-able snapshot (snapshot()).
+
+    Any object with the same observe/request/retry methods can be passed
+    instead, to forward measurements elsewhere. A mailer without metrics
+    skips all of this behind a single `is None` check per stage.
+    """
+
+    def __init__(self):
+        self._stages = {}  # stage → _Histogram
+        self._stage_errors = {}  # stage → count
+        self._requests = {}  # (method, route) → _Histogram
+        self._bytes = {}  # (method, route) → bytes
+        self._statuses = {}  # (method, route, status) → count
+        self._retries = {}  # (method, route, reason) → count
+        self._lock = threading.Lock()
+
+    # -- Hooks --------------------------------------------------------------
+
+    def observe(self, stage: str, seconds: float, error: bool = False):
+        """One pass through a pipeline stage took seconds (error: it raised)."""
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = _Histogram()
+            histogram.observe(seconds)
+            if error:
+                self._stage_errors[stage] = self._stage_errors.get(stage, 0) + 1
+
+    def request(self, method: str, route: str, status, seconds: float, sent_bytes: int):
+        """One HTTP attempt to Lob (status is the response code, or "error" if none came back)."""
+        key = (method, route)
+        with self._lock:
+            histogram = self._requests.get(key)
+            if histogram is None:
+                histogram = self._requests[key] = _Histogram()
+            histogram.observe(seconds)
+            self._bytes[key] = self._bytes.get(key, 0) + sent_bytes
+            status_key = (method, route, str(status))
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+
+    def retry(self, method: str, route: str, reason: str):
+        """An attempt is being retried (reason: status code or exception name)."""
+        key = (method, route, reason)
+        with self._lock:
+            self._retries[key] = self._retries.get(key, 0) + 1
+
+    # -- Export -------------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        """{stages, stage_errors, requests, bytes_sent, statuses, retries} as plain JSON-able dicts."""
+        with self._lock:
+            return {
+                "stages": {stage: h.snapshot() for stage, h in self._stages.items()},
+                "stage_errors": dict(self._stage_errors),
+                "requests": {f"{m} {r}": h.snapshot() for (m, r), h in self._requests.items()},
+                "bytes_sent": {f"{m} {r}": n for (m, r), n in self._bytes.items()},
+                "statuses": {f"{m} {r} {s}": n for (m, r, s), n in self._statuses.items()},
+                "retries": {f"{m} {r} {reason}": n for (m, r, reason), n in self._retries.items()},
+            }
+
+    @staticmethod
+    def _labels(**labels) -> str:
+        return ",".join(f'{k}="{v}"' for k, v in labels.items())
+
+    def _histogram_lines(self, name: str, labels: str, histogram: _Histogram) -> list:
+        lines, total = [], 0
+        for bound, count in zip([f"{b:g}" for b in METRICS_BUCKETS] + ["+Inf"], histogram.counts):
+            total += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return lines
+
+    def prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines = [
+                "# HELP certified_mail_stage_seconds Time spent in each send pipeline stage.",
+                "# TYPE certified_mail_stage_seconds histogram",
+            ]
+            for stage, histogram in sorted(self._stages.items()):
+                lines += self._histogram_lines("certified_mail_stage_seconds", self._labels(stage=stage), histogram)
+            lines += [
+                "# HELP certified_mail_stage_errors_total Stage passes that raised.",
+                "# TYPE certified_mail_stage_errors_total counter",
+            ]
+            lines += [
+                f"certified_mail_stage_errors_total{{{self._labels(stage=stage)}}} {n}"
+                for stage, n in sorted(self._stage_errors.items())
+            ]
+            lines += [
+                "# HELP lob_request_seconds Lob API request latency per attempt.",
+                "# TYPE lob_request_seconds histogram",
+            ]
+            for (method, route), histogram in sorted(self._requests.items()):
+                lines += self._histogram_lines(
+                    "lob_request_seconds", self._labels(method=method, route=route), histogram
+                )
+            lines += [
+                "# HELP lob_request_bytes_total Request body bytes sent to Lob.",
+                "# TYPE lob_request_bytes_total counter",
+            ]
+            lines += [
+                f"lob_request_bytes_total{{{self._labels(method=m, route=r)}}} {n}"
+                for (m, r), n in sorted(self._bytes.items())
+            ]
+            lines += [
+                "# HELP lob_responses_total Lob API responses by status code.",
+                "# TYPE lob_responses_total counter",
+            ]
+            lines += [
+                f"lob_responses_total{{{self._labels(method=m, route=r, status=s)}}} {n}"
+                for (m, r, s), n in sorted(self._statuses.items())
+            ]
+            lines += [
+                "# HELP lob_retries_total Lob API attempts retried, by reason.",
+                "# TYPE lob_retries_total counter",
+            ]
+            lines += [
+                f"lob_retries_total{{{self._labels(method=m, route=r, reason=reason)}}} {n}"
+                for (m, r, reason), n in sorted(self._retries.items())
+            ]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Write prometheus() to a .prom/.txt path, otherwise the JSON snapshot()."""
+        path = Path(path)
+        if path.suffix.lower() in (".prom", ".txt"):
+            text = self.prometheus()
+        else:
+            text = json.dumps(self.snapshot(), indent=2)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+class _NullStage:
+    """Stage timer used when metrics are disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        error = exc_type is not None and exc_type is not GeneratorExit  # GeneratorExit: iteration stopped early
+        self.metrics.observe(self.name, time.perf_counter() - self.start, error=error)
+        return False
+
+
+def metrics_stage(metrics, name: str):
+    """Context manager timing one pass through a stage into metrics (a no-op for None)."""
+    return _NULL_STAGE if metrics is None else _Stage(metrics, name)
+
+
+class _InstrumentedTracker:
+    """A dispute tracker whose operations are timed as tracker.<op> stages."""
+
+    OPS = frozenset((
+        "append", "append_many", "update", "update_many", "get", "items", "load",
+        "pending", "pending_status", "due", "compact", "sync",
+    ))
+
+    def __init__(self, tracker, metrics):
+        self._tracker = tracker
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self._tracker, name)
+        if name in self.OPS:
+            def timed(*args, **kwargs):
+                with _Stage(self._metrics, f"tracker.{name}"):
+                    return attr(*args, **kwargs)
+            return timed
+        if name == "iter_disputes":
+            def timed_iter(*args, **kwargs):
+                # Timed from the first read to the last record handed out
+                with _Stage(self._metrics, "tracker.iter_disputes"):
+                    yield from attr(*args, **kwargs)
+            return timed_iter
+        return attr
+
+
+def instrument_tracker(tracker, metrics):
+    """tracker with its operations timed into metrics, or tracker itself if metrics is None."""
+    return tracker if metrics is None else _InstrumentedTracker(tracker, metrics)
+
+
+# ---------------------------------------------------------------------------
+# RATE LIMITING & RETRIES
+# ---------------------------------------------------------------------------
+
+class LobAPIError(Exception):
+    """A Lob API call failed with a non-success HTTP status."""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"Lob API error {status_code}: {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+class TokenBucket:
+    """Thread-safe token bucket: acquire() blocks until a request may be sent."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on letters in flight.
+
+    Each success raises the limit by 1/limit (about +1 per full window) up to
+    max_limit; a 429 halves it, at most once per cooldown so one burst of
+    throttled responses counts as a single congestion signal. Throughput
+    settles just under the highest rate the API accepts.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, cooldown: float = 1.0):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.cooldown = cooldown
+        self.limit = float(max_limit)
+        self.throttled = 0
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        with self._cond:
+            while self._in_flight >= int(self.limit):
+                self._cond.wait()
+            self._in_flight += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def on_success(self):
+        with self._cond:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify()
+
+    def on_throttle(self):
+        with self._cond:
+            self.throttled += 1
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(self.min_limit, self.limit / 2)
+                self._last_decrease = now
+
+
+def _retry_after_seconds(resp) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date)."""
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff_seconds(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given 0-based retry attempt."""
+    import random
+
+    return random.uniform(0, min(LOB_BACKOFF_MAX, LOB_BACKOFF_BASE * 2 ** attempt))
+
+
+# Shared by every DisputeMailer so concurrent mailers stay under one account-wide rate
+LOB_RATE_LIMITER = TokenBucket(LOB_RATE_LIMIT, LOB_RATE_BURST)
+
+
+# ---------------------------------------------------------------------------
+# LOB API INTEGRATION
+# ---------------------------------------------------------------------------
+
+class DisputeMailer:
+    """
+    Send certified dispute letters via Lob API.
+
+    base_url points the mailer at another Lob-compatible endpoint (such as
+    scripts/lob_mock_server.py). With use_templates, each letter type is
+    registered once as a stored Lob template and letters are sent as its id
+    plus merge_variables instead of the full HTML (see template_id()).
+
+    Calls share one keep-alive connection pool of pool_size connections per
+    host (grown to match campaign and worker concurrency) and time out after
+    timeout=(connect, read) seconds; connection_stats() shows how many
+    connections were opened for how many requests.
+
+    With metrics (a PipelineMetrics), every pipeline stage, tracker
+    operation and Lob request attempt is timed and counted into it.
+    """
+
+    def __init__(
+        self,
+        api_key: str = None,
+        log_path: str = None,
+        tracker_engine: str = None,
+        address_cache: Optional[AddressVerificationCache] = None,
+        letter_cache: Optional[LetterCache] = None,
+        base_url: Optional[str] = None,
+        use_templates: Optional[bool] = None,
+        pool_size: Optional[int] = None,
+        timeout=None,
+        connect_retries: Optional[int] = None,
+        metrics: Optional[PipelineMetrics] = None,
+    ):
+        self.api_key = api_key or LOB_API_KEY
+        self.base_url = (base_url or LOB_BASE_URL).rstrip("/")
+        self.use_templates = LOB_USE_TEMPLATES if use_templates is None else use_templates
+        self._template_ids = None
+        self._template_lock = threading.Lock()
+        self.pool_size = pool_size or LOB_POOL_SIZE
+        self.timeout = timeout or (LOB_CONNECT_TIMEOUT, LOB_READ_TIMEOUT)
+        self.connect_retries = LOB_CONNECT_RETRIES if connect_retries is None else connect_retries
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._retired_stats = {"requests": 0, "connections": 0}
+        self.log_path = log_path
+        self.tracker_engine = tracker_engine
+        self._tracker = None
+        self.rate_limiter = LOB_RATE_LIMITER
+        self.concurrency = None  # AdaptiveConcurrency while a campaign is running
+        self.metrics = metrics
+        self._address_cache = address_cache
+        self._letter_cache = letter_cache
+
+    # -- HTTP ---------------------------------------------------------------
+
+    @property
+    def session(self):
+        """
+        requests.Session for Lob calls, created (and requests imported) on first
+        use so tracker-only work needs neither the library nor an API key.
+        """
+        if self._session is None:
+            if not self.api_key:
+                raise ValueError(
+                    "LOB_API_KEY not set. Get one at dashboard.lob.com and set the env var."
+                )
+            import requests
+
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    session.auth = (self.api_key, "")
+                    self._mount_adapter(session)
+                    self._retry_errors = (requests.ConnectionError, requests.Timeout)
+                    self._session = session
+        return self._session
+
+    def _mount_adapter(self, session):
+        """Mount an HTTPAdapter holding pool_size keep-alive connections per host."""
+        from requests.adapters import HTTPAdapter
+
+        retries = 0
+        if self.connect_retries:
+            from urllib3.util.retry import Retry
+
+            retries = Retry(
+                total=self.connect_retries, connect=self.connect_retries, read=0, status=0, other=0,
+                backoff_factor=0.1, raise_on_status=False,
+            )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=retries)
+        retired = {id(a): a for a in session.adapters.values()}
+        for prefix in ("https://", "http://"):
+            session.mount(prefix, adapter)
+        for previous in retired.values():
+            for field, value in self._adapter_stats(previous).items():
+                self._retired_stats[field] += value
+
+    def ensure_pool_size(self, size: int):
+        """
+        Grow the connection pool to at least size connections per host, so
+        that many concurrent calls each keep a reusable connection.
+        """
+        with self._session_lock:
+            if size <= self.pool_size:
+                return
+            self.pool_size = size
+            if self._session is not None:
+                self._mount_adapter(self._session)
+
+    @staticmethod
+    def _adapter_stats(adapter) -> dict:
+        stats = {"requests": 0, "connections": 0}
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                stats["requests"] += pool.num_requests
+                stats["connections"] += pool.num_connections
+        return stats
+
+    def _connection_delta(self, before: dict) -> dict:
+        stats = self.connection_stats()
+        for field in ("requests", "connections"):
+            stats[field] -= before[field]
+        stats["reused"] = max(0, stats["requests"] - stats["connections"])
+        return stats
+
+    def connection_stats(self) -> dict:
+        """
+        {requests, connections, reused, pool_size} over this mailer's session:
+        connections counts new TCP (and TLS) connections opened, reused the
+        requests served over an already open keep-alive connection.
+        """
+        stats = dict(self._retired_stats)
+        if self._session is not None:
+            for adapter in {id(a): a for a in self._session.adapters.values()}.values():
+                for field, value in self._adapter_stats(adapter).items():
+                    stats[field] += value
+        stats["reused"] = max(0, stats["requests"] - stats["connections"])
+        stats["pool_size"] = self.pool_size
+        return stats
+
+    def _request(self, method: str, path: str, idempotent: bool = True, **kwargs):
+        """
+        Rate-limited Lob request with retries (path is relative to base_url,
+        or an absolute URL such as a list response's next_url).
+
+        429s, 5xx responses and connection errors are retried up to
+        LOB_MAX_RETRIES times with jittered exponential backoff, waiting at
+        least as long as any Retry-After header asks. Non-idempotent calls
+        (a letter POST without an idempotency key) are only retried on 429,
+        which Lob returns before doing any work. Calls time out after
+        self.timeout unless given their own timeout. Returns the final response.
+        """
+        url = path if path.startswith("http") else f"{self.base_url}{path}"
+        kwargs.setdefault("timeout", self.timeout)
+        metrics = self.metrics
+        route = self._metrics_route(url) if metrics is not None else None
+        for attempt in range(LOB_MAX_RETRIES + 1):
+            session = self.session
+            with metrics_stage(metrics, "rate_limit_wait"):
+                self.rate_limiter.acquire()
+            start = time.perf_counter()
+            try:
+                resp = session.request(method, url, **kwargs)
+            except self._retry_errors as e:
+                if metrics is not None:
+                    metrics.request(method, route, "error", time.perf_counter() - start, 0)
+                if not idempotent or attempt == LOB_MAX_RETRIES:
+                    raise
+                if metrics is not None:
+                    metrics.retry(method, route, type(e).__name__)
+                time.sleep(_backoff_seconds(attempt))
+                continue
+            if metrics is not None:
+                body = resp.request.body or b""
+                metrics.request(
+                    method, route, resp.status_code, time.perf_counter() - start,
+                    len(body.encode("utf-8") if isinstance(body, str) else body),
+                )
+
+            throttled = resp.status_code == 429
+            if throttled and self.concurrency is not None:
+                self.concurrency.on_throttle()
+            retryable = throttled or (idempotent and resp.status_code >= 500)
+            if not retryable or attempt == LOB_MAX_RETRIES:
+                if resp.status_code < 400 and self.concurrency is not None:
+                    self.concurrency.on_success()
+                return resp
+            if metrics is not None:
+                metrics.retry(method, route, str(resp.status_code))
+            delay = _backoff_seconds(attempt)
+            retry_after = _retry_after_seconds(resp)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            time.sleep(delay)
+        return resp
+
+    def _metrics_route(self, url: str) -> str:
+        """Path of a Lob URL relative to base_url, without query or ids (/letters/{id})."""
+        import re
+
+        path = url.split("?", 1)[0]
+        if path.startswith(self.base_url):
+            path = path[len(self.base_url):]
+        # Lob ids are a prefix, an underscore and an alphanumeric part with digits (ltr_4868c3b7...)
+        return re.sub(r"/[a-z]+(?:_[a-z]+)*_(?=[a-zA-Z]*\d)[0-9A-Za-z]+(?=/|$)", "/{id}", path)
+
+    # -- Address Verification -----------------------------------------------
+
+    @property
+    def address_cache(self) -> AddressVerificationCache:
+        """Verification cache at ADDRESS_CACHE_PATH, opened on first use."""
+        if self._address_cache is None:
+            self._address_cache = AddressVerificationCache(ADDRESS_CACHE_PATH or None)
+        return self._address_cache
+
+    @property
+    def letter_cache(self) -> LetterCache:
+        """Rendered/sent letter cache at LETTER_CACHE_PATH, opened on first use."""
+        if self._letter_cache is None:
+            self._letter_cache = LetterCache(LETTER_CACHE_PATH or None)
+        return self._letter_cache
+
+    def verify_address(self, address: dict, use_cache: bool = True) -> dict:
+        """Verify a US address via Lob's Address Verification API (cached; see AddressVerificationCache)."""
+        with metrics_stage(self.metrics, "verify_address"):
+            if use_cache:
+                cached = self.address_cache.get(address)
+                if cached is not None:
+                    return cached
+
+            resp = self._request("POST", "/us_verifications", json=self._verification_fields(address))
+            if resp.status_code != 200:
+                raise LobAPIError(resp.status_code, resp.text)
+            result = resp.json()
+            if use_cache:
+                self.address_cache.put(address, result)
+            return result
+
+    @staticmethod
+    def _verification_fields(address: dict) -> dict:
+        normalized = normalize_address(address)
+        return {
+            "primary_line": normalized["address_line1"],
+            "city": normalized["address_city"],
+            "state": normalized["address_state"],
+            "zip_code": normalized["address_zip"],
+        }
+
+    def verify_addresses(self, addresses: list, concurrency: int = CAMPAIGN_CONCURRENCY) -> dict:
+        """
+        Verify many addresses with as few requests as possible.
+
+        Duplicates (by address_cache_key) are verified once and cache hits cost
+        nothing. The rest go to /bulk/us_verifications in batches of
+        LOB_BULK_VERIFY_SIZE, several batches in flight at once; if the bulk
+        endpoint is refused, that batch falls back to single verifications.
+
+        Returns:
+            {address_cache_key: verification}. Addresses Lob could not verify map
+            to {"error": {...}}, which is_deliverable() treats as undeliverable.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        results = {}
+        missing = {}
+        for address in addresses:
+            key = address_cache_key(address)
+            if key in results or key in missing:
+                continue
+            cached = self.address_cache.get(address)
+            if cached is not None:
+                results[key] = cached
+            else:
+                missing[key] = address
+
+        def verify_batch(batch: list) -> list:
+            resp = self._request(
+                "POST",
+                "/bulk/us_verifications",
+                json={"addresses": [self._verification_fields(a) for _, a in batch]},
+            )
+            if resp.status_code == 200:
+                return [(key, result) for (key, _), result in zip(batch, resp.json()["addresses"])]
+            verified = []
+            for key, address in batch:
+                try:
+                    verified.append((key, self.verify_address(address, use_cache=False)))
+                except LobAPIError as e:
+                    verified.append((key, {"error": {"status_code": e.status_code, "message": e.text}}))
+            return verified
+
+        pending = list(missing.items())
+        batches = [pending[i:i + LOB_BULK_VERIFY_SIZE] for i in range(0, len(pending), LOB_BULK_VERIFY_SIZE)]
+        self.ensure_pool_size(min(concurrency, len(batches)))
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            for verified in pool.map(verify_batch, batches):
+                for key, result in verified:
+                    results[key] = result
+                    if "error" not in result:
+                        self.address_cache.put(missing[key], result)
+        return results
+
+    # -- Send Letter --------------------------------------------------------
+
+    def send_letter(
+        self,
+        from_address: dict,
+        to_address: dict,
+        letter_html: Optional[str] = None,
+        description: str = "Dispute Letter",
+        certified: bool = True,
+        return_receipt: bool = True,
+        color: bool = False,
+        idempotency_key: Optional[str] = None,
+        template_id: Optional[str] = None,
+        merge_variables: Optional[dict] = None,
+    ) -> dict:
+        """
+        Send a physical letter via Lob.
+
+        Args:
+            from_address: {name, address_line1, address_city, address_state, address_zip}
+            to_address: same format
+            letter_html: HTML content of the letter
+            template_id: Stored Lob template to print instead of letter_html,
+                filled from merge_variables
+            description: Internal description for tracking
+            certified: Send as USPS Certified Mail
+            return_receipt: Include return receipt (green card)
+            color: Print in color (costs more)
+            idempotency_key: Sent as the Idempotency-Key header so a retried
+                POST returns the letter Lob already accepted instead of mailing twice
+        """
+        data = {"description": description}
+        for prefix, address in (("to", to_address), ("from", from_address)):
+            for field, value in normalize_address(address).items():
+                data[f"{prefix}[{field}]"] = value
+        if template_id:
+            data["file"] = template_id
+            for name, value in (merge_variables or {}).items():
+                data[f"merge_variables[{name}]"] = value
+        else:
+            data["file"] = letter_html
+        data.update({
+            "color": str(color).lower(),
+            "mail_type": "usps_first_class",
+            "address_placement": "top_first_page",
+        })
+
+        if certified and return_receipt:
+            data["extra_service"] = "certified_return_receipt"
+        elif certified:
+            data["extra_service"] = "certified"
+
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        resp = self._request(
+            "POST", "/letters", idempotent=bool(idempotency_key), data=data, headers=headers
+        )
+
+        if resp.status_code != 200:
+            raise LobAPIError(resp.status_code, resp.text)
+
+        return resp.json()
+
+    # -- Stored Templates ---------------------------------------------------
+
+    def _template_registry(self) -> dict:
+        path = Path(LOB_TEMPLATE_REGISTRY_PATH) if LOB_TEMPLATE_REGISTRY_PATH else None
+        if path is None or not path.exists():
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _template_scope(self) -> str:
+        # Test and live keys (and other endpoints) see different template ids
+        return f"{'test' if self.api_key.startswith('test_') else 'live'} {self.base_url}"
+
+    def _load_template_ids(self) -> dict:
+        """Registered {description: template id}, from LOB_TEMPLATE_REGISTRY_PATH or else Lob's list."""
+        known = self._template_registry().get(self._template_scope())
+        if known is not None:
+            return known
+        ids = {}
+        next_page = "/templates"
+        params = {"limit": 100}
+        while next_page:
+            resp = self._request("GET", next_page, params=params)
+            if resp.status_code != 200:
+                raise LobAPIError(resp.status_code, resp.text)
+            page = resp.json()
+            for template in page.get("data", []):
+                if template.get("description", "").startswith("Credit Architect "):
+                    ids.setdefault(template["description"], template["id"])
+            next_page, params = page.get("next_url"), None
+        return ids
+
+    def _save_template_ids(self):
+        if not LOB_TEMPLATE_REGISTRY_PATH:
+            return
+        registry = self._template_registry()
+        registry[self._template_scope()] = self._template_ids
+        path = Path(LOB_TEMPLATE_REGISTRY_PATH)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(registry, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def template_id(self, letter_type: str) -> str:
+        """
+        Lob template id for a letter type, registering the template on first use.
+
+        Templates are looked up by lob_template_description(), so each version
+        of a letter type is registered once per Lob account; known ids are
+        cached in LOB_TEMPLATE_REGISTRY_PATH per test/live mode and base_url.
+        """
+        description = lob_template_description(letter_type)
+        with self._template_lock:
+            if self._template_ids is None:
+                self._template_ids = self._load_template_ids()
+                self._save_template_ids()
+            if description not in self._template_ids:
+                document = LETTER_DOCUMENTS.get(letter_type, LETTER_DOCUMENTS["basic_bureau"])
+                resp = self._request(
+                    "POST", "/templates", data={"description": description, "html": document.handlebars()}
+                )
+                if resp.status_code != 200:
+                    raise LobAPIError(resp.status_code, resp.text)
+                self._template_ids[description] = resp.json()["id"]
+                self._save_template_ids()
+            return self._template_ids[description]
+
+    def register_templates(self, letter_types=None) -> dict:
+        """Register (or find) the stored template of every letter type; returns {letter_type: template id}."""
+        return {t: self.template_id(t) for t in (letter_types or LETTER_TEMPLATES)}
+
+    # -- High-Level Dispute Sender ------------------------------------------
+
+    @staticmethod
+    def _resolve_recipient(target: str, custom_recipient: Optional[dict]) -> dict:
+        if custom_recipient:
+            return custom_recipient
+        if target in BUREAU_ADDRESSES:
+            return BUREAU_ADDRESSES[target]
+        raise ValueError(
+            f"Target '{target}' not found. Use 'equifax', 'experian', 'transunion', "
+            f"or provide custom_recipient dict."
+        )
+
+    @staticmethod
+    def _client_address(client: dict) -> dict:
+        """Normalize client address for Lob."""
+        return {
+            "name": client["name"],
+            "address_line1": client.get("address_line1", client.get("address", "")),
+            "address_city": client.get("address_city", client.get("city", "")),
+            "address_state": client.get("address_state", client.get("state", "")),
+            "address_zip": client.get("address_zip", client.get("zip", "")),
+        }
+
+    def _letter_content(
+        self,
+        letter_type: str,
+        client: dict,
+        recipient: dict,
+        dispute_items: list,
+        extra_context: Optional[dict],
+        letter_date,
+        values: Optional[dict] = None,
+    ) -> tuple:
+        """
+        (content key, send_letter() content kwargs) for a letter: the stored
+        template id and merge_variables with use_templates, otherwise the HTML,
+        rendered only on a letter cache miss.
+        """
+        with metrics_stage(self.metrics, "render"):
+            key = letter_content_key(letter_type, client, recipient, dispute_items, extra_context, letter_date)
+            if self.use_templates:
+                if values is None:
+                    values = _letter_values(letter_type, client, dispute_items, extra_context, letter_date)
+                return key, {
+                    "template_id": self.template_id(letter_type),
+                    "merge_variables": _merge_variables(values, recipient),
+                }
+            letter_html = self.letter_cache.html(key)
+            if letter_html is None:
+                if values is None:
+                    values = _letter_values(letter_type, client, dispute_items, extra_context, letter_date)
+                letter_html = _render_letter(letter_type, values, recipient)
+                self.letter_cache.put_html(key, letter_html)
+            return key, {"letter_html": letter_html}
+
+    def _sent_duplicate(self, content_key: str, letter_type: str, target: str) -> Optional[dict]:
+        """
+        A "duplicate" result pointing at the letter Lob already accepted with
+        this exact content, or None if it has not been sent.
+
+        A cached letter id only counts once the tracker holds that letter: if
+        the process died between Lob accepting it and the tracker write, the
+        send is retried under the same idempotency key, Lob replays the
+        original letter and it is logged then.
+        """
+        letter_id = self.letter_cache.letter_id(content_key)
+        if letter_id is None or self.tracker.get(letter_id) is None:
+            return None
+        return {
+            "letter_id": letter_id,
+            "letter_type": letter_type,
+            "target": target,
+            "status": "duplicate",
+            "content_key": content_key,
+            "duplicate": True,
+        }
+
+    def _replayed(self, tracking: dict) -> Optional[dict]:
+        """
+        The record already tracked for the letter Lob returned, or None for a
+        new letter. Lob answers a reused Idempotency-Key with the letter it
+        created the first time, which must not be logged again.
+        """
+        letter_id = tracking.get("letter_id")
+        return self.tracker.get(letter_id) if letter_id else None
+
+    def _send_rendered(
+        self,
+        from_address: dict,
+        recipient: dict,
+        letter_type: str,
+        target: str,
+        content: dict,
+        dispute_items: list,
+        idempotency_key: Optional[str] = None,
+        content_key: Optional[str] = None,
+        client_id: Optional[str] = None,
+    ) -> dict:
+        """
+        Send an already rendered letter (content: send_letter() letter_html or
+        template_id/merge_variables kwargs) and build its tracking record (not
+        yet logged). With a content_key, the accepted letter id is remembered in
+        the letter cache so the same content is not mailed again. client_id
+        (see dispute_client_id()) is kept on the record for per-client queries.
+        """
+        template_info = LETTER_TEMPLATES[letter_type]
+
+        # Send via Lob
+        description = f"Credit Dispute #{template_info['id']} - {template_info['name']} - {target}"
+        with metrics_stage(self.metrics, "lob_send"):
+            result = self.send_letter(
+                from_address=from_address,
+                to_address=recipient,
+                description=description,
+                idempotency_key=idempotency_key,
+                **content,
+            )
+        if content_key and result.get("id"):
+            self.letter_cache.put_letter_id(content_key, result["id"])
+
+        # Build tracking record
+        now = datetime.now()
+        return {
+            "letter_id": result.get("id"),
+            "tracking_number": result.get("tracking_number"),
+            "carrier": result.get("carrier", "USPS"),
+            "expected_delivery": result.get("expected_delivery_date"),
+            "letter_type": letter_type,
+            "letter_name": template_info["name"],
+            "legal_basis": template_info["legal_basis"],
+            "target": target,
+            "client_id": client_id,
+            "recipient_name": recipient["name"],
+            "sent_date": now.isoformat(),
+            "response_deadline": (now + timedelta(days=30)).isoformat(),
+            "escalation_date": (now + timedelta(days=35)).isoformat(),
+            "status": "sent",
+            "items_disputed": dispute_items,
+            "lob_url": result.get("url"),
+            "thumbnail": result.get("thumbnails", [{}])[0].get("large") if result.get("thumbnails") else None,
+            "cost": result.get("price"),
+            "idempotency_key": idempotency_key,
+            "content_key": content_key,
+            "is_test": IS_TEST,
+        }
+
+    def send_dispute(
+        self,
+        client: dict,
+        letter_type: str,
+        target: str,
+        dispute_items: list,
+        custom_recipient: Optional[dict] = None,
+        extra_context: Optional[dict] = None,
+        idempotency_key: Optional[str] = None,
+        verify: bool = False,
+        letter_date=None,
+    ) -> dict:
+        """
+        Full dispute pipeline: generate letter → verify addresses → send certified → log.
+
+        Args:
+            client: {name, address_line1, city, state, zip, ssn_last4, dob}
+            letter_type: Key from LETTER_TEMPLATES (e.g., "basic_bureau", "debt_validation")
+            target: "equifax" | "experian" | "transunion" | or custom
+            dispute_items: [{account_name, account_number_last4, reason, details}]
+            custom_recipient: Override recipient address (for collectors/creditors)
+            extra_context: Letter-specific fields (see generate_letter_html docstring)
+            idempotency_key: Defaults to dispute_idempotency_key() of this dispute
+            verify: Verify both addresses first (cached) and raise
+                UndeliverableAddressError instead of paying for an undeliverable letter
+            letter_date: Date printed on the letter (default today; see generate_letter_html)
+
+        Returns:
+            Tracking dict with letter_id, tracking_number, deadlines, etc. If a
+            letter with identical content was already accepted (see LetterCache),
+            nothing is sent or logged and the result is {letter_id, letter_type,
+            target, status: "duplicate", content_key, duplicate: True}.
+        """
+        template_info = LETTER_TEMPLATES.get(letter_type)
+        if not template_info:
+            raise ValueError(f"Unknown letter type: {letter_type}. Options: {list(LETTER_TEMPLATES.keys())}")
+
+        recipient = self._resolve_recipient(target, custom_recipient)
+        from_address = self._client_address(client)
+
+        if verify:
+            for label, address in (("from", from_address), ("to", recipient)):
+                verification = self.verify_address(address)
+                if not is_deliverable(verification):
+                    raise UndeliverableAddressError(
+                        f"Undeliverable {label} address {address_cache_key(address)}: "
+                        f"{verification.get('deliverability', verification.get('error'))}"
+                    )
+
+        # Generate letter content (HTML, or a stored template id plus merge variables)
+        content_key, content = self._letter_content(
+            letter_type, client, recipient, dispute_items, extra_context, letter_date
+        )
+        duplicate = self._sent_duplicate(content_key, letter_type, target)
+        if duplicate is not None:
+            return duplicate
+
+        tracking = self._send_rendered(
+            from_address, recipient, letter_type, target, content, dispute_items,
+            idempotency_key=idempotency_key or dispute_idempotency_key(
+                client, letter_type, target, dispute_items, recipient, extra_context, letter_date
+            ),
+            content_key=content_key,
+            client_id=dispute_client_id(client),
+        )
+
+        # Log to tracker, unless Lob replayed a letter that is already logged
+        existing = self._replayed(tracking)
+        if existing is not None:
+            return existing
+        self._log_dispute(tracking)
+
+        return tracking
+
+    # -- Batch Send (all 3 bureaus) -----------------------------------------
+
+    def send_to_all_bureaus(
+        self,
+        client: dict,
+        letter_type: str,
+        dispute_items: list,
+        extra_context: Optional[dict] = None,
+        concurrent: bool = False,
+        verify: bool = False,
+        letter_date=None,
+    ) -> list:
+        """
+        Send the same dispute letter to all 3 credit bureaus.
+
+        With concurrent=True the three letters are posted in parallel via
+        send_to_targets(), and a failed bureau is reported in place instead of
+        aborting the other two. verify and letter_date are passed through (see send_dispute).
+        """
+        if concurrent:
+            return self.send_to_targets(
+                client, letter_type, list(BUREAU_ADDRESSES), dispute_items,
+                extra_context=extra_context, verify=verify, letter_date=letter_date,
+            )
+
+        results = []
+        for bureau in ["equifax", "experian", "transunion"]:
+            result = self.send_dispute(
+                client=client,
+                letter_type=letter_type,
+                target=bureau,
+                dispute_items=dispute_items,
+                extra_context=extra_context,
+                verify=verify,
+                letter_date=letter_date,
+            )
+            results.append(result)
+            if result.get("duplicate"):
+                print(f"  ↺ Already sent to {bureau}: {result.get('letter_id')}")
+            else:
+                print(f"  ✓ Sent to {bureau}: {result.get('letter_id')} (tracking: {result.get('tracking_number')})")
+        return results
+
+    def send_to_targets(
+        self,
+        client: dict,
+        letter_type: str,
+        targets: list,
+        dispute_items: list,
+        extra_context: Optional[dict] = None,
+        custom_recipients: Optional[dict] = None,
+        max_workers: int = FANOUT_MAX_WORKERS,
+        verify: bool = False,
+        letter_date=None,
+    ) -> list:
+        """
+        Send one dispute to several targets concurrently over the shared session.
+
+        The letter body is computed once and only the recipient block is
+        rendered per target. Letters are posted from a bounded thread pool and
+        every accepted letter is logged in a single tracker write.
+
+        Args:
+            targets: Bureau keys and/or keys of custom_recipients
+            custom_recipients: {target: recipient address} for collectors/creditors
+            max_workers: Upper bound on in-flight Lob requests
+            verify: Verify all addresses in one bulk pass first; targets with an
+                undeliverable address fail without being sent
+            letter_date: Date printed on the letters (default today)
+
+        Returns:
+            One dict per target, in target order: the tracking record, a
+            "duplicate" result if identical content was already accepted (see
+            send_dispute), or {"target", "letter_type", "status": "failed",
+            "error"} if that send failed.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        if letter_type not in LETTER_TEMPLATES:
+            raise ValueError(f"Unknown letter type: {letter_type}. Options: {list(LETTER_TEMPLATES.keys())}")
+
+        custom_recipients = custom_recipients or {}
+        recipients = [self._resolve_recipient(t, custom_recipients.get(t)) for t in targets]
+        from_address = self._client_address(client)
+        values = _letter_values(letter_type, client, dispute_items, extra_context, letter_date)
+        verified = self.verify_addresses([from_address] + recipients, max_workers) if verify else {}
+        self.ensure_pool_size(min(max_workers, len(targets)))
+
+        def send_one(target: str, recipient: dict) -> dict:
+            try:
+                for label, address in (("from", from_address), ("to", recipient)):
+                    verification = verified.get(address_cache_key(address))
+                    if verification is not None and not is_deliverable(verification):
+                        raise UndeliverableAddressError(
+                            f"Undeliverable {label} address {address_cache_key(address)}: "
+                            f"{verification.get('deliverability', verification.get('error'))}"
+                        )
+                content_key, content = self._letter_content(
+                    letter_type, client, recipient, dispute_items, extra_context, letter_date, values
+                )
+                duplicate = self._sent_duplicate(content_key, letter_type, target)
+                if duplicate is not None:
+                    return duplicate
+                tracking = self._send_rendered(
+                    from_address, recipient, letter_type, target, content, dispute_items,
+                    idempotency_key=dispute_idempotency_key(
+                        client, letter_type, target, dispute_items, recipient, extra_context, letter_date
+                    ),
+                    content_key=content_key,
+                    client_id=dispute_client_id(client),
+                )
+                existing = self._replayed(tracking)
+                if existing is not None:
+                    replayed.add(existing["letter_id"])
+                    return existing
+                return tracking
+            except Exception as e:
+                return {"target": target, "letter_type": letter_type, "status": "failed", "error": str(e)}
+
+        replayed = set()  # letter ids Lob returned that are already logged
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets)))) as pool:
+            results = list(pool.map(send_one, targets, recipients))
+
+        self.tracker.append_many([
+            r for r in results if r["status"] not in ("failed", "duplicate") and r["letter_id"] not in replayed
+        ])
+
+        for r in results:
+            if r["status"] == "failed":
+                print(f"  ✗ Failed for {r['target']}: {r['error']}")
+            elif r["status"] == "duplicate":
+                print(f"  ↺ Already sent to {r['target']}: {r.get('letter_id')}")
+            else:
+                print(f"  ✓ Sent to {r['target']}: {r.get('letter_id')} (tracking: {r.get('tracking_number')})")
+        return results
+
+    # -- Bulk Campaign ------------------------------------------------------
+
+    def _job_addresses(self, job: dict) -> tuple:
+        """(from, to) addresses of a campaign job."""
+        recipient = self._resolve_recipient(job["target"], job.get("custom_recipient"))
+        return self._client_address(job["client"]), recipient
+
+    def preflight_campaign(self, jobs, concurrency: int = CAMPAIGN_CONCURRENCY) -> dict:
+        """
+        Pre-flight address stage: verify every distinct from/to address in a campaign.
+
+        Streams the jobs once, keeping only the distinct addresses, and
+        verifies them in bulk (see verify_addresses). Pass the returned
+        "verified" map to run_campaign() so records with an undeliverable
+        address fail before any letter is paid for.
+
+        Records that cannot be sent (see campaign_job_error) are counted as
+        invalid and skipped; run_campaign() reports each one as it comes to it.
+
+        Returns:
+            {verified: {address_cache_key: verification}, addresses, cache_hits,
+             undeliverable, invalid}
+        """
+        addresses = {}
+        invalid = 0
+        for job in jobs:
+            try:
+                if campaign_job_error(job):
+                    raise ValueError
+                pair = [(address_cache_key(a), a) for a in self._job_addresses(job)]
+            except (KeyError, TypeError, AttributeError, ValueError):
+                invalid += 1
+                continue
+            for key, address in pair:
+                addresses.setdefault(key, address)
+
+        hits_before = self.address_cache.hits
+        verified = self.verify_addresses(list(addresses.values()), concurrency)
+        return {
+            "verified": verified,
+            "addresses": len(addresses),
+            "cache_hits": self.address_cache.hits - hits_before,
+            "undeliverable": sum(1 for v in verified.values() if not is_deliverable(v)),
+            "invalid": invalid,
+        }
+
+    def _preflight_error(self, job: dict, verified: dict) -> Optional[str]:
+        try:
+            pair = self._job_addresses(job)
+        except (KeyError, TypeError, AttributeError, ValueError):
+            return None
+        for label, address in zip(("from", "to"), pair):
+            verification = verified.get(address_cache_key(address))
+            if verification is not None and not is_deliverable(verification):
+                reason = verification.get("deliverability") or verification.get("error")
+                return f"Undeliverable {label} address {address_cache_key(address)}: {reason}"
+        return None
+
+    def run_campaign(
+        self,
+        jobs,
+        concurrency: int = CAMPAIGN_CONCURRENCY,
+        checkpoint: Optional["CampaignCheckpoint"] = None,
+        verified: Optional[dict] = None,
+        letter_date=None,
+    ) -> dict:
+        """
+        Send a stream of dispute jobs (see iter_campaign_jobs) from a bounded worker pool.
+
+        At most 2 × concurrency jobs are pulled from the stream at a time, so
+        campaigns of any size run in constant memory. A failed letter is
+        recorded and the campaign carries on. concurrency is a ceiling: the
+        number of letters actually in flight backs off on 429s and climbs
+        back while sends succeed (see AdaptiveConcurrency).
+
+        With a checkpoint, every letter Lob accepts is recorded under its
+        idempotency key, and jobs already in the checkpoint are skipped — a
+        restarted campaign resumes where it died without mailing anything twice.
+
+        With verified (from preflight_campaign), jobs whose from or to address
+        is undeliverable fail immediately instead of being sent.
+
+        Every letter carries letter_date (default: the date recorded in the
+        checkpoint, else the day the campaign starts), so a campaign running
+        past midnight or re-run with the same date renders identical letters
+        under the same idempotency keys, and letters already accepted with the
+        same content are counted as duplicates instead of being sent again.
+
+        Returns:
+            {sent, skipped, duplicates, failed, cost, elapsed, letters_per_sec,
+             throttled, final_concurrency, letter_date, connections (see
+             connection_stats; this campaign only), failures: [{record, target, error}]}
+        """
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+        if letter_date is None and checkpoint is not None:
+            letter_date = checkpoint.letter_date
+        letter_date = _letter_date(letter_date)
+        summary = {"sent": 0, "skipped": 0, "duplicates": 0, "failed": 0, "cost": 0.0, "failures": []}
+        self.concurrency = AdaptiveConcurrency(concurrency)
+        self.ensure_pool_size(concurrency)
+        connections_before = self.connection_stats()
+
+        def send(job: dict) -> dict:
+            with self.concurrency:
+                tracking = self.send_dispute(
+                    client=job["client"],
+                    letter_type=job["letter_type"],
+                    target=job["target"],
+                    dispute_items=job["dispute_items"],
+                    custom_recipient=job.get("custom_recipient"),
+                    extra_context=job.get("extra_context"),
+                    idempotency_key=job["idempotency_key"],
+                    letter_date=letter_date,
+                )
+            if checkpoint is not None:
+                checkpoint.record(job["idempotency_key"], tracking["letter_id"], letter_date)
+            return tracking
+
+        def fail(job: dict, error: str):
+            summary["failed"] += 1
+            summary["failures"].append({"record": job.get("record"), "target": job.get("target"), "error": error})
+
+        def collect(done, in_flight: dict):
+            for future in done:
+                job = in_flight.pop(future)
+                try:
+                    tracking = future.result()
+                except Exception as e:
+                    fail(job, str(e))
+                    continue
+                if tracking.get("duplicate"):
+                    summary["duplicates"] += 1
+                    continue
+                summary["sent"] += 1
+                try:
+                    summary["cost"] += float(tracking.get("cost") or 0)
+                except (TypeError, ValueError):
+                    pass
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            in_flight = {}
+            for job in jobs:
+                # A bad record fails on its own; the rest of the campaign carries on
+                try:
+                    problem = campaign_job_error(job)
+                    if problem:
+                        raise ValueError(problem)
+                    job["idempotency_key"] = dispute_idempotency_key(
+                        job["client"], job["letter_type"], job["target"], job["dispute_items"],
+                        self._resolve_recipient(job["target"], job.get("custom_recipient")),
+                        job.get("extra_context"), letter_date,
+                    )
+                except Exception as e:
+                    fail(job, str(e))
+                    continue
+                if checkpoint is not None and job["idempotency_key"] in checkpoint:
+                    summary["skipped"] += 1
+                    continue
+                problem = self._preflight_error(job, verified) if verified else None
+                if problem:
+                    fail(job, problem)
+                    continue
+                if len(in_flight) >= 2 * concurrency:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done, in_flight)
+                in_flight[pool.submit(send, job)] = job
+            done, _ = wait(in_flight)
+            collect(done, in_flight)
+
+        summary["throttled"] = self.concurrency.throttled
+        summary["final_concurrency"] = int(self.concurrency.limit)
+        self.concurrency = None
+        summary["elapsed"] = time.perf_counter() - start
+        summary["letters_per_sec"] = summary["sent"] / summary["elapsed"] if summary["elapsed"] else 0.0
+        summary["cost"] = round(summary["cost"], 2)
+        summary["letter_date"] = letter_date
+        summary["connections"] = self._connection_delta(connections_before)
+        return summary
+
+    # -- Durable Outbox -----------------------------------------------------
+
+    def enqueue_dispute(
+        self,
+        outbox: LetterOutbox,
+        client: dict,
+        letter_type: str,
+        target: str,
+        dispute_items: list,
+        custom_recipient: Optional[dict] = None,
+        extra_context: Optional[dict] = None,
+        idempotency_key: Optional[str] = None,
+        letter_date=None,
+    ) -> dict:
+        """
+        Producer half of send_dispute(): render the letter and queue it in the
+        outbox for run_outbox_worker() to send and log.
+
+        Returns {idempotency_key, letter_type, target, status} with status
+        "queued", or "already queued" if the outbox already holds this letter;
+        or send_dispute()'s "duplicate" result if identical content was already
+        accepted, in which case nothing is queued.
+        """
+        if letter_type not in LETTER_TEMPLATES:
+            raise ValueError(f"Unknown letter type: {letter_type}. Options: {list(LETTER_TEMPLATES.keys())}")
+
+        recipient = self._resolve_recipient(target, custom_recipient)
+        content_key, content = self._letter_content(
+            letter_type, client, recipient, dispute_items, extra_context, letter_date
+        )
+        duplicate = self._sent_duplicate(content_key, letter_type, target)
+        if duplicate is not None:
+            return duplicate
+
+        idempotency_key = idempotency_key or dispute_idempotency_key(
+            client, letter_type, target, dispute_items, recipient, extra_context, letter_date
+        )
+        queued = outbox.enqueue({
+            "idempotency_key": idempotency_key,
+            "from_address": self._client_address(client),
+            "client_id": dispute_client_id(client),
+            "recipient": recipient,
+            "letter_type": letter_type,
+            "target": target,
+            "content": content,
+            "content_key": content_key,
+            "dispute_items": dispute_items,
+        })
+        return {
+            "idempotency_key": idempotency_key,
+            "letter_type": letter_type,
+            "target": target,
+            "status": "queued" if queued else "already queued",
+        }
+
+    def enqueue_campaign(self, outbox: LetterOutbox, jobs, verified: Optional[dict] = None, letter_date=None) -> dict:
+        """
+        Render a stream of campaign jobs (see iter_campaign_jobs) into the
+        outbox. Re-running it is safe: letters already queued or already
+        accepted are counted, not queued again. verified and letter_date are
+        as for run_campaign().
+
+        Returns:
+            {queued, already_queued, duplicates, failed, elapsed, letter_date,
+             failures: [{record, target, error}]}
+        """
+        letter_date = _letter_date(letter_date)
+        summary = {"queued": 0, "already_queued": 0, "duplicates": 0, "failed": 0, "failures": []}
+        start = time.perf_counter()
+        for job in jobs:
+            try:
+                problem = campaign_job_error(job)
+                if problem:
+                    raise ValueError(problem)
+                problem = self._preflight_error(job, verified) if verified else None
+                if problem:
+                    raise UndeliverableAddressError(problem)
+                result = self.enqueue_dispute(
+                    outbox,
+                    client=job["client"],
+                    letter_type=job["letter_type"],
+                    target=job["target"],
+                    dispute_items=job["dispute_items"],
+                    custom_recipient=job.get("custom_recipient"),
+                    extra_context=job.get("extra_context"),
+                    letter_date=letter_date,
+                )
+            except Exception as e:
+                summary["failed"] += 1
+                summary["failures"].append({"record": job.get("record"), "target": job.get("target"), "error": str(e)})
+                continue
+            if result.get("duplicate"):
+                summary["duplicates"] += 1
+            elif result["status"] == "queued":
+                summary["queued"] += 1
+            else:
+                summary["already_queued"] += 1
+        summary["elapsed"] = time.perf_counter() - start
+        summary["letter_date"] = letter_date
+        return summary
+
+    def _deliver_queued(self, outbox: LetterOutbox, owner: str, entry: dict) -> str:
+        """
+        Send, log and ack one leased outbox letter (run_outbox_worker sets
+        self.concurrency). Returns "sent",
+        "recovered" (accepted before a crash; only logged now), "retried",
+        "failed" or "lost" (the lease expired and another worker took over).
+        """
+        key, letter, tracking = entry["idempotency_key"], entry["letter"], entry["tracking"]
+        outcome = "sent" if tracking is None else "recovered"
+        try:
+            if tracking is None:
+                with self.concurrency:
+                    tracking = self._send_rendered(
+                        letter["from_address"], letter["recipient"], letter["letter_type"], letter["target"],
+                        letter["content"], letter["dispute_items"],
+                        idempotency_key=key, content_key=letter["content_key"],
+                        client_id=letter.get("client_id"),
+                    )
+                if not outbox.accepted(key, owner, tracking):
+                    return "lost"
+            if self._replayed(tracking) is not None:
+                # Logged before a crash (only the ack was missing), or a letter Lob replayed
+                return outcome if outbox.ack(key, owner) else "lost"
+            self._log_dispute(tracking)
+            self.tracker.sync()
+            return outcome if outbox.ack(key, owner) else "lost"
+        except Exception as e:
+            permanent = isinstance(e, LobAPIError) and 400 <= e.status_code < 500 and e.status_code != 429
+            # A letter Lob accepted is never given up on, only its logging retried
+            if entry["tracking"] is None and (permanent or entry["attempts"] >= OUTBOX_MAX_ATTEMPTS):
+                outbox.fail(key, owner, str(e))
+                return "failed"
+            outbox.retry(key, owner, str(e), _backoff_seconds(entry["attempts"]))
+            return "retried"
+
+    def run_outbox_worker(
+        self,
+        outbox: LetterOutbox,
+        workers: int = CAMPAIGN_CONCURRENCY,
+        once: bool = False,
+        poll_interval: float = 1.0,
+        stop: Optional[threading.Event] = None,
+    ) -> dict:
+        """
+        Consumer half: send queued letters from a pool of worker threads.
+
+        Each worker leases one letter at a time, sends it with its stored
+        idempotency key, records Lob's response on the outbox row, logs the
+        tracking record to the tracker (synced to disk) and acks. Any number
+        of worker processes may share one outbox. As in run_campaign(),
+        workers is a ceiling that backs off on 429s.
+
+        Runs until stop is set (or Ctrl-C), polling an empty outbox every
+        poll_interval seconds; with once=True it returns as soon as no letter
+        is due, leaving letters waiting out a retry backoff queued.
+
+        Returns:
+            {sent, recovered, retried, failed, lost, elapsed, letters_per_sec, connections}
+        """
+        import socket
+
+        stop = stop or threading.Event()
+        summary = dict.fromkeys(("sent", "recovered", "retried", "failed", "lost"), 0)
+        summary_lock = threading.Lock()
+        self.concurrency = AdaptiveConcurrency(workers)
+        self.ensure_pool_size(workers)
+        connections_before = self.connection_stats()
+
+        def work(n: int):
+            owner = f"{socket.gethostname()}:{os.getpid()}:{n}"
+            while not stop.is_set():
+                entries = outbox.lease(owner)
+                if not entries:
+                    if once:
+                        return
+                    stop.wait(poll_interval)
+                    continue
+                outcome = self._deliver_queued(outbox, owner, entries[0])
+                with summary_lock:
+                    summary[outcome] += 1
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=work, args=(n,), daemon=True) for n in range(max(1, workers))]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            stop.set()  # letters in flight are finished and acked
+            for thread in threads:
+                thread.join()
+        self.concurrency = None
+        summary["elapsed"] = time.perf_counter() - start
+        summary["letters_per_sec"] = summary["sent"] / summary["elapsed"] if summary["elapsed"] else 0.0
+        summary["connections"] = self._connection_delta(connections_before)
+        return summary
+
+    # -- Dispute Tracker ----------------------------------------------------
+
+    @property
+    def tracker(self):
+        """The dispute tracker at log_path (DISPUTE_LOG_PATH by default), opened on first use."""
+        if self._tracker is None:
+            self._tracker = instrument_tracker(open_dispute_tracker(self.log_path, self.tracker_engine), self.metrics)
+        return self._tracker
+
+    def _log_dispute(self, tracking: dict):
+        """Append tracking record to the local dispute tracker."""
+        self.tracker.append(tracking)
+
+    @staticmethod
+    def _with_days_remaining(disputes: list) -> list:
+        now = datetime.now()
+        for d in disputes:
+            deadline = datetime.fromisoformat(d["response_deadline"])
+            d["days_remaining"] = (deadline - now).days
+            d["overdue"] = d["days_remaining"] < 0
+        return disputes
+
+    def iter_disputes(self, filter=None, fields: tuple = None):
+        """
+        Stream tracked disputes with days_remaining/overdue filled in.
+
+        filter is passed to the tracker's iter_disputes() (a predicate or a
+        {field: value(s)} dict); fields, if given, trims each record to those
+        keys so listings don't hold every record's items_disputed.
+        """
+        for d in self.tracker.iter_disputes(filter):
+            if fields is not None:
+                d = {k: d.get(k) for k in fields}
+            yield self._with_days_remaining([d])[0]
+
+    def dispute_items(self, dispute: dict) -> list:
+        """The dispute items a tracked record refers to (resolving item_ids, or legacy inline items)."""
+        if "items_disputed" in dispute:
+            return dispute["items_disputed"]
+        ids = dispute.get("item_ids", [])
+        items = self.tracker.items(ids)
+        return [items[i] for i in ids if i in items]
+
+    def get_pending_disputes(self, fields: tuple = None, client_id: str = None) -> list:
+        """
+        Get all disputes awaiting response (past sent, not yet resolved), soonest
+        deadline first — only one client's with client_id (a single shard of a
+        client-sharded tracker).
+        """
+        filter = {"status": PENDING_STATUSES}
+        if client_id:
+            filter["client_id"] = client_id
+        pending = self.iter_disputes(filter, fields)
+        return sorted(pending, key=lambda d: d["response_deadline"])
+
+    def _full_records(self, due: list) -> list:
+        """
+        The tracked records for deadline query results, in the same order. A
+        journal's due() returns only DEADLINE_SUMMARY_FIELDS summaries; each is
+        replaced by get(), which reads a pending letter's indexed journal lines,
+        so the query stays proportional to the k letters found.
+        """
+        summary_fields = set(DEADLINE_SUMMARY_FIELDS)
+        return [
+            (self.tracker.get(d["letter_id"]) or dict(d)) if set(d) <= summary_fields else d
+            for d in due
+        ]
+
+    def get_overdue_disputes(self) -> list:
+        """
+        Get disputes past the 30-day response deadline — ready for escalation.
+
+        The overdue letters are found with the tracker's deadline index; each
+        is returned as its full tracked record plus days_remaining/overdue.
+        """
+        overdue = self.tracker.due("response_deadline", before=datetime.now())
+        return self._with_days_remaining(self._full_records(overdue))
+
+    def get_upcoming_deadlines(self, days: int = 7) -> list:
+        """Pending disputes whose response deadline passes within the next `days` days (full records)."""
+        now = datetime.now()
+        due = self.tracker.due("response_deadline", before=now + timedelta(days=days), after=now)
+        return self._with_days_remaining(self._full_records(due))
+
+    def update_dispute_status(self, letter_id: str, status: str, notes: str = ""):
+        """Update a dispute's status (delivered, resolved, escalated, deleted)."""
+        fields = {"status": status, "updated_at": datetime.now().isoformat()}
+        if notes:
+            fields["notes"] = notes
+        self.tracker.update(letter_id, fields)
+
+    # -- Check Lob Letter Status --------------------------------------------
+
+    def check_delivery_status(self, letter_id: str) -> dict:
+        """Check the current delivery status of a sent letter."""
+        with metrics_stage(self.metrics, "check_delivery_status"):
+            resp = self._request("GET", f"/letters/{letter_id}")
         if resp.status_code != 200:
             return {"error": resp.text}
         data = resp.json()
@@ -889,6 +4779,408 @@ class DisputeMailer:
             "tracking_events": data.get("tracking_events", []),
         }
 
+    def sync_delivery_statuses(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        concurrency: int = CAMPAIGN_CONCURRENCY,
+    ) -> dict:
+        """
+        Refresh delivery status for every pending dispute in one pass.
+
+        Pages through Lob's GET /letters list (100 per page) for letters created
+        between since (default: the oldest pending sent_date) and until,
+        stopping once every pending letter has been seen. Letters the list did
+        not return are fetched with concurrent GET /letters/{id} calls. Status
+        changes (sent → delivered, → returned; see DELIVERY_TRANSITIONS) are
+        written to the tracker in one batched update.
+
+        Returns:
+            {pending, listed, fetched, updated: {status: count}}
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        current = {}
+        first_sent = None
+        for d in self.tracker.iter_disputes({"status": PENDING_STATUSES}):
+            if d.get("letter_id"):
+                current[d["letter_id"]] = d["status"]
+                first_sent = min(first_sent or d["sent_date"], d["sent_date"])
+        summary = {"pending": len(current), "listed": 0, "fetched": 0, "updated": {}}
+        if not current:
+            return summary
+
+        since = since or datetime.fromisoformat(first_sent)
+        date_created = {"gt": since.date().isoformat()}
+        if until:
+            date_created["lt"] = until.isoformat()
+
+        letters = {}
+        next_page = "/letters"
+        params = {"limit": 100, "date_created": json.dumps(date_created)}
+        while next_page and len(letters) < len(current):
+            resp = self._request("GET", next_page, params=params)
+            if resp.status_code != 200:
+                break
+            page = resp.json()
+            for letter in page.get("data", []):
+                if letter.get("id") in current:
+                    letters[letter["id"]] = letter
+            summary["listed"] += len(page.get("data", []))
+            next_page, params = page.get("next_url"), None
+
+        def fetch(letter_id: str) -> Optional[dict]:
+            resp = self._request("GET", f"/letters/{letter_id}")
+            return resp.json() if resp.status_code == 200 else None
+
+        unseen = [letter_id for letter_id in current if letter_id not in letters]
+        if unseen:
+            self.ensure_pool_size(min(concurrency, len(unseen)))
+            with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+                for letter_id, letter in zip(unseen, pool.map(fetch, unseen)):
+                    if letter is not None:
+                        letters[letter_id] = letter
+                        summary["fetched"] += 1
+
+        now = datetime.now().isoformat()
+        updates = {}
+        for letter_id, letter in letters.items():
+            status = delivery_status(letter)
+            if status in DELIVERY_TRANSITIONS.get(current[letter_id], ()):
+                updates[letter_id] = {"status": status, "updated_at": now}
+                summary["updated"][status] = summary["updated"].get(status, 0) + 1
+        self.tracker.update_many(updates)
+        return summary
+
+
+# ---------------------------------------------------------------------------
+# LOB WEBHOOK RECEIVER
+# ---------------------------------------------------------------------------
+
+def lob_webhook_signature(secret: str, timestamp: str, body: bytes) -> str:
+    """Lob's webhook signature: hex HMAC-SHA256 of "<timestamp>.<raw body>" under the webhook secret."""
+    import hashlib
+    import hmac
+
+    message = timestamp.encode("utf-8") + b"." + body
+    return hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+class WebhookReceiver:
+    """
+    Applies Lob letter tracking-event webhooks to the dispute tracker as they arrive.
+
+    Each event is checked against its Lob-Signature / Lob-Signature-Timestamp
+    headers, de-duplicated by event id when it has one (Lob redelivers on
+    timeouts and 5xx answers), mapped through WEBHOOK_EVENT_STATUSES and
+    applied only if DELIVERY_TRANSITIONS allows it. An id counts as seen only
+    once its event is applied or ignored, so a delivery whose tracker update
+    failed (answered 500) is retried on redelivery. Every transition starts from a pending status, so the current
+    status is read fresh for each event with the tracker's pending_status()
+    — an index lookup, not a tracker scan — and status changes made outside
+    the receiver (a letter marked resolved) are never overwritten.
+    """
+
+    def __init__(self, tracker, secret: str, tolerance: float = WEBHOOK_TOLERANCE_SECONDS):
+        self.tracker = tracker
+        self.secret = secret
+        self.tolerance = tolerance
+        self.counts = {"applied": 0, "ignored": 0, "duplicate": 0, "rejected": 0}
+        self._seen_events = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _verify(self, body: bytes, headers) -> bool:
+        signature = headers.get("Lob-Signature", "")
+        timestamp = headers.get("Lob-Signature-Timestamp", "")
+        if not signature or not timestamp:
+            return False
+        try:
+            sent_at = float(timestamp)
+        except ValueError:
+            return False
+        if sent_at > 1e11:  # milliseconds
+            sent_at /= 1000
+        if abs(time.time() - sent_at) > self.tolerance:
+            return False
+        import hmac
+
+        return hmac.compare_digest(signature, lob_webhook_signature(self.secret, timestamp, body))
+
+    def _seen(self, event_id):
+        """Remember a processed event id (callers hold _lock)."""
+        if event_id is None:
+            return
+        self._seen_events[event_id] = True
+        if len(self._seen_events) > WEBHOOK_SEEN_EVENTS:
+            self._seen_events.popitem(last=False)
+
+    def handle(self, body: bytes, headers) -> tuple:
+        """Process one webhook delivery; returns (HTTP status, message)."""
+        if not self._verify(body, headers):
+            self.counts["rejected"] += 1
+            return 401, "invalid signature"
+        try:
+            event = json.loads(body)
+        except ValueError:
+            return 400, "invalid JSON"
+        if not isinstance(event, dict):
+            return 400, "event is not a JSON object"
+
+        event_type = event.get("event_type")
+        event_type = event_type.get("id", "") if isinstance(event_type, dict) else ""
+        letter = event.get("body")
+        letter = letter if isinstance(letter, dict) else {}
+        letter_id = letter.get("id") or event.get("reference_id")
+        event_id = event.get("id")
+        with self._lock:
+            # Events without an id cannot be told apart from a redelivery; apply them as they come
+            if event_id is not None and event_id in self._seen_events:
+                self.counts["duplicate"] += 1
+                return 200, "duplicate"
+
+            status = WEBHOOK_EVENT_STATUSES.get(event_type)
+            current = self.tracker.pending_status(letter_id) if status and letter_id else None
+            if status not in DELIVERY_TRANSITIONS.get(current, ()):
+                self.counts["ignored"] += 1
+                self._seen(event_id)
+                return 200, "ignored"
+
+            try:
+                self.tracker.update(letter_id, {
+                    "status": status,
+                    "updated_at": datetime.now().isoformat(),
+                    "last_event": event_type,
+                })
+            except Exception as e:
+                # Not marked seen: Lob redelivers on a 5xx and the update is retried
+                return 500, f"update failed: {e}"
+            self._seen(event_id)
+            self.counts["applied"] += 1
+        return 200, f"{letter_id} → {status}"
+
+
+def serve_webhooks(receiver: WebhookReceiver, host: str = "127.0.0.1", port: int = 8787):
+    """Run an HTTP server that feeds POSTed Lob webhooks to receiver until interrupted."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class LobWebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            code, message = receiver.handle(body, self.headers)
+            payload = json.dumps({"result": message}).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), LobWebhookHandler)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        receiver.tracker.sync()
+
+
+def replay_webhook_events(url: str, events_path: str, secret: str) -> list:
+    """
+    Stand-in for Lob: POST recorded webhook payloads (one JSON event per line)
+    to url with fresh, valid signatures. Returns [(HTTP status, response body)].
+    """
+    import urllib.error
+    import urllib.request
+
+    results = []
+    with open(events_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            body = json.dumps(json.loads(line)).encode("utf-8")
+            timestamp = str(int(time.time() * 1000))
+            request = urllib.request.Request(url, data=body, method="POST", headers={
+                "Content-Type": "application/json",
+                "Lob-Signature": lob_webhook_signature(secret, timestamp, body),
+                "Lob-Signature-Timestamp": timestamp,
+            })
+            try:
+                with urllib.request.urlopen(request) as resp:
+                    results.append((resp.status, resp.read().decode("utf-8")))
+            except urllib.error.HTTPError as e:
+                results.append((e.code, e.read().decode("utf-8")))
+    return results
+
+
+# ---------------------------------------------------------------------------
+# PROFILING
+# ---------------------------------------------------------------------------
+
+# --profiler sample: seconds between stack samples of every thread
+PROFILE_SAMPLE_INTERVAL = 0.005
+
+# Rows per table in the hotspot report, and deepest call path in collapsed stacks
+PROFILE_REPORT_ROWS = 40
+PROFILE_MAX_DEPTH = 64
+
+
+def _profile_label(filename: str, line: int, name: str) -> str:
+    # Collapsed-stack frames are ';'-separated, so keep them out of labels
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ",")
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler: a background thread records the stack of
+    every other thread each interval seconds, so worker pools (campaign,
+    worker, send-all --concurrent) are covered, not just the main thread.
+    stacks maps a collapsed stack ("outer;...;inner") to its sample count.
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        import sys
+
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(_profile_label(code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                key = ";".join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def report(self) -> str:
+        """Functions by samples spent in them (self) and under them (total)."""
+        own, total = {}, {}
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] = own.get(frames[-1], 0) + count
+            for frame in set(frames):
+                total[frame] = total.get(frame, 0) + count
+        ms = self.interval * 1000
+        lines = [f"{self.samples} samples every {ms:g} ms across all threads (wall clock)", ""]
+        for title, counts in (("self", own), ("total", total)):
+            lines.append(f"Top functions by {title} samples:")
+            lines.append(f"  {'samples':>8s} {'~ms':>9s}  function")
+            for frame, count in sorted(counts.items(), key=lambda kv: -kv[1])[:PROFILE_REPORT_ROWS]:
+                lines.append(f"  {count:8d} {count * ms:9.0f}  {frame}")
+            lines.append("")
+        return "\n".join(lines)
+
+
+def _cprofile_collapsed(stats) -> dict:
+    """
+    Collapsed stacks (values in µs) rebuilt from cProfile's caller graph:
+    each call path gets its functions' own time in proportion to the share
+    of their cumulative time reached through that path. An approximation —
+    cProfile records caller edges, not full stacks.
+    """
+    raw = stats.stats  # func → (primitive calls, calls, tottime, cumtime, {caller: edge stats})
+    children = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((func, edge[3]))
+    stacks = {}
+
+    def walk(func, path: list, on_path: set, scale: float):
+        tottime = raw[func][2]
+        path = path + [_profile_label(*func)]
+        own = int(tottime * scale * 1e6)
+        if own:
+            key = ";".join(path)
+            stacks[key] = stacks.get(key, 0) + own
+        if len(path) >= PROFILE_MAX_DEPTH:
+            return
+        for child, edge_time in children.get(func, ()):
+            child_time = raw[child][3]
+            if child in on_path or child_time <= 0 or edge_time * scale < 1e-6:
+                continue
+            walk(child, path, on_path | {child}, scale * min(1.0, edge_time / child_time))
+
+    for func, value in raw.items():
+        if not value[4]:
+            walk(func, [], {func}, 1.0)
+    return stacks
+
+
+class ActionProfiler:
+    """
+    --profile for the CLI: profiles the rest of the process with cProfile
+    (main thread, exact call counts) or SamplingProfiler (all threads), then
+    writes <prefix>.txt (hotspot report) and <prefix>.collapsed (one
+    "frame;frame;frame value" line per stack, for flamegraph.pl or
+    speedscope); cProfile also writes <prefix>.pstats for pstats/snakeviz.
+    """
+
+    def __init__(self, prefix: str, mode: str = "cprofile", interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.prefix = prefix
+        self.mode = mode
+        if mode == "cprofile":
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+        elif mode == "sample":
+            self.profiler = SamplingProfiler(interval)
+        else:
+            raise ValueError(f"Unknown profiler: {mode}. Options: cprofile, sample")
+
+    def start(self) -> "ActionProfiler":
+        if self.mode == "cprofile":
+            self.profiler.enable()
+        else:
+            self.profiler.start()
+        return self
+
+    def finish(self) -> list:
+        """Stop profiling and write the report files; returns their paths."""
+        import io
+        import pstats
+
+        if self.mode == "cprofile":
+            self.profiler.disable()
+            paths = [f"{self.prefix}.txt", f"{self.prefix}.collapsed", f"{self.prefix}.pstats"]
+            self.profiler.dump_stats(paths[2])
+            out = io.StringIO()
+            out.write("cProfile of the main thread (threads started by the action are not included; "
+                      "use --profiler sample for those)\n")
+            stats = pstats.Stats(self.profiler, stream=out)
+            stats.sort_stats("cumulative").print_stats(PROFILE_REPORT_ROWS)
+            stats.sort_stats("tottime").print_stats(PROFILE_REPORT_ROWS)
+            report, stacks = out.getvalue(), _cprofile_collapsed(stats)
+        else:
+            self.profiler.stop()
+            paths = [f"{self.prefix}.txt", f"{self.prefix}.collapsed"]
+            report, stacks = self.profiler.report(), self.profiler.stacks
+        with open(paths[0], "w", encoding="utf-8") as f:
+            f.write(report)
+        with open(paths[1], "w", encoding="utf-8") as f:
+            for stack, value in sorted(stacks.items()):
+                f.write(f"{stack} {value}\n")
+        print(f"\nProfile ({self.mode}) written to {', '.join(paths)}")
+        return paths
+
 
 # ---------------------------------------------------------------------------
 # CLI INTERFACE
@@ -898,7 +5190,9 @@ if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="Send certified credit dispute letters via Lob API")
-    parser.add_argument("action", choices=["send", "send-all", "pending", "overdue", "status", "types"])
+    parser.add_argument("action", choices=["send", "send-all", "campaign", "render", "pending", "overdue", "due",
+                                           "scheduler", "status", "sync", "webhook", "webhook-replay", "types",
+                                           "compact", "shard", "templates", "enqueue", "worker"])
     parser.add_argument("--type", help="Letter type (e.g., basic_bureau, debt_validation)")
     parser.add_argument("--target", help="Target: equifax, experian, transunion, or custom")
     parser.add_argument("--name", help="Client name")
@@ -912,8 +5206,63 @@ if __name__ == "__main__":
     parser.add_argument("--account-num", help="Last 4 of account number")
     parser.add_argument("--reason", help="Reason for dispute")
     parser.add_argument("--letter-id", help="Letter ID for status check")
+    parser.add_argument("--client-id", help="pending: only this client's disputes (see dispute_client_id())")
+    parser.add_argument("--input", help="campaign/render/enqueue: CSV or JSONL file of clients and dispute items; "
+                                        "webhook-replay: JSONL file of recorded events")
+    parser.add_argument("--output", help="render: output directory, or a .zip/.tar.gz/.tar.xz archive; "
+                                         "shard: sharded tracker directory to copy DISPUTE_LOG_PATH into")
+    parser.add_argument("--workers", type=int, help="render: worker processes (default: one per CPU); "
+                                                     "worker: sending threads (default: --concurrency)")
+    parser.add_argument("--outbox", default=OUTBOX_PATH,
+                        help=f"enqueue/worker: durable outbox database (default {OUTBOX_PATH})")
+    parser.add_argument("--letter-date", type=lambda v: datetime.fromisoformat(v).date(),
+                        help="send/send-all/campaign/render/enqueue: date printed on the letters, YYYY-MM-DD "
+                             "(default today; pin it so re-runs produce identical letters)")
+    parser.add_argument("--templates", action="store_true",
+                        help="send/send-all/campaign/enqueue: send as stored Lob templates with merge variables "
+                             "(default: LOB_USE_TEMPLATES)")
+    parser.add_argument("--checkpoint",
+                        help="campaign: accepted-letter checkpoint file (default: <input>.checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=CAMPAIGN_CONCURRENCY,
+                        help=f"campaign: max letters in flight (default {CAMPAIGN_CONCURRENCY})")
+    parser.add_argument("--verify", action="store_true",
+                        help="send/send-all/campaign/enqueue: verify addresses first and skip undeliverable letters")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="send-all: post the three bureau letters in parallel")
+    parser.add_argument("--since", type=datetime.fromisoformat,
+                        help="sync: only letters created after this date (default: oldest pending)")
+    parser.add_argument("--until", type=datetime.fromisoformat,
+                        help="sync: only letters created before this date")
+    parser.add_argument("--host", default="127.0.0.1", help="webhook: interface to listen on")
+    parser.add_argument("--port", type=int, default=8787, help="webhook: port to listen on")
+    parser.add_argument("--url", default="http://127.0.0.1:8787/",
+                        help="webhook-replay: receiver URL to POST recorded events to")
+    parser.add_argument("--secret", default=LOB_WEBHOOK_SECRET,
+                        help="webhook/webhook-replay: signing secret (default: LOB_WEBHOOK_SECRET)")
+    parser.add_argument("--days", type=int, default=7, help="due: look-ahead window in days")
+    parser.add_argument("--interval", type=float, default=3600, help="scheduler: seconds between checks")
+    parser.add_argument("--once", action="store_true",
+                        help="scheduler: check once and exit; worker: exit once no letter is due")
+    parser.add_argument("--store", choices=["journal", "sqlite", "sharded"],
+                        help="Tracker engine (default: inferred from DISPUTE_LOG_PATH; a directory is sharded)")
+    parser.add_argument("--metrics",
+                        help="Write per-stage timings, request/status/retry counts on exit: "
+                             "Prometheus text for a .prom/.txt path, JSON otherwise")
+    parser.add_argument("--profile", metavar="PREFIX",
+                        help="Profile the action: writes PREFIX.txt (hotspots) and PREFIX.collapsed "
+                             "(flamegraph stacks)")
+    parser.add_argument("--profiler", choices=["cprofile", "sample"], default="cprofile",
+                        help="--profile mode: cprofile (main thread, exact) or sample (all threads, "
+                             f"every {PROFILE_SAMPLE_INTERVAL * 1000:g} ms)")
     args = parser.parse_args()
 
+    metrics = None
+    if args.metrics:
+        metrics = PipelineMetrics()
+        atexit.register(metrics.write, args.metrics)
+    if args.profile:
+        atexit.register(ActionProfiler(args.profile, args.profiler).start().finish)
+
     if args.action == "types":
         print("\nAvailable letter types:\n")
         for key, info in LETTER_TEMPLATES.items():
@@ -922,8 +5271,8 @@ if __name__ == "__main__":
             print()
 
     elif args.action == "pending":
-        mailer = DisputeMailer()
-        pending = mailer.get_pending_disputes()
+        mailer = DisputeMailer(tracker_engine=args.store, metrics=metrics)
+        pending = mailer.get_pending_disputes(fields=DEADLINE_SUMMARY_FIELDS, client_id=args.client_id)
         if not pending:
             print("No pending disputes.")
         else:
@@ -933,7 +5282,7 @@ if __name__ == "__main__":
                 print(f"  [{d['letter_type']}] → {d['target']} | {status} | ID: {d['letter_id']}")
 
     elif args.action == "overdue":
-        mailer = DisputeMailer()
+        mailer = DisputeMailer(tracker_engine=args.store, metrics=metrics)
         overdue = mailer.get_overdue_disputes()
         if not overdue:
             print("No overdue disputes. All within 30-day window.")
@@ -943,11 +5292,188 @@ if __name__ == "__main__":
                 print(f"  [{d['letter_type']}] → {d['target']} | {abs(d['days_remaining'])} days overdue")
                 print(f"    Escalation: File CFPB complaint or send Letter #15 (Intent to Sue)")
 
+    elif args.action == "sync":
+        mailer = DisputeMailer(tracker_engine=args.store, metrics=metrics)
+        summary = mailer.sync_delivery_statuses(since=args.since, until=args.until, concurrency=args.concurrency)
+        changes = ", ".join(f"{n} → {status}" for status, n in summary["updated"].items()) or "no changes"
+        print(f"Synced {summary['pending']} pending letter(s) "
+              f"({summary['listed']} listed, {summary['fetched']} fetched individually): {changes}")
+
+    elif args.action == "webhook":
+        if not args.secret:
+            parser.error("--secret or LOB_WEBHOOK_SECRET is required for webhook")
+        tracker = instrument_tracker(open_dispute_tracker(DISPUTE_LOG_PATH, args.store), metrics)
+        receiver = WebhookReceiver(tracker, args.secret)
+        print(f"Listening for Lob webhooks on http://{args.host}:{args.port}/ (Ctrl+C to stop)")
+        try:
+            serve_webhooks(receiver, args.host, args.port)
+        except KeyboardInterrupt:
+            pass
+        print(f"\n{receiver.counts}")
+
+    elif args.action == "webhook-replay":
+        if not args.input or not args.secret:
+            parser.error("--input and --secret (or LOB_WEBHOOK_SECRET) are required for webhook-replay")
+        for code, body in replay_webhook_events(args.url, args.input, args.secret):
+            print(f"  {code} {body}")
+
+    elif args.action == "compact":
+        count = instrument_tracker(open_dispute_tracker(DISPUTE_LOG_PATH, args.store), metrics).compact()
+        print(f"Compacted {DISPUTE_LOG_PATH}: {count} dispute(s).")
+
+    elif args.action == "shard":
+        if not args.output:
+            parser.error("--output (the sharded tracker directory) is required for shard")
+        source = open_dispute_tracker(DISPUTE_LOG_PATH, args.store)
+        sharded = instrument_tracker(ShardedDisputeTracker(args.output), metrics)
+        count = sharded.copy_from(source)
+        print(f"Copied {count} dispute(s) from {DISPUTE_LOG_PATH} into {len(sharded.shard_keys())} "
+              f"{sharded.partition} shard(s) under {args.output}; set DISPUTE_LOG_PATH={args.output} to use them.")
+
+    elif args.action == "due":
+        tracker = instrument_tracker(open_dispute_tracker(DISPUTE_LOG_PATH, args.store), metrics)
+        now = datetime.now()
+        due = tracker.due("response_deadline", before=now + timedelta(days=args.days), after=now)
+        if not due:
+            print(f"No response deadlines in the next {args.days} day(s).")
+        else:
+            print(f"\n{len(due)} response deadline(s) in the next {args.days} day(s):\n")
+            for d in due:
+                days_left = (datetime.fromisoformat(d["response_deadline"]) - now).days
+                print(f"  [{d['letter_type']}] → {d['target']} | {days_left} days left | ID: {d['letter_id']}")
+
+    elif args.action == "scheduler":
+        tracker = instrument_tracker(open_dispute_tracker(DISPUTE_LOG_PATH, args.store), metrics)
+
+        def announce(event):
+            queue_escalation(event)
+            print(f"  {event['event']}: [{event['letter_type']}] → {event['target']} | "
+                  f"ID: {event['letter_id']} | next: {event['next_letter']}")
+
+        scheduler = DisputeScheduler(tracker, announce, f"{DISPUTE_LOG_PATH}.scheduler")
+        if args.once:
+            count = scheduler.run_once()
+            print(f"{count} escalation event(s) queued to {ESCALATION_QUEUE_PATH}")
+        else:
+            print(f"Scheduler running every {args.interval:.0f}s; events queue to {ESCALATION_QUEUE_PATH}")
+            try:
+                scheduler.run_forever(args.interval)
+            except KeyboardInterrupt:
+                pass
+
     elif args.action == "status" and args.letter_id:
-        mailer = DisputeMailer()
+        mailer = DisputeMailer(tracker_engine=args.store, metrics=metrics)
         status = mailer.check_delivery_status(args.letter_id)
         print(json.dumps(status, indent=2))
 
+    elif args.action == "campaign":
+        if not args.input:
+            parser.error("--input is required for campaign")
+        mailer = DisputeMailer(tracker_engine=args.store, use_templates=args.templates or None, metrics=metrics)
+        print(f"\nRunning campaign from {args.input} (concurrency {args.concurrency})...\n")
+        checkpoint = CampaignCheckpoint(args.checkpoint or f"{args.input}.checkpoint")
+        if len(checkpoint):
+            print(f"Resuming: {len(checkpoint)} letter(s) already accepted per {checkpoint.path}\n")
+        verified = None
+        if args.verify:
+            preflight = mailer.preflight_campaign(
+                iter_campaign_jobs(args.input, letter_type=args.type, target=args.target),
+                concurrency=args.concurrency,
+            )
+            verified = preflight["verified"]
+            print(f"Pre-flight: {preflight['addresses']} distinct address(es), "
+                  f"{preflight['cache_hits']} cached, {preflight['undeliverable']} undeliverable, "
+                  f"{preflight['invalid']} invalid record(s)\n")
+        summary = mailer.run_campaign(
+            iter_campaign_jobs(args.input, letter_type=args.type, target=args.target),
+            concurrency=args.concurrency,
+            checkpoint=checkpoint,
+            verified=verified,
+            letter_date=args.letter_date,
+        )
+        for failure in summary["failures"]:
+            print(f"  ✗ Record {failure['record']} → {failure['target']}: {failure['error']}")
+        print(f"\n✅ {summary['sent']} sent, {summary['skipped']} skipped, {summary['duplicates']} duplicate(s), "
+              f"{summary['failed']} failed in {summary['elapsed']:.1f}s ({summary['letters_per_sec']:.2f} letters/sec)")
+        print(f"   Letter date: {summary['letter_date']} (pass --letter-date to reproduce these letters)")
+        print(f"   Total cost: ${summary['cost']:.2f} | Tracking logged to {DISPUTE_LOG_PATH}")
+        connections = summary["connections"]
+        print(f"   HTTP: {connections['requests']} request(s) over {connections['connections']} new connection(s) "
+              f"(pool of {connections['pool_size']})")
+        if summary["throttled"]:
+            print(f"   Rate limited {summary['throttled']} time(s); settled at concurrency {summary['final_concurrency']}")
+
+    elif args.action == "enqueue":
+        if not args.input:
+            parser.error("--input is required for enqueue")
+        mailer = DisputeMailer(tracker_engine=args.store, use_templates=args.templates or None, metrics=metrics)
+        outbox = LetterOutbox(args.outbox)
+        print(f"\nQueueing {args.input} → {outbox.path}...\n")
+        verified = None
+        if args.verify:
+            preflight = mailer.preflight_campaign(
+                iter_campaign_jobs(args.input, letter_type=args.type, target=args.target),
+                concurrency=args.concurrency,
+            )
+            verified = preflight["verified"]
+            print(f"Pre-flight: {preflight['addresses']} distinct address(es), "
+                  f"{preflight['cache_hits']} cached, {preflight['undeliverable']} undeliverable, "
+                  f"{preflight['invalid']} invalid record(s)\n")
+        summary = mailer.enqueue_campaign(
+            outbox,
+            iter_campaign_jobs(args.input, letter_type=args.type, target=args.target),
+            verified=verified,
+            letter_date=args.letter_date,
+        )
+        for failure in summary["failures"]:
+            print(f"  ✗ Record {failure['record']} → {failure['target']}: {failure['error']}")
+        print(f"\n✅ {summary['queued']} queued, {summary['already_queued']} already queued, "
+              f"{summary['duplicates']} duplicate(s), {summary['failed']} failed in {summary['elapsed']:.1f}s")
+        print(f"   Letter date: {summary['letter_date']} | "
+              f"Send with: python certified_mail.py worker --outbox {outbox.path}")
+
+    elif args.action == "worker":
+        mailer = DisputeMailer(tracker_engine=args.store, metrics=metrics)
+        outbox = LetterOutbox(args.outbox)
+        workers = args.workers or args.concurrency
+        until = "until no letter is due" if args.once else "(Ctrl-C to stop)"
+        print(f"\nSending from {outbox.path} with {workers} worker(s) {until}...\n")
+        summary = mailer.run_outbox_worker(outbox, workers=workers, once=args.once)
+        for failure in outbox.failures():
+            print(f"  ✗ [{failure['letter_type']}] → {failure['target']} after {failure['attempts']} "
+                  f"attempt(s): {failure['error']}")
+        counts = outbox.counts()
+        print(f"\n✅ {summary['sent']} sent, {summary['recovered']} recovered, {summary['retried']} retried, "
+              f"{summary['failed']} failed in {summary['elapsed']:.1f}s ({summary['letters_per_sec']:.2f} letters/sec)")
+        connections = summary["connections"]
+        print(f"   HTTP: {connections['requests']} request(s) over {connections['connections']} new connection(s) "
+              f"(pool of {connections['pool_size']})")
+        print(f"   Outbox: {counts['queued']} queued, {counts['leased']} leased, {counts['done']} done, "
+              f"{counts['failed']} failed | Tracking logged to {DISPUTE_LOG_PATH}")
+
+    elif args.action == "templates":
+        mailer = DisputeMailer(metrics=metrics)
+        template_ids = mailer.register_templates([args.type] if args.type else None)
+        for letter_type, template_id in template_ids.items():
+            print(f"  {letter_type:30s} {template_id}")
+        print(f"\n✅ {len(template_ids)} stored template(s) at {mailer.base_url} "
+              f"(registry: {LOB_TEMPLATE_REGISTRY_PATH})")
+
+    elif args.action == "render":
+        if not args.input or not args.output:
+            parser.error("--input and --output are required for render")
+        print(f"\nRendering {args.input} → {args.output}...\n")
+        summary = render_letters(
+            iter_campaign_jobs(args.input, letter_type=args.type, target=args.target),
+            args.output,
+            max_workers=args.workers,
+            letter_date=args.letter_date,
+        )
+        for failure in summary["failures"]:
+            print(f"  ✗ Record {failure['record']} → {failure['target']}: {failure['error']}")
+        print(f"\n✅ {summary['rendered']} rendered, {summary['failed']} failed in {summary['elapsed']:.1f}s "
+              f"({summary['letters_per_sec']:,.0f} letters/sec, {summary['bytes'] / 1e6:.1f} MB)")
+
     elif args.action in ("send", "send-all"):
         if not all([args.type, args.name, args.address, args.city, args.state, args.zip]):
             parser.error("--type, --name, --address, --city, --state, --zip are required for send")
@@ -968,17 +5494,26 @@ if __name__ == "__main__":
             "details": "",
         }]
 
-        mailer = DisputeMailer()
+        mailer = DisputeMailer(tracker_engine=args.store, use_templates=args.templates or None, metrics=metrics)
 
         if args.action == "send-all":
             print(f"\nSending {args.type} to ALL 3 bureaus as USPS Certified Mail...\n")
-            results = mailer.send_to_all_bureaus(client, args.type, dispute_items)
-            print(f"\n✅ {len(results)} letters sent. Tracking logged to {DISPUTE_LOG_PATH}")
+            results = mailer.send_to_all_bureaus(
+                client, args.type, dispute_items, concurrent=args.concurrent, verify=args.verify,
+                letter_date=args.letter_date,
+            )
+            sent = [r for r in results if r["status"] not in ("failed", "duplicate")]
+            print(f"\n✅ {len(sent)} letters sent. Tracking logged to {DISPUTE_LOG_PATH}")
         else:
             if not args.target:
                 parser.error("--target required for send (equifax, experian, transunion)")
             print(f"\nSending {args.type} to {args.target} as USPS Certified Mail...\n")
-            result = mailer.send_dispute(client, args.type, args.target, dispute_items)
-            print(f"✅ Sent! Letter ID: {result['letter_id']}")
-            print(f"   Tracking: {result.get('tracking_number')}")
-            print(f"   30-day deadline: {result['response_deadline']}")
+            result = mailer.send_dispute(
+                client, args.type, args.target, dispute_items, verify=args.verify, letter_date=args.letter_date
+            )
+            if result.get("duplicate"):
+                print(f"↺ Identical letter already sent: {result['letter_id']} (nothing mailed)")
+            else:
+                print(f"✅ Sent! Letter ID: {result['letter_id']}")
+                print(f"   Tracking: {result.get('tracking_number')}")
+                print(f"   30-day deadline: {result['response_deadline']}")
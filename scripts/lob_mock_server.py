@@ -0,0 +1,370 @@
+"""
+Credit Architect — Local Lob API Mock
+A stdlib HTTP server speaking the subset of the Lob API that certified_mail.py
+uses, for exercising the pipeline without an account or postage.
+
+Usage:
+    python lob_mock_server.py [--port 8790] [--latency 0.05] [--error-rate 0.01] [--throttle-rate 0.05]
+    LOB_BASE_URL=http://127.0.0.1:8790/v1 LOB_API_KEY=test_mock python certified_mail.py send ...
+
+    from lob_mock_server import LobMockServer
+    with LobMockServer() as lob:
+        mailer = DisputeMailer(api_key="test_mock", base_url=lob.url)
+
+Endpoints: POST/GET /letters, GET /letters/{id}, POST/GET /templates,
+GET /templates/{id}, POST /us_verifications, POST /bulk/us_verifications.
+Letters sent from a stored template are rendered with their merge_variables,
+so a mocked letter's html can be compared with a locally rendered one.
+
+Faults can be injected for load tests: a fixed or jittered latency on every
+request, and a fraction of requests answered 500 or 429 (with Retry-After)
+before any work is done, as Lob itself does.
+"""
+
+import re
+import json
+import html
+import time
+import random
+import threading
+import itertools
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+# ---------------------------------------------------------------------------
+# REQUEST PARSING
+# ---------------------------------------------------------------------------
+
+_BRACKETED = re.compile(r"^([^\[]+)\[([^\]]*)\]$")
+_MERGE_FIELD = re.compile(r"\{\{\{\s*(\w+)\s*\}\}\}|\{\{\s*(\w+)\s*\}\}")
+
+
+def parse_form(body: bytes) -> dict:
+    """Form-encoded Lob parameters, with to[name]-style keys nested into dicts."""
+    params = {}
+    for key, value in parse_qsl(body.decode("utf-8"), keep_blank_values=True):
+        match = _BRACKETED.match(key)
+        if match:
+            params.setdefault(match.group(1), {})[match.group(2)] = value
+        else:
+            params[key] = value
+    return params
+
+
+def render_template(source: str, merge_variables: dict) -> str:
+    """Handlebars subset: {{{field}}} is inserted raw, {{field}} HTML-escaped."""
+    def fill(match):
+        raw, escaped = match.groups()
+        if raw:
+            return str(merge_variables.get(raw, ""))
+        return html.escape(str(merge_variables.get(escaped, "")))
+
+    return _MERGE_FIELD.sub(fill, source)
+
+
+# ---------------------------------------------------------------------------
+# MOCK STATE
+# ---------------------------------------------------------------------------
+
+class LobMockState:
+    """
+    Letters, templates and traffic counters shared by every request thread,
+    plus the fault injection settings: latency seconds (uniformly jittered by
+    ±jitter), and the error_rate/throttle_rate fractions of requests that get
+    a 500 or a 429 with Retry-After: retry_after.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 1.0,
+        seed: int = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.errors = 0
+        self.throttled = 0
+        self._random = random.Random(seed)
+        self.letters = {}
+        self.templates = {}
+        self.idempotent = {}
+        self.requests = 0
+        self.request_bytes = 0
+        self.by_route = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def new_id(self, prefix: str) -> str:
+        with self._lock:
+            return f"{prefix}_{next(self._ids):016x}"
+
+    def count(self, route: str, size: int):
+        with self._lock:
+            self.requests += 1
+            self.request_bytes += size
+            stats = self.by_route.setdefault(route, {"requests": 0, "bytes": 0})
+            stats["requests"] += 1
+            stats["bytes"] += size
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = 0
+            self.request_bytes = 0
+            self.by_route = {}
+            self.errors = 0
+            self.throttled = 0
+
+    def fault(self):
+        """Sleep for the injected latency; returns 500, 429 or None (serve normally)."""
+        with self._lock:
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter) if self.latency else 0.0
+            roll = self._random.random()
+            code = None
+            if roll < self.error_rate:
+                code = 500
+                self.errors += 1
+            elif roll < self.error_rate + self.throttle_rate:
+                code = 429
+                self.throttled += 1
+        if delay > 0:
+            time.sleep(delay)
+        return code
+
+    # -- Resources -----------------------------------------------------------
+
+    def create_letter(self, params: dict, idempotency_key: str = None) -> tuple:
+        if idempotency_key:
+            with self._lock:
+                letter_id = self.idempotent.get(idempotency_key)
+            if letter_id:
+                return 200, self.letters[letter_id]["public"]
+        for field in ("to", "from", "file"):
+            if not params.get(field):
+                return 422, {"error": {"message": f"{field} is required", "status_code": 422}}
+        source = params["file"]
+        if source.startswith("tmpl_"):
+            template = self.templates.get(source)
+            if template is None:
+                return 404, {"error": {"message": f"template {source} not found", "status_code": 404}}
+            rendered = render_template(template["html"], params.get("merge_variables", {}))
+        else:
+            rendered = source
+
+        now = datetime.now()
+        letter_id = self.new_id("ltr")
+        public = {
+            "id": letter_id,
+            "description": params.get("description"),
+            "to": params["to"],
+            "from": params["from"],
+            "carrier": "USPS",
+            "tracking_number": f"9407{int(letter_id[4:], 16):018d}",
+            "expected_delivery_date": (now + timedelta(days=4)).date().isoformat(),
+            "send_date": now.isoformat(),
+            "date_created": now.isoformat(),
+            "mail_type": params.get("mail_type"),
+            "extra_service": params.get("extra_service"),
+            "price": "7.82",
+            "url": f"https://lob-mock.invalid/letters/{letter_id}.pdf",
+            "thumbnails": [],
+            "tracking_events": [],
+            "object": "letter",
+        }
+        with self._lock:
+            self.letters[letter_id] = {"public": public, "html": rendered}
+            if idempotency_key:
+                self.idempotent[idempotency_key] = letter_id
+        return 200, public
+
+    def create_template(self, params: dict) -> tuple:
+        if not params.get("html"):
+            return 422, {"error": {"message": "html is required", "status_code": 422}}
+        template_id = self.new_id("tmpl")
+        template = {
+            "id": template_id,
+            "description": params.get("description", ""),
+            "published_version": {"id": self.new_id("vrsn"), "html": params["html"]},
+            "object": "template",
+        }
+        with self._lock:
+            self.templates[template_id] = {"public": template, "html": params["html"]}
+        return 200, template
+
+    @staticmethod
+    def verify(address: dict) -> dict:
+        return {
+            "id": "us_ver_mock",
+            "deliverability": "deliverable",
+            "primary_line": address.get("primary_line", ""),
+            "components": {
+                "city": address.get("city", ""),
+                "state": address.get("state", ""),
+                "zip_code": address.get("zip_code", ""),
+            },
+            "object": "us_verification",
+        }
+
+    def page(self, items: list, query: dict, base: str) -> dict:
+        """Lob list page: limit/after cursor pagination with next_url."""
+        limit = int(query.get("limit", 10))
+        start = int(query.get("after", 0))
+        data = items[start:start + limit]
+        more = start + limit < len(items)
+        return {
+            "data": data,
+            "count": len(data),
+            "next_url": f"{base}?limit={limit}&after={start + limit}" if more else None,
+            "object": "list",
+        }
+
+
+# ---------------------------------------------------------------------------
+# HTTP SERVER
+# ---------------------------------------------------------------------------
+
+def _make_handler(state: LobMockState, prefix: str):
+    class LobMockHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+        def _body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def _params(self, body: bytes) -> dict:
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                return json.loads(body or b"{}")
+            return parse_form(body)
+
+        def _reply(self, code: int, payload: dict, headers: dict = None):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _route(self, method: str):
+            url = urlsplit(self.path)
+            path = url.path[len(prefix):] if url.path.startswith(prefix) else url.path
+            body = self._body() if method == "POST" else b""
+            request_line = f"{method} {self.path} HTTP/1.1\r\n"
+            headers = "".join(f"{k}: {v}\r\n" for k, v in self.headers.items())
+            route = re.sub(r"/(ltr|tmpl)_\w+", r"/{id}", path)
+            state.count(f"{method} {route}", len(request_line) + len(headers) + 2 + len(body))
+            if not self.headers.get("Authorization"):
+                return self._reply(401, {"error": {"message": "Missing API key", "status_code": 401}})
+            fault = state.fault()
+            if fault == 429:
+                return self._reply(
+                    429, {"error": {"message": "Rate limit exceeded", "status_code": 429}},
+                    {"Retry-After": f"{state.retry_after:g}"},
+                )
+            if fault == 500:
+                return self._reply(500, {"error": {"message": "Injected server error", "status_code": 500}})
+            query = dict(parse_qsl(url.query))
+            base = f"http://{self.headers.get('Host')}{prefix}{path}"
+
+            if method == "POST" and path == "/letters":
+                code, payload = state.create_letter(self._params(body), self.headers.get("Idempotency-Key"))
+            elif method == "GET" and path == "/letters":
+                code, payload = 200, state.page([l["public"] for l in state.letters.values()], query, base)
+            elif method == "GET" and path.startswith("/letters/"):
+                letter = state.letters.get(path.rsplit("/", 1)[1])
+                code, payload = (200, letter["public"]) if letter else (404, {"error": {"message": "not found"}})
+            elif method == "POST" and path == "/templates":
+                code, payload = state.create_template(self._params(body))
+            elif method == "GET" and path == "/templates":
+                code, payload = 200, state.page([t["public"] for t in state.templates.values()], query, base)
+            elif method == "GET" and path.startswith("/templates/"):
+                template = state.templates.get(path.rsplit("/", 1)[1])
+                code, payload = (200, template["public"]) if template else (404, {"error": {"message": "not found"}})
+            elif method == "POST" and path == "/us_verifications":
+                code, payload = 200, state.verify(self._params(body))
+            elif method == "POST" and path == "/bulk/us_verifications":
+                addresses = self._params(body).get("addresses", [])
+                code, payload = 200, {"addresses": [state.verify(a) for a in addresses], "errors": False}
+            else:
+                code, payload = 404, {"error": {"message": f"No route for {method} {path}", "status_code": 404}}
+            self._reply(code, payload)
+
+        def do_GET(self):
+            self._route("GET")
+
+        def do_POST(self):
+            self._route("POST")
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return LobMockHandler
+
+
+class LobMockServer:
+    """
+    Lob API mock on a background thread; usable as a context manager.
+    url is the base URL to pass as DisputeMailer(base_url=...) or LOB_BASE_URL.
+    Keyword arguments are LobMockState's fault injection settings, which can
+    also be changed on .state while the server runs.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, prefix: str = "/v1", **faults):
+        self.state = LobMockState(**faults)
+        self.server = ThreadingHTTPServer((host, port), _make_handler(self.state, prefix))
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}{prefix}"
+        self._thread = None
+
+    def start(self) -> "LobMockServer":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "LobMockServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# ---------------------------------------------------------------------------
+# CLI INTERFACE
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local mock of the Lob API")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8790, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform ± jitter on --latency, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible fault injection")
+    args = parser.parse_args()
+
+    mock = LobMockServer(
+        args.host, args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, retry_after=args.retry_after, seed=args.seed,
+    )
+    print(f"Mock Lob API at {mock.url} (Ctrl-C to stop)")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock.server.server_close()
@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from certified_mail import AddressVerificationCache, DisputeMailer, LetterCache  # noqa: E402
+from lob_mock_server import LobMockServer  # noqa: E402
+
+
+@pytest.fixture
+def lob():
+    with LobMockServer() as server:
+        yield server
+
+
+@pytest.fixture
+def make_mailer(lob, tmp_path):
+    """A fresh DisputeMailer on the mock and tmp_path's tracker and caches, as a new process would open them."""
+    def make(**kwargs):
+        kwargs.setdefault("log_path", str(tmp_path / "disputes.jsonl"))
+        return DisputeMailer(
+            api_key="test_mock",
+            base_url=lob.url,
+            letter_cache=LetterCache(str(tmp_path / "letter_cache.jsonl")),
+            address_cache=AddressVerificationCache(str(tmp_path / "address_cache.jsonl")),
+            **kwargs,
+        )
+
+    return make
@@ -0,0 +1,37 @@
+from datetime import date
+
+from certified_mail import dispute_idempotency_key
+
+CLIENT = {"name": "John Doe", "address_line1": "123 Main St", "city": "Austin", "state": "TX", "zip": "78701"}
+ITEMS = [{"account_name": "Midland Credit", "account_number_last4": "4321", "reason": "Not mine"}]
+COLLECTOR_A = {
+    "name": "Midland Credit Management", "address_line1": "350 Camino De La Reina",
+    "address_city": "San Diego", "address_state": "CA", "address_zip": "92108",
+}
+COLLECTOR_B = {
+    "name": "Portfolio Recovery Associates", "address_line1": "120 Corporate Blvd",
+    "address_city": "Norfolk", "address_state": "VA", "address_zip": "23502",
+}
+DAY = date(2026, 10, 18)
+
+
+def key(letter_type="debt_validation", recipient=COLLECTOR_A, extra_context=None, letter_date=DAY):
+    return dispute_idempotency_key(CLIENT, letter_type, "custom", ITEMS, recipient, extra_context, letter_date)
+
+
+def test_same_letter_same_key():
+    assert key() == key(recipient=dict(COLLECTOR_A, address_line1="  350 camino de la reina "))
+
+
+def test_different_recipients_different_keys():
+    assert key(recipient=COLLECTOR_A) != key(recipient=COLLECTOR_B)
+
+
+def test_different_terms_different_keys():
+    assert key("pay_for_delete", extra_context={"settlement_amount": "100"}) != key(
+        "pay_for_delete", extra_context={"settlement_amount": "250"}
+    )
+
+
+def test_different_letter_dates_different_keys():
+    assert key(letter_date=DAY) != key(letter_date=date(2026, 10, 19))
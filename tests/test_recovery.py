@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from certified_mail import CampaignCheckpoint, LetterOutbox, iter_campaign_jobs
+
+CLIENT = {"name": "John Doe", "address_line1": "123 Main St", "city": "Austin", "state": "TX", "zip": "78701"}
+ITEMS = [{"account_name": "Midland Credit", "account_number_last4": "4321", "reason": "Not mine"}]
+
+
+def crash_on_log(mailer, letter_ids=None):
+    """Make the mailer die between Lob accepting a letter and the tracker write (for letter_ids, or every letter)."""
+    log = mailer._log_dispute
+
+    def crash(tracking):
+        if letter_ids is None or tracking["letter_id"] in letter_ids:
+            raise OSError("killed before the tracker write")
+        log(tracking)
+
+    mailer._log_dispute = crash
+
+
+def test_send_logged_on_rerun_after_crash_between_send_and_log(lob, make_mailer):
+    first = make_mailer()
+    crash_on_log(first)
+    with pytest.raises(OSError):
+        first.send_dispute(CLIENT, "basic_bureau", "equifax", ITEMS)
+    assert first.tracker.load() == []
+
+    rerun = make_mailer()
+    tracking = rerun.send_dispute(CLIENT, "basic_bureau", "equifax", ITEMS)
+    assert tracking["status"] == "sent"
+    assert [d["letter_id"] for d in rerun.tracker.load()] == [tracking["letter_id"]]
+    assert len(lob.state.letters) == 1  # Lob replayed the letter it accepted the first time
+
+    again = make_mailer().send_dispute(CLIENT, "basic_bureau", "equifax", ITEMS)
+    assert again["duplicate"] and again["letter_id"] == tracking["letter_id"]
+    assert len(lob.state.letters) == 1
+
+
+def test_campaign_resumes_from_checkpoint_after_crash(lob, make_mailer, tmp_path):
+    campaign = tmp_path / "campaign.jsonl"
+    campaign.write_text("".join(
+        json.dumps({"client": dict(CLIENT, name=f"Client {i}"), "dispute_items": ITEMS}) + "\n" for i in range(3)
+    ))
+    checkpoint_path = str(tmp_path / "campaign.checkpoint")
+
+    first = make_mailer()
+    crash_on_log(first, letter_ids={"ltr_0000000000000002"})  # the second letter Lob accepts
+    checkpoint = CampaignCheckpoint(checkpoint_path)
+    summary = first.run_campaign(
+        iter_campaign_jobs(str(campaign), "basic_bureau", "equifax"), concurrency=1, checkpoint=checkpoint
+    )
+    checkpoint.close()
+    assert (summary["sent"], summary["failed"]) == (2, 1)
+    assert len(lob.state.letters) == 3
+
+    rerun = make_mailer()
+    checkpoint = CampaignCheckpoint(checkpoint_path)
+    summary = rerun.run_campaign(
+        iter_campaign_jobs(str(campaign), "basic_bureau", "equifax"), concurrency=1, checkpoint=checkpoint
+    )
+    checkpoint.close()
+    assert (summary["sent"], summary["skipped"], summary["failed"]) == (1, 2, 0)
+    assert len(rerun.tracker.load()) == 3
+    assert len(lob.state.letters) == 3
+    assert len(CampaignCheckpoint(checkpoint_path)) == 3
+
+
+def test_outbox_letter_accepted_before_crash_is_logged_once(lob, make_mailer, tmp_path):
+    outbox = LetterOutbox(str(tmp_path / "outbox.db"), lease_seconds=0)
+    mailer = make_mailer()
+    assert mailer.enqueue_dispute(outbox, CLIENT, "basic_bureau", "equifax", ITEMS)["status"] == "queued"
+
+    # A worker sends the letter and stores Lob's answer, then dies before logging and acking it
+    [entry] = outbox.lease("dead-worker")
+    letter = entry["letter"]
+    tracking = mailer._send_rendered(
+        letter["from_address"], letter["recipient"], letter["letter_type"], letter["target"],
+        letter["content"], letter["dispute_items"],
+        idempotency_key=entry["idempotency_key"], content_key=letter["content_key"],
+    )
+    assert outbox.accepted(entry["idempotency_key"], "dead-worker", tracking)
+
+    summary = make_mailer().run_outbox_worker(outbox, workers=1, once=True)
+    assert (summary["sent"], summary["recovered"]) == (0, 1)
+    assert [d["letter_id"] for d in mailer.tracker.load()] == [tracking["letter_id"]]
+    assert outbox.counts()["done"] == 1
+    assert len(lob.state.letters) == 1
+    outbox.close()
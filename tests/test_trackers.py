@@ -0,0 +1,81 @@
+import json
+import threading
+from datetime import datetime
+
+import pytest
+
+from certified_mail import DisputeJournal, ShardedDisputeTracker
+
+
+def record(i, client="cli_a", account="Midland Credit"):
+    return {
+        "letter_id": f"ltr_{i}", "client_id": client, "status": "sent",
+        "sent_date": f"2026-{9 + i % 3:02d}-01T00:00:00",
+        "response_deadline": f"2026-{10 + i % 3:02d}-01T00:00:00",
+        "escalation_date": f"2026-{10 + i % 3:02d}-06T00:00:00",
+        "items_disputed": [{"account_name": account, "reason": "Not mine"}],
+    }
+
+
+def test_concurrent_writers_share_one_journal(tmp_path):
+    path = str(tmp_path / "disputes.jsonl")
+    journals = [DisputeJournal(path), DisputeJournal(path)]  # as two processes would open it
+    threads = [
+        threading.Thread(target=lambda n=n: [journals[n % 2].append(record(n * 100 + i)) for i in range(50)])
+        for n in range(6)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for journal in journals:
+        journal.close()
+
+    lines = (tmp_path / "disputes.jsonl").read_text().splitlines()
+    assert all(json.loads(line) for line in lines)
+    assert len(DisputeJournal(path).load()) == 300
+
+
+def test_get_reads_indexed_lines_through_updates_and_compaction(tmp_path):
+    journal = DisputeJournal(str(tmp_path / "disputes.jsonl"))
+    journal.append_many([record(i) for i in range(20)])
+    journal.update_many({"ltr_3": {"status": "delivered", "notes": "signed for"}, "ltr_4": {"status": "resolved"}})
+    scanned = {d["letter_id"]: d for d in journal.iter_disputes()}
+    assert all(journal.get(letter_id) == d for letter_id, d in scanned.items())
+    assert journal.get("ltr_missing") is None
+
+    journal.compact()
+    journal.update("ltr_3", {"notes": "after compaction"})
+    journal.close()
+    reopened = DisputeJournal(str(tmp_path / "disputes.jsonl"))
+    assert reopened.get("ltr_3")["notes"] == "after compaction"
+    assert reopened.get("ltr_4")["status"] == "resolved"
+    due = reopened.due("response_deadline", before=datetime(2026, 11, 1))
+    assert {d["letter_id"] for d in due} == {f"ltr_{i}" for i in range(0, 20, 3)}
+
+
+def test_failed_write_leaves_later_records_resolvable(tmp_path, monkeypatch):
+    journal = DisputeJournal(str(tmp_path / "disputes.jsonl"))
+    journal.append(record(0, account="Seed"))
+    monkeypatch.setattr(journal, "_open", lambda: (_ for _ in ()).throw(OSError("disk full")))
+    with pytest.raises(OSError):
+        journal.append(record(1, account="Portfolio Recovery"))
+    monkeypatch.undo()
+
+    journal.append(record(2, account="Portfolio Recovery"))
+    dispute = journal.get("ltr_2")
+    assert list(journal.items(dispute["item_ids"]).values()) == [{"account_name": "Portfolio Recovery", "reason": "Not mine"}]
+    assert journal.get("ltr_1") is None
+
+
+def test_sharded_tracker_routes_by_client(tmp_path):
+    tracker = ShardedDisputeTracker(str(tmp_path / "shards"), "client")
+    tracker.append_many([record(i, client=f"cli_{i % 3}") for i in range(30)])
+    tracker.update("ltr_4", {"status": "resolved"})
+    assert tracker.shard_keys() == ["cli_0", "cli_1", "cli_2"]
+    assert {d["letter_id"] for d in tracker.shard("cli_1").iter_disputes()} == {f"ltr_{i}" for i in range(1, 30, 3)}
+
+    reopened = ShardedDisputeTracker(str(tmp_path / "shards"))
+    assert reopened.get("ltr_4")["status"] == "resolved"
+    assert len(list(reopened.iter_disputes({"client_id": "cli_2"}))) == 10
+    assert len(reopened.pending()) == 29
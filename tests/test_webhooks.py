@@ -0,0 +1,78 @@
+import json
+import time
+
+import pytest
+
+from certified_mail import DisputeJournal, WebhookReceiver, lob_webhook_signature
+
+SECRET = "whsec_test"
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    journal = DisputeJournal(str(tmp_path / "disputes.jsonl"))
+    journal.append_many([
+        {"letter_id": letter_id, "status": status, "sent_date": "2026-10-01T00:00:00",
+         "response_deadline": "2026-10-31T00:00:00", "escalation_date": "2026-11-05T00:00:00"}
+        for letter_id, status in (("ltr_sent", "sent"), ("ltr_resolved", "resolved"))
+    ])
+    yield journal
+    journal.close()
+
+
+def deliver(receiver, event, secret=SECRET):
+    body = json.dumps(event).encode("utf-8")
+    timestamp = str(int(time.time() * 1000))
+    return receiver.handle(body, {
+        "Lob-Signature": lob_webhook_signature(secret, timestamp, body),
+        "Lob-Signature-Timestamp": timestamp,
+    })
+
+
+def event(letter_id, event_type="letter.certified.delivered", event_id="evt_1"):
+    return {"id": event_id, "event_type": {"id": event_type}, "body": {"id": letter_id}}
+
+
+def test_delivery_applied_once_and_redelivery_deduplicated(tracker):
+    receiver = WebhookReceiver(tracker, SECRET)
+    assert deliver(receiver, event("ltr_sent")) == (200, "ltr_sent → delivered")
+    assert deliver(receiver, event("ltr_sent")) == (200, "duplicate")
+    assert tracker.get("ltr_sent")["status"] == "delivered"
+    assert receiver.counts["applied"] == 1 and receiver.counts["duplicate"] == 1
+
+
+def test_letter_no_longer_pending_is_not_overwritten(tracker):
+    receiver = WebhookReceiver(tracker, SECRET)
+    assert deliver(receiver, event("ltr_resolved")) == (200, "ignored")
+    assert tracker.get("ltr_resolved")["status"] == "resolved"
+
+
+def test_redelivery_after_failed_update_is_applied(tracker, monkeypatch):
+    receiver = WebhookReceiver(tracker, SECRET)
+    update = tracker.update
+
+    def fail_once(letter_id, fields):
+        monkeypatch.setattr(tracker, "update", update)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(tracker, "update", fail_once)
+    code, _ = deliver(receiver, event("ltr_sent"))
+    assert code == 500
+    assert tracker.get("ltr_sent")["status"] == "sent"
+
+    assert deliver(receiver, event("ltr_sent")) == (200, "ltr_sent → delivered")
+    assert tracker.get("ltr_sent")["status"] == "delivered"
+
+
+def test_events_without_an_id_are_all_applied(tracker):
+    receiver = WebhookReceiver(tracker, SECRET)
+    deliver(receiver, event("ltr_sent", event_id=None))
+    deliver(receiver, event("ltr_sent", "letter.certified.returned_to_sender", event_id=None))
+    assert tracker.get("ltr_sent")["status"] == "returned"
+
+
+def test_bad_deliveries_are_rejected(tracker):
+    receiver = WebhookReceiver(tracker, SECRET)
+    assert deliver(receiver, event("ltr_sent"), secret="wrong")[0] == 401
+    assert deliver(receiver, [1, 2])[0] == 400
+    assert tracker.get("ltr_sent")["status"] == "sent"